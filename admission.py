@@ -0,0 +1,190 @@
+# admission.py
+
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from serialization import dumps
+
+logger = logging.getLogger("course_api.admission")
+
+# ----------------------------- Request Classes -----------------------------
+# Every route handler is a sync def, so all of them share AnyIO's worker threads.
+# Without admission control a burst of minute-long lecture generations takes every
+# thread and cheap CRUD/reads queue behind them. Each class below gets its own
+# concurrency limit and bounded wait queue; generation pools are capped well below
+# the thread limit so interactive requests always find a free worker.
+
+INTERACTIVE = "interactive"
+SHORT_GENERATION = "short_generation"
+LONG_GENERATION = "long_generation"
+
+LONG_GENERATION_PATHS = {
+    "/course/generate-reading-material",
+    "/course/generate-lecture-script",
+    "/course/generate-quiz",
+}
+SHORT_GENERATION_PATHS = {
+    "/course/generate/outline",
+    "/course/generate/modules",
+    "/course/generate/submodules",
+    "/course/generate/activities",
+    "/course/redo",
+}
+
+def classify(method: str, path: str) -> str:
+    if method == "POST" and path in LONG_GENERATION_PATHS:
+        return LONG_GENERATION
+    if method == "POST" and path in SHORT_GENERATION_PATHS:
+        return SHORT_GENERATION
+    return INTERACTIVE
+
+# ----------------------------- Pools -----------------------------
+
+EWMA_ALPHA = 0.2
+LATENCY_WINDOW = 1000
+
+class AdmissionPool:
+    def __init__(self, name: str, concurrency: int, max_queue: int, slo_seconds: float, expected_seconds: float):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.slo_seconds = slo_seconds
+        # Running estimate of how long one request holds a slot
+        self.service_seconds = expected_seconds
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._latencies: deque = deque(maxlen=LATENCY_WINDOW)
+
+    @property
+    def slots(self) -> asyncio.Semaphore:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.concurrency)
+        return self._slots
+
+    def estimated_wait(self) -> float:
+        # Requests that would be ahead of a new arrival once every free slot is taken
+        ahead = self.active + self.waiting - self.concurrency + 1
+        if ahead <= 0:
+            return 0.0
+        return ahead / self.concurrency * self.service_seconds
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.estimated_wait()))
+
+    async def acquire(self) -> bool:
+        # Shed immediately when the queue is full or the expected wait already breaks the SLO
+        if self.waiting >= self.max_queue or self.estimated_wait() > self.slo_seconds:
+            self.rejected += 1
+            return False
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.slots.acquire(), timeout=self.slo_seconds)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            return False
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        self.admitted += 1
+        return True
+
+    def release(self, service_seconds: float, total_seconds: float):
+        self.active -= 1
+        self.slots.release()
+        self.service_seconds += EWMA_ALPHA * (service_seconds - self.service_seconds)
+        self._latencies.append(total_seconds)
+
+    def stats(self) -> dict:
+        latencies = sorted(self._latencies)
+
+        def pct(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 4)
+
+        return {
+            "concurrency": self.concurrency,
+            "max_queue": self.max_queue,
+            "slo_seconds": self.slo_seconds,
+            "active": self.active,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "service_seconds_ewma": round(self.service_seconds, 4),
+            "p50_seconds": pct(0.50),
+            "p99_seconds": pct(0.99),
+        }
+
+def _pool_from_env(name: str, concurrency: int, max_queue: int, slo_seconds: float, expected_seconds: float) -> AdmissionPool:
+    prefix = f"ADMISSION_{name.upper()}"
+    return AdmissionPool(
+        name,
+        concurrency=int(os.getenv(f"{prefix}_CONCURRENCY", str(concurrency))),
+        max_queue=int(os.getenv(f"{prefix}_MAX_QUEUE", str(max_queue))),
+        slo_seconds=float(os.getenv(f"{prefix}_SLO_SECONDS", str(slo_seconds))),
+        expected_seconds=expected_seconds,
+    )
+
+def create_pools() -> Dict[str, AdmissionPool]:
+    return {
+        INTERACTIVE: _pool_from_env(INTERACTIVE, concurrency=24, max_queue=256, slo_seconds=2, expected_seconds=0.05),
+        SHORT_GENERATION: _pool_from_env(SHORT_GENERATION, concurrency=8, max_queue=32, slo_seconds=45, expected_seconds=15),
+        LONG_GENERATION: _pool_from_env(LONG_GENERATION, concurrency=4, max_queue=16, slo_seconds=180, expected_seconds=60),
+    }
+
+pools = create_pools()
+
+def thread_limit() -> int:
+    # Enough worker threads for every pool to run at full concurrency at once
+    return sum(p.concurrency for p in pools.values())
+
+def stats() -> dict:
+    return {name: pool.stats() for name, pool in pools.items()}
+
+# ----------------------------- Middleware -----------------------------
+
+class AdmissionMiddleware:
+    def __init__(self, app, enabled: bool = os.getenv("ADMISSION_ENABLED", "1") != "0"):
+        self.app = app
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        # Health probes are never shed: a 429 there would get a busy instance restarted
+        if not self.enabled or scope["type"] != "http" or scope["path"].startswith("/health/"):
+            await self.app(scope, receive, send)
+            return
+
+        pool = pools[classify(scope["method"], scope["path"])]
+        arrived = time.perf_counter()
+        if not await pool.acquire():
+            logger.warning(f"Shedding {scope['method']} {scope['path']}: {pool.name} pool over its {pool.slo_seconds}s SLO")
+            await self._reject(pool, send)
+            return
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            finished = time.perf_counter()
+            pool.release(finished - started, finished - arrived)
+
+    async def _reject(self, pool: AdmissionPool, send):
+        body = dumps({"detail": f"Server busy ({pool.name}); retry later", "retry_after": pool.retry_after()})
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("ascii")),
+                (b"retry-after", str(pool.retry_after()).encode("ascii")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
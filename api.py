@@ -1,10 +1,23 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Header
 from pydantic import BaseModel, ValidationError
 from typing import List, Optional, Dict, TypeVar, Type
-from pymongo import MongoClient
 import uuid
 from datetime import datetime, timezone
 
+from persistence import VersionWriter
+from read_cache import read_cache, MISSING, CACHE_LATEST_POINTERS, REVALIDATE_SECONDS
+from version_store import VersionStore
+from storage_codec import encode_document, decode_document, COMPRESSED_FIELDS
+from http_cache import make_etag, body_hash, etag_matches, not_modified, set_cache_headers, cache_headers, cache_control_for
+from pagination import KeysetPage, KEYSET_SORT, keyset_filter, page_response
+from serialization import CourseJSONResponse, trusted_response, dumps_compact, to_bson
+from deadline import RequestAbandoned
+from tracing import annotate
+from profiling import ProfiledRoute
+from clients import mongo_client
+from question_bank import QuestionBank, bank_key, public_question
+from dedup import unique_questions
+import summary_strategy
 from genai_logic import (
     CourseInit,
     CourseOutline,
@@ -40,24 +53,24 @@ from course_content_generator import (
 import json
 import logging
 from typing import Optional, Dict, Any
-from fastapi.responses import JSONResponse
+from fastapi.responses import Response
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
 
-router = APIRouter()
+router = APIRouter(default_response_class=CourseJSONResponse, route_class=ProfiledRoute)
 
 # Configure logging
 logger = logging.getLogger("course_api")
 logging.basicConfig(level=logging.INFO)
 
 
-MONGO_URI= os.getenv("MONGO_URI")
-DB_NAME = "corgen"
+DB_NAME = os.getenv("MONGO_DB_NAME", "corgen")
 
-client = MongoClient(MONGO_URI)
+# connect=False: the pool starts on first use or in the startup warm-up (clients.py)
+client = mongo_client()
 db = client[DB_NAME]
 collection_input = db["course"]
 collection_outline= db["outline"]
@@ -67,8 +80,65 @@ collection_activities = db["activities"]
 collection_content= db["content"] 
 collection_latest_versions = db["latest_versions"]
 collection_version_tags = db["version_tags"]
-# In-memory course state for tracking previous stages
-course_state = {}
+collection_blobs = db["version_blobs"]
+collection_idempotency = db["idempotency_keys"]
+collection_question_bank = db["question_bank"]
+
+# Stage -> collection holding its versions, and the field identifying the owning entity
+STAGE_COLLECTIONS = {
+    Stage.outline: collection_outline,
+    Stage.module: collection_modules,
+    Stage.submodule: collection_submodules,
+    Stage.activity: collection_activities,
+    Stage.reading: collection_content,
+    Stage.lecture: collection_content,
+    Stage.quiz: collection_content,
+}
+STAGE_ENTITY_KEYS = {
+    Stage.outline: "course_id",
+    Stage.module: "course_id",
+    Stage.submodule: "module_id",
+    Stage.activity: "submodule_id",
+    Stage.reading: "activity_id",
+    Stage.lecture: "activity_id",
+    Stage.quiz: "activity_id",
+}
+version_writer = VersionWriter(client, collection_version_tags, collection_latest_versions)
+version_store = VersionStore(collection_blobs)
+question_bank = QuestionBank(collection_question_bank)
+
+def _invalidate_reads(entity_id: str, stage: Stage, version_id: str):
+    read_cache.invalidate(STAGE_COLLECTIONS[stage].name, entity_id, version_id)
+    read_cache.invalidate(collection_latest_versions.name, entity_id, stage.value)
+
+version_writer.add_listener(_invalidate_reads)
+
+# Earlier quiz versions of the same activity whose questions a new quiz steers away from
+QUIZ_AVOID_PREVIOUS_VERSIONS = int(os.getenv("QUIZ_AVOID_PREVIOUS_VERSIONS", "2"))
+
+def previous_quiz_questions(activity_id: str) -> List[dict]:
+    # Questions from this activity's most recent quiz versions, so a regenerated quiz asks something new
+    cursor = collection_content.find(
+        {"activity_id": activity_id, "stage": Stage.quiz.value},
+        {"_id": 0, "quiz_questions": 1, "quiz": 1, "storage": 1}
+    ).sort(KEYSET_SORT).limit(QUIZ_AVOID_PREVIOUS_VERSIONS)
+    questions = []
+    for doc in cursor:
+        doc = version_store.materialize(doc)
+        questions += doc.get("quiz_questions") or ([doc["quiz"]] if doc.get("quiz") else [])
+    return [q for q in questions if q.get("question")]
+
+def store_post_response_summary(stage: Stage, activity_id: str, version_id: str):
+    # Callback for summary_strategy jobs: writes the summary onto the stored version in place
+    field = "reading_material.reading_material_summary" if stage == Stage.reading else "lecture_script_summary"
+
+    def store(summary: Optional[str], source: dict):
+        update = {"summary_source": source}
+        if summary:
+            update.update(encode_document({field: summary}, fields=[field]))
+        version_store.update_one(collection_content, {"activity_id": activity_id, "version_id": version_id}, {"$set": update})
+        _invalidate_reads(activity_id, stage, version_id)
+    return store
 
 class ActivityRequest(BaseModel):
     submodule_id :str
@@ -127,16 +197,18 @@ class AddSubmodulePayload(BaseModel):
     submodule : Submodule
     
 def as_json(obj: BaseModel | dict) -> str:
-    return json.dumps(obj.model_dump() if isinstance(obj, BaseModel) else obj, indent=2)
+    # Prompt context only: compact, no pretty-printing
+    return dumps_compact(obj)
 
 T = TypeVar("T", bound=BaseModel)
 
-def parse_result(result_str: str | None, model: type[T]) -> T:
+def parse_result(result_str: str | dict | None, model: type[T]) -> T:
+    # Generators may hand back already-decoded dicts; validate those directly instead of a dumps/loads round trip
     if not result_str:
         logger.error("LLM returned no result.")
         raise HTTPException(status_code=500, detail="No result returned from LLM")
     try:
-        raw_data = json.loads(result_str)
+        raw_data = result_str if isinstance(result_str, dict) else json.loads(result_str)
         validated = model.model_validate(raw_data)
         return validated
     except json.JSONDecodeError as e:
@@ -146,26 +218,94 @@ def parse_result(result_str: str | None, model: type[T]) -> T:
         logger.exception("Parsed result failed schema validation.")
         raise HTTPException(status_code=500, detail=f"Schema validation failed: {ve.errors()}")
 
-def auto_tag_version(entity_id: str, version_id: str, stage: Stage, prefix: str):
-    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
-    tag = f"{prefix}-{timestamp}"
-
-    try:
-        collection_version_tags.insert_one({
-            "entity_id": entity_id,
-            "stage": stage.value,
-            "tag": tag,
-            "version_id": version_id,
-            "timestamp": datetime.now(timezone.utc)
-        })
-        logger.info(f"Auto-tagged version {version_id} as '{tag}'")
-    except Exception as e:
-        logger.warning(f"Auto-tagging failed for {version_id}: {e}")
-
-def safe_bson(obj):
-    if hasattr(obj, "model_dump"):
-        return obj.model_dump(mode="python")
-    return obj
+def resolve_version_id(entity_id: Optional[str], stage: Stage, version_id: Optional[str]) -> str:
+    if version_id:
+        return version_id
+    if not entity_id:
+        raise HTTPException(status_code=400, detail=f"{STAGE_ENTITY_KEYS[stage]} is required")
+    cache_key = (collection_latest_versions.name, entity_id, stage.value)
+    latest = read_cache.get(cache_key)
+    if latest is MISSING:
+        latest = version_writer.latest_version_id(entity_id, stage)
+        if latest is not None:
+            read_cache.set(cache_key, latest, ttl_seconds=None if CACHE_LATEST_POINTERS else REVALIDATE_SECONDS)
+    if latest is None:
+        raise HTTPException(status_code=404, detail=f"No {stage.value} versions found for {entity_id}")
+    return latest
+
+def select_items(collection, match: dict, array_paths: List[str], id_field: str, ids: List[str], extra_fields: List[str]) -> Optional[dict]:
+    # Return only the requested array elements (plus extra_fields) from one versioned document.
+    # array_paths lists the current field first, then older field names kept by legacy records.
+    source: Any = f"${array_paths[-1]}"
+    for path in reversed(array_paths[:-1]):
+        source = {"$ifNull": [f"${path}", source]}
+
+    pipeline = [
+        {"$match": match},
+        {"$limit": 1},
+        {"$project": {
+            "_id": 0,
+            "items": {"$filter": {
+                "input": {"$ifNull": [source, []]},
+                "as": "item",
+                "cond": {"$in": [f"$$item.{id_field}", ids]}
+            }},
+            "storage": 1,
+            **{f: 1 for f in extra_fields}
+        }}
+    ]
+    selected = next(collection.aggregate(pipeline), None)
+    if selected is None or "storage" not in selected:
+        return selected
+
+    # Blob-backed version: filter the materialized body instead
+    doc = version_store.materialize(collection.find_one(match))
+    items: Any = None
+    for path in array_paths:
+        items = doc
+        for part in path.split("."):
+            items = items.get(part) if isinstance(items, dict) else None
+        if items is not None:
+            break
+    selected = {f: doc[f] for f in extra_fields if f in doc}
+    selected["items"] = [item for item in (items or []) if item.get(id_field) in ids]
+    return selected
+
+def current_rev(collection, entity_key: str, entity_id: str, version_id: str) -> Any:
+    # content_rev as stored now (another worker may have edited the version in place); MISSING if no such version
+    doc = collection.find_one({entity_key: entity_id, "version_id": version_id}, {"_id": 0, "content_rev": 1})
+    return doc.get("content_rev") if doc else MISSING
+
+def cached_version(collection, entity_key: str, entity_id: str, version_id: str) -> Any:
+    # A cached version body; past REVALIDATE_SECONDS since its last check it is served
+    # only if its content_rev still matches Mongo
+    key = (collection.name, entity_id, version_id)
+    cached, age = read_cache.get_checked(key)
+    if cached is MISSING or age < REVALIDATE_SECONDS:
+        return cached
+    if cached.get("content_rev") != current_rev(collection, entity_key, entity_id, version_id):
+        read_cache.invalidate(collection.name, entity_id, version_id)
+        return MISSING
+    read_cache.mark_checked(key)
+    return cached
+
+def conditional_version_read(if_none_match: Optional[str], collection, entity_key: str, entity_id: str, version_id: str, cache_control: str, *view) -> Optional[Response]:
+    # Answer If-None-Match from a content_rev-only lookup, never the body: the cached
+    # version's rev when it was checked within REVALIDATE_SECONDS, otherwise Mongo's.
+    if not if_none_match:
+        return None
+    cached = cached_version(collection, entity_key, entity_id, version_id)
+    rev = cached.get("content_rev") if cached is not MISSING else None
+    if rev is None:
+        rev = current_rev(collection, entity_key, entity_id, version_id)
+    if rev is MISSING or rev is None:
+        return None
+    etag = make_etag(collection.name, version_id, rev, *view)
+    return not_modified(etag, cache_control) if etag_matches(if_none_match, etag) else None
+
+def version_etag(collection, version_id: str, doc: dict, *view) -> str:
+    # Records written before content_rev existed fall back to hashing the body
+    return make_etag(collection.name, version_id, doc.get("content_rev") or body_hash(doc), *view)
 
 @router.post("/generate/outline")
 def generate_outline(course: CourseInit):
@@ -175,7 +315,6 @@ def generate_outline(course: CourseInit):
     version_id = str(uuid.uuid4())
     course_id = str(uuid.uuid4())
     course.course_id = course_id  # Attach to model
-    auto_tag_version(course_id, version_id, Stage.outline, "initial-outline")
 
     # Step 2: Dump course input (with nested fields) for storage
     course_dict = course.model_dump(mode="python")
@@ -207,33 +346,29 @@ def generate_outline(course: CourseInit):
     # Step 3: Generate the outline from the LLM
     result_data = generate_course_outline(course)
 
-    if result_data is None or not isinstance(result_data, dict):
-        return {"error": "Failed to generate outline. Please try again."}
+    if result_data is None or not isinstance(result_data, dict) or "error" in result_data:
+        raise HTTPException(status_code=500, detail="Failed to generate outline. Please try again.")
 
     try:
-        result_str = json.dumps(result_data)
-        result = parse_result(result_str, CourseOutline)
+        result = parse_result(result_data, CourseOutline)
     except Exception as e:
         logger.exception("Failed to parse LLM response into CourseOutline")
-        return {"error": "LLM response could not be parsed."}
+        raise HTTPException(status_code=500, detail="LLM response could not be parsed.")
 
-    course_state[course_id] = {
-        "course_init": course_dict,
-        "outline": result
-    }
+    outline_doc = to_bson(result)
     suggestions = get_stage_suggestions(Stage.outline, as_json(result))
 
     # Step 4: Store the outline
     outline_record = {
         "version_id": version_id,
         "course_id": course_id,
-        "outline": safe_bson(result),
+        "outline": outline_doc,
         "suggestions_outlines": suggestions,
         "timestamp": datetime.now(timezone.utc)
     }
 
     try:
-        collection_outline.insert_one(outline_record)
+        version_writer.write_version(collection_outline, outline_record, course_id, Stage.outline, "initial-outline")
         logger.info(f"Stored course outline for course_id={course_id}")
     except Exception as e:
         logger.exception("Failed to store course outline in MongoDB")
@@ -241,32 +376,51 @@ def generate_outline(course: CourseInit):
     
 
     # Final Response
-    return {
-        "result": result,
+    return trusted_response({
+        "result": outline_doc,
         "suggestions": suggestions,
         "version_id": version_id,
         "course_id": course_id
-    }
+    })
 
 @router.get("/get_outline")
-def get_course_outline(course_id: Optional[str] = None, version_id: Optional[str] = None):
-    print(f'course_id: {type(course_id)}-{course_id}')
-    print(f'version_id: {type(version_id)}-{version_id}')
-    result = collection_outline.find_one({"course_id": course_id, "version_id": version_id})
+def get_course_outline(
+    course_id: Optional[str] = None,
+    version_id: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None)
+):
+    cache_control = cache_control_for(version_id is not None)
+    version_id = resolve_version_id(course_id, Stage.outline, version_id)
+    not_modified_response = conditional_version_read(if_none_match, collection_outline, "course_id", course_id, version_id, cache_control)
+    if not_modified_response is not None:
+        return not_modified_response
+
+    cache_key = (collection_outline.name, course_id, version_id)
+    result = cached_version(collection_outline, "course_id", course_id, version_id)
+    annotate({"cache.hit": result is not MISSING})
+    if result is not MISSING:
+        return trusted_response(result, headers=cache_headers(version_etag(collection_outline, version_id, result), cache_control))
+
+    result = version_store.materialize(collection_outline.find_one({"course_id": course_id, "version_id": version_id}))
     if not result:
         raise HTTPException(status_code=404, detail="Course outline not found")
     
     result["_id"] = str(result["_id"])  # Convert ObjectId for frontend safety
-    return result
+    if "outline" not in result and "generated_outline" in result:
+        result["outline"] = result.pop("generated_outline")  # Records stored by older redo calls
+    read_cache.set(cache_key, result)
+    return trusted_response(result, headers=cache_headers(version_etag(collection_outline, version_id, result), cache_control))
 
 @router.put("/outline/update")
 def update_course_outline(update: OutlineUpdate):
-    result = collection_outline.update_one(
+    result = version_store.update_one(
+        collection_outline,
         {"course_id": update.course_id, "version_id": update.version_id},
         {"$set": {f"outline.{k}": v for k, v in update.updates.items()}}
     )
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Outline not updated")
+    version_writer.touch_latest(update.course_id, Stage.outline, update.version_id)
     return {"message": "Outline updated successfully"}
 
 @router.post("/generate/modules")
@@ -276,78 +430,119 @@ def generate_module(course_outline: CourseOutline):
     version_id = str(uuid.uuid4())  # Track version
 
     result_str = generate_modules(course_outline)
-    if isinstance(result_str, dict):
-        result_str = json.dumps(result_str)
 
     result = parse_result(result_str, ModuleSet)
 
     for module in result.modules:
         module.module_id = str(uuid.uuid4())
     module_ids = [m.module_id for m in result.modules]
-    auto_tag_version(course_outline.course_id, version_id, Stage.module, "initial-module")
+    module_doc = to_bson(result)
     suggestions = get_stage_suggestions(Stage.module, as_json(result))
     module_record = {
         "course_id": course_outline.course_id,
         "version_id": version_id,
         "module_ids": module_ids,
         "stage": "module",
-        "generated_modules": safe_bson(result),
+        "generated_modules": module_doc,
         "suggestions_modules": suggestions,
         "timestamp": datetime.now(timezone.utc)
     }
 
     try:
-        collection_modules.insert_one(module_record)
+        version_writer.write_version(collection_modules, module_record, course_outline.course_id, Stage.module, "initial-module")
         logger.info(f"Stored modules for course_id={course_outline.course_id} with version_id={version_id}")
     except Exception as e:
         logger.exception("Failed to store modules in MongoDB")
 
-    # Step 5: Update in-memory state
-    course_entry = course_state.setdefault(course_outline.course_id, {})
-    course_entry["modules"] = result
-
     return {
         "version_id": version_id,
         "course_id": course_outline.course_id
     }
 
 @router.get("/get_modules")
-def get_modules(course_id: Optional[str] = None, version_id: Optional[str] = None, module_id: Optional[str] = None):
-    doc = collection_modules.find_one({"course_id": course_id, "version_id": version_id})
-    if not doc:
-        raise HTTPException(status_code=404, detail="Modules not found")
-
-    doc["_id"] = str(doc["_id"])
-    modules = doc["generated_modules"]["modules"]
-
-    if module_id:
-        for module in modules:
-            if module.get("module_id") == module_id:
-                return {
-                    "module": module,
-                    "suggestions": doc.get("suggestions_modules", []),
-                    "version_id": version_id,
-                    "course_id": course_id
-                }
-        raise HTTPException(status_code=404, detail="Module not found for provided module_id")
+def get_modules(
+    course_id: Optional[str] = None,
+    version_id: Optional[str] = None,
+    module_id: Optional[str] = None,
+    module_ids: Optional[List[str]] = Query(None, description="Return only these modules"),
+    if_none_match: Optional[str] = Header(None)
+):
+    cache_control = cache_control_for(version_id is not None)
+    version_id = resolve_version_id(course_id, Stage.module, version_id)
+    wanted = [module_id] if module_id else module_ids
+    view = (module_id, sorted(module_ids or []))
+    not_modified_response = conditional_version_read(if_none_match, collection_modules, "course_id", course_id, version_id, cache_control, *view)
+    if not_modified_response is not None:
+        return not_modified_response
+
+    cache_key = (collection_modules.name, course_id, version_id)
+    doc = cached_version(collection_modules, "course_id", course_id, version_id)
+    annotate({"cache.hit": doc is not MISSING})
+
+    if wanted:
+        if doc is not MISSING:
+            modules = [m for m in doc.get("generated_modules", {}).get("modules", doc.get("modules", [])) if m.get("module_id") in wanted]
+            suggestions = doc.get("suggestions_modules", [])
+            etag_source = doc
+        else:
+            # Only the requested modules cross the wire
+            selected = select_items(
+                collection_modules,
+                {"course_id": course_id, "version_id": version_id},
+                ["generated_modules.modules", "modules"],
+                "module_id",
+                wanted,
+                ["suggestions_modules", "content_rev"]
+            )
+            if selected is None:
+                raise HTTPException(status_code=404, detail="Modules not found")
+            modules = selected["items"]
+            suggestions = selected.get("suggestions_modules", [])
+            etag_source = selected
+        headers = cache_headers(version_etag(collection_modules, version_id, etag_source, *view), cache_control)
+
+        if module_id:
+            if not modules:
+                raise HTTPException(status_code=404, detail="Module not found for provided module_id")
+            return trusted_response({
+                "module": modules[0],
+                "suggestions": suggestions,
+                "version_id": version_id,
+                "course_id": course_id
+            }, headers=headers)
+        return trusted_response({
+            "modules": modules,
+            "suggestions": suggestions,
+            "version_id": version_id,
+            "course_id": course_id
+        }, headers=headers)
+
+    if doc is MISSING:
+        doc = version_store.materialize(collection_modules.find_one({"course_id": course_id, "version_id": version_id}))
+        if not doc:
+            raise HTTPException(status_code=404, detail="Modules not found")
+        doc["_id"] = str(doc["_id"])
+        read_cache.set(cache_key, doc)
 
     # If no module_id is provided, return all modules
-    return {
-        "modules": modules,
+    return trusted_response({
+        "modules": doc.get("generated_modules", {}).get("modules", doc.get("modules", [])),
         "suggestions": doc.get("suggestions_modules", []),
         "version_id": version_id,
         "course_id": course_id
-    }
+    }, headers=cache_headers(version_etag(collection_modules, version_id, doc, *view), cache_control))
 
 
 @router.post("/module/add")
 def add_module(payload: AddModule):
-    result = collection_modules.update_one(
+    result = version_store.update_one(
+        collection_modules,
         {"course_id": payload.course_id, "version_id": payload.version_id},
         {"$push": {"generated_modules.modules": payload.module.dict()}}
     )
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Module not added")
+    version_writer.touch_latest(payload.course_id, Stage.module, payload.version_id)
 
     return {
         "message": "Module added successfully",
@@ -356,7 +551,8 @@ def add_module(payload: AddModule):
 
 @router.put("/module/update")
 def update_module(payload: UpdateModulePayload):
-    result = collection_modules.update_one(
+    result = version_store.update_one(
+        collection_modules,
         {
             "course_id": payload.course_id,
             "version_id": payload.version_id,
@@ -370,24 +566,25 @@ def update_module(payload: UpdateModulePayload):
     )
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Module not updated")
+    version_writer.touch_latest(payload.course_id, Stage.module, payload.version_id)
     return {"message": "Module updated", "module_id": payload.module_id}
 
 @router.delete("/module/delete")
 def delete_module(course_id: str, version_id: str, module_id: str):
-    result = collection_modules.update_one(
+    result = version_store.update_one(
+        collection_modules,
         {"course_id": course_id, "version_id": version_id},
         {"$pull": {"generated_modules.modules": {"module_id": module_id}}}
     )
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Module not deleted")
+    version_writer.touch_latest(course_id, Stage.module, version_id)
     return {"message": "Module deleted", "module_id": module_id}
 
 @router.post("/generate/submodules")
 def generate_submodule(module: Module):
     logger.info("Generating submodules...")
     result_str = generate_submodules(module)
-    if isinstance(result_str, dict):
-        result_str = json.dumps(result_str)
     if not result_str:
         raise HTTPException(status_code=400, detail="Failed to generate submodules")
 
@@ -399,13 +596,13 @@ def generate_submodule(module: Module):
     for submodule in result.submodules:
         submodule.submodule_id = str(uuid.uuid4())
         submodule_ids.append(submodule.submodule_id)
-    auto_tag_version(module.module_id, version_id, Stage.submodule, "initial-submodule")
+    submodule_doc = to_bson(result)
     suggestions = get_stage_suggestions(Stage.submodule, as_json(result))
 
     submodule_record = {
         "module_id": module.module_id,
         "version_id": version_id,
-        "generated_submodules": safe_bson(result),
+        "generated_submodules": submodule_doc,
         "submodule_ids": submodule_ids,
         "suggestions_submodules" : suggestions,
         "stage": "submodule",
@@ -413,36 +610,81 @@ def generate_submodule(module: Module):
     }
 
     try:
-        collection_submodules.insert_one(submodule_record)
+        version_writer.write_version(collection_submodules, submodule_record, module.module_id, Stage.submodule, "initial-submodule")
         logger.info(f"Stored submodules for module_id={module.module_id} with version_id={version_id}")
     except Exception as e:
         logger.exception("Failed to store submodules in MongoDB")
 
-    course_state[module.module_id] = course_state.get(module.module_id, {})
-    course_state[module.module_id]["submodules"] = result
     return {
         "version_id": version_id,
         "module_id": module.module_id
     }
 
 @router.get("/get_submodules")
-def get_submodules(module_id: str, version_id: str, submodule_id: Optional[str] = None):
-    record = collection_submodules.find_one({
-        "module_id": module_id,
-        "version_id": version_id
-    })
-
-    if not record:
-        raise HTTPException(status_code=404, detail="Submodules not found")
-
-    return {
-        "submodules": record.get("generated_submodules", {}).get("submodules", []),
-        "suggestions": record.get("suggestions_submodules", [])
-    }
+def get_submodules(
+    module_id: str,
+    version_id: Optional[str] = None,
+    submodule_id: Optional[str] = None,
+    submodule_ids: Optional[List[str]] = Query(None, description="Return only these submodules"),
+    if_none_match: Optional[str] = Header(None)
+):
+    cache_control = cache_control_for(version_id is not None)
+    version_id = resolve_version_id(module_id, Stage.submodule, version_id)
+    wanted = [submodule_id] if submodule_id else submodule_ids
+    view = (submodule_id, sorted(submodule_ids or []))
+    not_modified_response = conditional_version_read(if_none_match, collection_submodules, "module_id", module_id, version_id, cache_control, *view)
+    if not_modified_response is not None:
+        return not_modified_response
+
+    cache_key = (collection_submodules.name, module_id, version_id)
+    record = cached_version(collection_submodules, "module_id", module_id, version_id)
+    annotate({"cache.hit": record is not MISSING})
+
+    if wanted and record is MISSING:
+        # Only the requested submodules cross the wire
+        selected = select_items(
+            collection_submodules,
+            {"module_id": module_id, "version_id": version_id},
+            ["generated_submodules.submodules", "submodules"],
+            "submodule_id",
+            wanted,
+            ["suggestions_submodules", "content_rev"]
+        )
+        if selected is None:
+            raise HTTPException(status_code=404, detail="Submodules not found")
+        submodules = selected["items"]
+        suggestions = selected.get("suggestions_submodules", [])
+        etag_source = selected
+    else:
+        if record is MISSING:
+            record = version_store.materialize(collection_submodules.find_one({
+                "module_id": module_id,
+                "version_id": version_id
+            }))
+            if not record:
+                raise HTTPException(status_code=404, detail="Submodules not found")
+            record["_id"] = str(record["_id"])
+            read_cache.set(cache_key, record)
+        submodules = record.get("generated_submodules", {}).get("submodules", record.get("submodules", []))
+        suggestions = record.get("suggestions_submodules", [])
+        etag_source = record
+        if wanted:
+            submodules = [sm for sm in submodules if sm.get("submodule_id") in wanted]
+
+    if submodule_id and not submodules:
+        raise HTTPException(status_code=404, detail="Submodule not found for provided submodule_id")
+
+    return trusted_response({
+        "submodules": submodules,
+        "suggestions": suggestions,
+        "version_id": version_id,
+        "module_id": module_id
+    }, headers=cache_headers(version_etag(collection_submodules, version_id, etag_source, *view), cache_control))
 
 @router.put("/submodules/update")
 def update_submodule(payload: UpdateSubmodulePayload):
-    result = collection_submodules.update_one(
+    result = version_store.update_one(
+        collection_submodules,
         {
             "module_id": payload.module_id,
             "version_id": payload.version_id,
@@ -456,26 +698,31 @@ def update_submodule(payload: UpdateSubmodulePayload):
     )
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Submodule not updated")
+    version_writer.touch_latest(payload.module_id, Stage.submodule, payload.version_id)
     return {"message": "Submodule updated", "submodule_id": payload.submodule_id}
 
 @router.delete("/submodules/delete")
 def delete_submodule(module_id: str, version_id: str, submodule_id: str):
-    result = collection_submodules.update_one(
+    result = version_store.update_one(
+        collection_submodules,
         {"module_id": module_id, "version_id": version_id},
         {"$pull": {"generated_submodules.submodules": {"submodule_id": submodule_id}}}
     )
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Submodule not deleted")
+    version_writer.touch_latest(module_id, Stage.submodule, version_id)
     return {"message": "Submodule deleted successfully"}
 
 @router.post("/submodules/add")
 def add_submodule(payload: AddSubmodulePayload):
-    result = collection_submodules.update_one(
+    result = version_store.update_one(
+        collection_submodules,
         {"module_id": payload.module_id, "version_id": payload.version_id},
         {"$push": {"generated_submodules.submodules": payload.submodule.dict()}}
     )
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Submodule not added")
+    version_writer.touch_latest(payload.module_id, Stage.submodule, payload.version_id)
     return {"message": "Submodule added successfully", "submodule": payload.submodule}
 
 @router.post("/generate/activities")
@@ -491,8 +738,6 @@ def generate_activity(payload: ActivityRequest):
         activity_types=",".join(payload.activity_types),
         user_instructions=payload.user_instructions
     )
-    if isinstance(result_str, dict):
-        result_str = json.dumps(result_str)
     result = parse_result(result_str, ActivitySet)
 
     version_id = str(uuid.uuid4())  # Track version
@@ -500,35 +745,34 @@ def generate_activity(payload: ActivityRequest):
     for activity in result.activities:
         activity.activity_id = str(uuid.uuid4())
         activity_ids.append(activity.activity_id)
-    auto_tag_version(payload.submodule_id, version_id, Stage.activity, "initial-activity")
+    activity_doc = to_bson(result)
     activity_record = {
         "submodule_id": payload.submodule_id,
         "version_id": version_id,
-        "generated_activities": safe_bson(result),
+        "generated_activities": activity_doc,
         "activity_ids": activity_ids,
         "stage": "activity",
         "timestamp": datetime.now(timezone.utc)
     }
 
     try:
-        collection_activities.insert_one(activity_record)
+        version_writer.write_version(collection_activities, activity_record, payload.submodule_id, Stage.activity, "initial-activity")
         logger.info(f"Stored activities for submodule_id={payload.submodule_id} with version_id={version_id}")
     except Exception as e:
         logger.exception("Failed to store activities in MongoDB")
 
-    course_state[payload.submodule_id] = course_state.get(payload.submodule_id, {})
-    course_state[payload.submodule_id]["activities"] = result
     suggestions = get_stage_suggestions(Stage.activity, as_json(result))
-    return {
-        "result": result,
+    return trusted_response({
+        "result": activity_doc,
         "suggestions": suggestions,
         "version_id": version_id,
         "submodule_id": payload.submodule_id
-    }
+    })
 
 
 @router.post("/generate-reading-material", response_model=ReadingMaterialOut)
 def api_generate_reading(input: ReadingInput):
+    annotate({"course.stage": Stage.reading.value, "course.activity_id": input.activity_id})
     try:
         # Step 1: Generate reading material
         result, _ = generate_reading_material(
@@ -545,10 +789,14 @@ def api_generate_reading(input: ReadingInput):
             url=input.url
         )
 
-        # Step 2: Assign a version ID
+        # Step 2: Assign a version ID; keep the in-schema summary if it passes the checks
         version_id = str(uuid.uuid4())
+        summary = summary_strategy.decide("reading", result.reading_material_summary, result.reading_material)
+        result.reading_material_summary = summary.summary
+        annotate({"summary.path": summary.source["path"]})
 
         # Step 3: Prepare record for MongoDB
+        reading_doc = to_bson(result)
         reading_record = {
             "activity_name": input.activity_name,
             "activity_objective": input.activity_objective,
@@ -556,19 +804,24 @@ def api_generate_reading(input: ReadingInput):
             "activity_type": "Reading Material",
             "version_id": version_id,
             "activity_id": input.activity_id,
-            "reading_material": result.model_dump(),
+            "reading_material": reading_doc,
+            "summary_source": summary.source,
             "timestamp": datetime.now(timezone.utc),
             "stage": "reading"
         }
 
-        auto_tag_version(input.activity_id, version_id, Stage.reading, "initial-reading")
-        collection_content.insert_one(reading_record)
+        encode_document(reading_record)
+        version_writer.write_version(collection_content, reading_record, input.activity_id, Stage.reading, "initial-reading")
+        if summary.deferred:
+            summary_strategy.schedule("reading", result.reading_material, summary, store_post_response_summary(Stage.reading, input.activity_id, version_id))
 
         logger.info(f"Stored reading material for activity: {input.activity_name} with version_id: {version_id}")
 
-        # Step 5: Return generated reading
-        return result
+        # Step 5: Return generated reading (already validated; skip response_model re-validation)
+        return trusted_response(reading_doc)
 
+    except RequestAbandoned:
+        raise
     except Exception as e:
         logger.exception("Failed to generate or store reading material")
         raise HTTPException(status_code=500, detail=str(e))
@@ -577,6 +830,7 @@ def api_generate_reading(input: ReadingInput):
 
 @router.post("/generate-lecture-script", response_model=LectureScriptOut)
 def api_lecture(input: LectureInput):
+    annotate({"course.stage": Stage.lecture.value, "course.activity_id": input.activity_id})
     try:
         # Step 1: Generate script
         script, summaries, summary_text = generate_lecture_script(
@@ -594,11 +848,16 @@ def api_lecture(input: LectureInput):
             duration_minutes=input.duration_minutes if input.duration_minutes is not None else 0
         )
 
-        # Step 2: Prepare version ID
+        if isinstance(script, dict) and "error" in script:
+            raise ValueError(script["error"])
+
+        # Step 2: Prepare version ID; keep the in-schema summary if it passes the checks
         version_id = str(uuid.uuid4())
         script_text = script.get("lecture_script") if isinstance(script, dict) else script or ""
+        summary = summary_strategy.decide("lecture", summary_text, script_text)
+        summary_text = summary.summary
+        annotate({"summary.path": summary.source["path"]})
 
-        auto_tag_version(input.activity_id, version_id, Stage.lecture, "initial-lecture")
         lecture_record = {
             "activity_id": input.activity_id,
             "activity_name": input.activity_name,
@@ -609,21 +868,27 @@ def api_lecture(input: LectureInput):
             "lecture_script": script_text,
             "source_summaries": summaries,
             "lecture_script_summary": summary_text,
+            "summary_source": summary.source,
             "stage": "lecture",
             "timestamp": datetime.now(timezone.utc),
         }
 
         # Step 4: Insert to Mongo
-        collection_content.insert_one(lecture_record)
+        encode_document(lecture_record)
+        version_writer.write_version(collection_content, lecture_record, input.activity_id, Stage.lecture, "initial-lecture")
+        if summary.deferred:
+            summary_strategy.schedule("lecture", script_text, summary, store_post_response_summary(Stage.lecture, input.activity_id, version_id))
         logger.info(f"Stored lecture script for activity_id={input.activity_id} with version_id={version_id}")
 
         # Step 5: Return output
-        return LectureScriptOut(
+        return trusted_response(LectureScriptOut(
             lecture_script=script_text if script_text is not None else "",
             source_summaries=summaries if isinstance(summaries, list) else None,
             lecture_script_summary=summary_text
-        )
+        ))
 
+    except RequestAbandoned:
+        raise
     except Exception as e:
         logger.exception("Failed to generate or store lecture script")
         raise HTTPException(status_code=500, detail=str(e))
@@ -631,36 +896,66 @@ def api_lecture(input: LectureInput):
 
 @router.post("/generate-quiz", response_model=List[QuizOut])
 def api_generate_quiz(input: QuizInput):
+    annotate({"course.stage": Stage.quiz.value, "course.activity_id": input.activity_id})
     try:
-        # Step 1: Generate quiz
-        quiz_response = generate_quiz(
-            module_name=input.module_name,
-            submodule_name=input.submodule_name,
-            activity_name=input.activity_name,
-            activity_description=input.activity_description,
-            activity_objective=input.activity_objective,
-            material_summary=input.material_summary,
-            number_of_questions=input.number_of_questions,
-            quiz_type=input.quiz_type,
-            total_score=input.total_score,
-            user_prompt=input.user_prompt
-        )
-
-        if isinstance(quiz_response, dict) and "error" in quiz_response:
-            raise ValueError(quiz_response["error"])
-
-        # Step 2: Extract questions and assign question IDs if needed
-        quiz_list = quiz_response.get("questions") if isinstance(quiz_response, dict) else quiz_response
-        if quiz_list is None:
-            quiz_list = []
+        # Step 1: Draw from the question bank for this submodule and material
+        # Without material the key would lump unrelated quizzes together, so the bank is skipped
+        bankable = bool(input.material_summary.strip())
+        use_bank = input.use_question_bank and bankable
+        key = bank_key(input.submodule_id or f"{input.module_name}/{input.submodule_name}", input.quiz_type,
+                       input.material_summary, input.user_prompt, input.total_score)
+        # Questions this activity already had in earlier versions are neither drawn again nor regenerated
+        previous = previous_quiz_questions(input.activity_id)
+        banked = question_bank.draw(key, input.number_of_questions + len(previous)) if use_bank else []
+        banked = unique_questions(banked, existing=previous)[:input.number_of_questions]
+
+        # Step 2: Generate only the shortfall, steering away from the banked and earlier questions
+        generated = []
+        shortfall = input.number_of_questions - len(banked)
+        if shortfall > 0:
+            quiz_response = generate_quiz(
+                module_name=input.module_name,
+                submodule_name=input.submodule_name,
+                activity_name=input.activity_name,
+                activity_description=input.activity_description,
+                activity_objective=input.activity_objective,
+                material_summary=input.material_summary,
+                number_of_questions=shortfall,
+                quiz_type=input.quiz_type,
+                total_score=input.total_score,
+                user_prompt=input.user_prompt,
+                avoid_questions=[q["question"] for q in banked + previous],
+            )
+
+            if isinstance(quiz_response, dict) and "error" in quiz_response:
+                if not banked and not previous:
+                    raise ValueError(quiz_response["error"])
+                # Serve what the bank (or an earlier version) holds instead of failing the whole quiz
+                logger.warning(f"Quiz generation for activity_id={input.activity_id} returned nothing new")
+                quiz_response = {"questions": []}
+
+            generated = quiz_response.get("questions") if isinstance(quiz_response, dict) else quiz_response
+            generated = unique_questions(generated or [], existing=banked + previous)[:shortfall]
+        try:
+            # Best effort: the quiz is served either way
+            if generated and bankable:
+                question_bank.add(key, generated, input.activity_id)
+            question_bank.mark_served(key, banked)
+        except Exception:
+            logger.exception(f"Question bank update failed for activity_id={input.activity_id}")
+        # Nothing new at all: repeating an earlier version beats failing the request
+        repeated = previous[:input.number_of_questions] if not banked and not generated else []
+        shortfall = max(0, input.number_of_questions - len(banked) - len(generated) - len(repeated))
+        annotate({"quiz.bank_drawn": len(banked), "quiz.generated": len(generated), "quiz.shortfall": shortfall, "quiz.previous_questions": len(previous)})
+
+        # Banked questions first, then new ones, numbered in that order
+        quiz_list = [public_question(q) for q in banked + generated + repeated]
         for i, q in enumerate(quiz_list):
-            if not q.get("question_id"):
-                q["question_id"] = f"Q{i+1}"
+            q["question_id"] = f"Q{i+1}"
 
         # Step 3: Assign version ID
         version_id = str(uuid.uuid4())
 
-        auto_tag_version(input.activity_id, version_id, Stage.quiz, "initial-quiz")
         quiz_record = {
             "activity_name": input.activity_name,
             "activity_description": input.activity_description,
@@ -672,17 +967,20 @@ def api_generate_quiz(input: QuizInput):
             "quiz_questions": quiz_list,
             "number_of_questions": input.number_of_questions,
             "total_score": input.total_score,
+            "question_sources": {"bank": len(banked), "generated": len(generated), "repeated": len(repeated), "shortfall": shortfall},
             "stage": "quiz",
             "timestamp": datetime.now(timezone.utc)
         }
 
         # Step 5: Store in MongoDB
-        collection_content.insert_one(quiz_record)
+        version_writer.write_version(collection_content, quiz_record, input.activity_id, Stage.quiz, "initial-quiz")
         logger.info(f"Stored quiz for activity_id={input.activity_id} with version_id={version_id}")
 
         # Step 6: Return quiz list
-        return [QuizOut(**q) for q in quiz_list]
+        return trusted_response([QuizOut(**q) for q in quiz_list])
 
+    except RequestAbandoned:
+        raise
     except Exception as e:
         logger.exception("Failed to generate or store quiz")
         raise HTTPException(status_code=500, detail=str(e))
@@ -691,12 +989,11 @@ def api_generate_quiz(input: QuizInput):
 @router.post("/redo")
 def redo_any_stage(request: RedoRequest):
     logger.info(f"Redoing stage: {request.stage}")
+    annotate({"course.stage": request.stage.value})
     found_prev = request.prev_content
 
     # Step 1: Redo generation
     result_str = redo_stage(request.stage, prev_content=found_prev, user_message=request.user_message)
-    if isinstance(result_str, dict):
-        result_str = json.dumps(result_str)
 
     # Step 2: Schema mapping
     schema_map = {
@@ -718,10 +1015,9 @@ def redo_any_stage(request: RedoRequest):
     previous_version_id = found_prev.get("version_id")
     timestamp = datetime.now(timezone.utc)
 
-    identifier = (found_prev.get("course_id") or found_prev.get("module_id") or found_prev.get("submodule_id") or found_prev.get("activity_id"))
+    identifier = (found_prev.get(STAGE_ENTITY_KEYS[request.stage]) or found_prev.get("course_id") or found_prev.get("module_id") or found_prev.get("submodule_id") or found_prev.get("activity_id"))
     if identifier is None:
         raise HTTPException(status_code=400, detail="No valid identifier found for version tagging")
-    auto_tag_version(str(identifier), version_id, request.stage, f"redo-{request.stage.value}")
     try:
         record = {
             "version_id": version_id,
@@ -733,23 +1029,22 @@ def redo_any_stage(request: RedoRequest):
         if request.stage == Stage.outline:
             record.update({
                 "course_id": found_prev.get("course_id"),
-                "generated_outline": result.model_dump(),
+                "outline": result.model_dump(),
             })
-            collection_outline.insert_one(record)
 
         elif request.stage == Stage.module:
             record.update({
                 "course_id": found_prev.get("course_id"),
-                "modules": result.model_dump().get("modules", []),
+                "module_ids": [m.module_id for m in result.modules],
+                "generated_modules": result.model_dump(),
             })
-            collection_modules.insert_one(record)
 
         elif request.stage == Stage.submodule:
             record.update({
                 "module_id": found_prev.get("module_id"),
-                "submodules": result.model_dump().get("submodules", []),
+                "submodule_ids": [sm.submodule_id for sm in result.submodules],
+                "generated_submodules": result.model_dump(),
             })
-            collection_submodules.insert_one(record)
 
         elif request.stage == Stage.activity:
             activity_ids = [str(uuid.uuid4()) for _ in result.activities]
@@ -757,10 +1052,9 @@ def redo_any_stage(request: RedoRequest):
                 a.activity_id = activity_ids[i]
             record.update({
                 "submodule_id": found_prev.get("submodule_id"),
-                "activities": result.model_dump().get("activities", []),
+                "generated_activities": result.model_dump(),
                 "activity_ids": activity_ids,
             })
-            collection_activities.insert_one(record)
 
         elif request.stage == Stage.reading:
             record.update({
@@ -771,7 +1065,6 @@ def redo_any_stage(request: RedoRequest):
                 "activity_type": "Reading Material",
                 "reading_material": result.model_dump(),
             })
-            collection_content.insert_one(record)
 
         elif request.stage == Stage.lecture:
             record.update({
@@ -780,9 +1073,10 @@ def redo_any_stage(request: RedoRequest):
                 "activity_description": found_prev.get("activity_description"),
                 "activity_objective": found_prev.get("activity_objective"),
                 "activity_type": "Lecture",
-                "lecture_script": result.model_dump(),
+                "lecture_script": result.lecture_script,
+                "source_summaries": result.source_summaries,
+                "lecture_script_summary": result.lecture_script_summary,
             })
-            collection_content.insert_one(record)
 
         elif request.stage == Stage.quiz:
             record.update({
@@ -793,8 +1087,12 @@ def redo_any_stage(request: RedoRequest):
                 "activity_type": "Quiz",
                 "quiz": result.model_dump(),
             })
-            collection_content.insert_one(record)
 
+        target_collection = STAGE_COLLECTIONS[request.stage]
+        if target_collection is collection_content:
+            encode_document(record)
+        record = version_store.encode_delta(target_collection, record, previous_version_id)
+        version_writer.write_version(target_collection, record, str(identifier), request.stage, f"redo-{request.stage.value}")
         logger.info(f"Stored redo result for stage {request.stage} with version_id={version_id}")
 
     except Exception as e:
@@ -804,12 +1102,12 @@ def redo_any_stage(request: RedoRequest):
     # Step 5: Return updated result + suggestions
     suggestions = get_stage_suggestions(request.stage, as_json(result))
 
-    return {
+    return trusted_response({
         "result": result,
         "suggestions": suggestions,
         "version_id": version_id,
         "previous_version_id": previous_version_id
-    }
+    })
 
    
 # Add this near the top with other Mongo collections
@@ -820,16 +1118,7 @@ collection_latest_versions = db["latest_versions"]
 def rollback_version(stage: Stage, version_id: str):
     try:
         # Step 1: Identify the correct collection
-        collection_map = {
-            Stage.outline: collection_outline,
-            Stage.module: collection_modules,
-            Stage.submodule: collection_submodules,
-            Stage.activity: collection_activities,
-            Stage.reading: collection_content,
-            Stage.lecture: collection_content,
-            Stage.quiz: collection_content,
-        }
-        target_collection = collection_map.get(stage)
+        target_collection = STAGE_COLLECTIONS.get(stage)
         if target_collection is None:
             raise HTTPException(status_code=400, detail="Unsupported stage for rollback")
 
@@ -838,30 +1127,26 @@ def rollback_version(stage: Stage, version_id: str):
         if not old_version:
             raise HTTPException(status_code=404, detail="Version not found")
 
-        # Step 3: Prepare a new version document
+        # Step 3: Prepare a new version document (metadata only; the body is shared by reference)
         new_version_id = str(uuid.uuid4())
+        old_version = version_store.snapshot(old_version)
         old_version["previous_version_id"] = version_id
         old_version["version_id"] = new_version_id
         old_version["timestamp"] = datetime.now(timezone.utc)
         old_version["copied_from_version_id"] = version_id
+        old_version["parent_version_id"] = version_id
         del old_version["_id"]  # Let Mongo assign a new ID
 
         identifier = (
+            old_version.get(STAGE_ENTITY_KEYS[stage]) or
             old_version.get("course_id") or
             old_version.get("module_id") or
             old_version.get("submodule_id") or
             old_version.get("activity_id")
         )
 
-        auto_tag_version(identifier, new_version_id, stage, f"rollback-{stage.value}")
-        target_collection.insert_one(old_version)
-        old_version["parent_version_id"] = version_id
-        # Step 5: Update latest version pointer
-        collection_latest_versions.update_one(
-            {"entity_id": identifier, "stage": stage.value},
-            {"$set": {"latest_version_id": new_version_id}},
-            upsert=True
-        )
+        # Step 4: Store the copy, its tag and the latest version pointer together
+        version_writer.write_version(target_collection, old_version, identifier, stage, f"rollback-{stage.value}")
 
         logger.info(f"Rollback complete: {stage.value} reverted to version {version_id} as new {new_version_id}")
 
@@ -878,17 +1163,7 @@ def rollback_version(stage: Stage, version_id: str):
 def branch_version(request: BranchRequest):
     logger.info(f"Branching from version: {request.version_id} at stage: {request.stage}")
     
-    collection_map = {
-        Stage.outline: collection_outline,
-        Stage.module: collection_modules,
-        Stage.submodule: collection_submodules,
-        Stage.activity: collection_activities,
-        Stage.reading: collection_content,
-        Stage.lecture: collection_content,
-        Stage.quiz: collection_content,
-    }
-    
-    target_collection = collection_map.get(request.stage)
+    target_collection = STAGE_COLLECTIONS.get(request.stage)
     if target_collection is None:
         raise HTTPException(status_code=400, detail="Unsupported stage for branching")
     
@@ -897,9 +1172,9 @@ def branch_version(request: BranchRequest):
     if not existing_version:
         raise HTTPException(status_code=404, detail="Version not found")
     
-    # Create new branch
+    # Create new branch (metadata only; the body is shared by reference)
     new_version_id = str(uuid.uuid4())
-    branch_data = dict(existing_version)
+    branch_data = version_store.snapshot(existing_version)
     branch_data["version_id"] = new_version_id
     branch_data["parent_version_id"] = request.version_id
     branch_data["timestamp"] = datetime.now(timezone.utc)
@@ -908,11 +1183,8 @@ def branch_version(request: BranchRequest):
     if "_id" in branch_data:
         del branch_data["_id"]
     
-    # Insert new branch
-    target_collection.insert_one(branch_data)
-    
-    # Auto-tag the new branch
     identifier = (
+        branch_data.get(STAGE_ENTITY_KEYS[request.stage]) or
         branch_data.get("course_id") or 
         branch_data.get("module_id") or 
         branch_data.get("submodule_id") or 
@@ -920,7 +1192,9 @@ def branch_version(request: BranchRequest):
     )
     if identifier is None:
         raise HTTPException(status_code=400, detail="No valid identifier found for version tagging")
-    auto_tag_version(str(identifier), new_version_id, request.stage, "branch")
+
+    # Insert new branch with its tag
+    version_writer.write_version(target_collection, branch_data, str(identifier), request.stage, "branch")
     
     return {
         "message": "Branch created successfully",
@@ -929,62 +1203,382 @@ def branch_version(request: BranchRequest):
         "stage": request.stage.value
     }
 
+def _version_history_sources(entity_id: str, stage: Optional[Stage], limit: int, cursor: Optional[str] = None):
+    stages = [stage] if stage else list(Stage)
+
+    # Group stages by collection so content (reading/lecture/quiz) is queried once
+    grouped: Dict[str, List[Stage]] = {}
+    for stg in stages:
+        grouped.setdefault(STAGE_COLLECTIONS[stg].name, []).append(stg)
+
+    sources = []
+    for stg_list in grouped.values():
+        coll = STAGE_COLLECTIONS[stg_list[0]]
+        match: Dict[str, Any] = {STAGE_ENTITY_KEYS[stg_list[0]]: entity_id}
+        if coll.name == collection_content.name:
+            match["stage"] = {"$in": [s.value for s in stg_list]}
+        match.update(keyset_filter(cursor))
+
+        pipeline = [
+            {"$match": match},
+            {"$sort": dict(KEYSET_SORT)},
+            {"$limit": limit},
+            {"$lookup": {
+                "from": collection_version_tags.name,
+                "localField": "version_id",
+                "foreignField": "version_id",
+                "as": "tags"
+            }},
+            {"$project": {
+                "version_id": 1,
+                "parent_version_id": 1,
+                "timestamp": 1,
+                "stage": {"$ifNull": ["$stage", stg_list[0].value]},
+                "tag": {"$arrayElemAt": ["$tags.tag", 0]}
+            }}
+        ]
+        sources.append(coll.aggregate(pipeline))
+    return sources
+
+def _version_history_item(doc: dict) -> dict:
+    return {
+        "version_id": doc["version_id"],
+        "parent_version_id": doc.get("parent_version_id"),
+        "timestamp": doc["timestamp"],
+        "stage": doc["stage"],
+        "tag": doc.get("tag")
+    }
+
+def _version_history_etag(entity_id: str, stage: Optional[Stage], *view) -> str:
+    # Every new version (and every in-place edit) moves a latest pointer, so the
+    # pointers alone tell whether the history changed.
+    query: Dict[str, Any] = {"entity_id": entity_id}
+    if stage:
+        query["stage"] = stage.value
+    pointers = collection_latest_versions.find(query, {"_id": 0, "stage": 1, "latest_version_id": 1, "timestamp": 1}).sort("stage", 1)
+    return make_etag("versions", entity_id, stage, *[(p["stage"], p["latest_version_id"], p.get("timestamp")) for p in pointers], *view)
+
 # Add version history endpoint
 @router.get("/versions", response_model=List[VersionHistoryResponse])
 def get_version_history(
     entity_id: str = Query(..., description="Course/Module/Submodule/Activity ID"),
-    stage: Optional[Stage] = Query(None, description="Filter by stage")
+    stage: Optional[Stage] = Query(None, description="Filter by stage"),
+    limit: int = Query(200, ge=1, le=1000, description="Maximum number of versions to return"),
+    if_none_match: Optional[str] = Header(None)
 ):
-    collections = []
-    if stage:
-        collections = [(stage, {
-            Stage.outline: collection_outline,
-            Stage.module: collection_modules,
-            Stage.submodule: collection_submodules,
-            Stage.activity: collection_activities,
-            Stage.reading: collection_content,
-            Stage.lecture: collection_content,
-            Stage.quiz: collection_content,
-        }.get(stage))]
-    else:
-        collections = [
-            (Stage.outline, collection_outline),
-            (Stage.module, collection_modules),
-            (Stage.submodule, collection_submodules),
-            (Stage.activity, collection_activities),
-            (Stage.reading, collection_content),
-            (Stage.lecture, collection_content),
-            (Stage.quiz, collection_content),
+    cache_control = cache_control_for(False)
+    etag = _version_history_etag(entity_id, stage, limit)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, cache_control)
+
+    # Each collection is already sorted newest-first; merge and cap
+    page = KeysetPage(_version_history_sources(entity_id, stage, limit), limit)
+    return trusted_response([_version_history_item(doc) for doc in page], headers=cache_headers(etag, cache_control))
+
+@router.get("/versions/page")
+def get_version_history_page(
+    entity_id: str = Query(..., description="Course/Module/Submodule/Activity ID"),
+    stage: Optional[Stage] = Query(None, description="Filter by stage"),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    if_none_match: Optional[str] = Header(None)
+):
+    cache_control = cache_control_for(False)
+    etag = _version_history_etag(entity_id, stage, limit, cursor, format)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, cache_control)
+
+    sources = _version_history_sources(entity_id, stage, limit + 1, cursor)
+    result = page_response(KeysetPage(sources, limit), _version_history_item, format)
+    if isinstance(result, Response):
+        set_cache_headers(result, etag, cache_control)
+        return result
+    return trusted_response(result, headers=cache_headers(etag, cache_control))
+
+# Flattened audience filters stored on course input records (see generate_outline)
+COURSE_LIST_FILTERS = [
+    "audience_type",
+    "audience_grade",
+    "audience_english_level",
+    "audience_math_level",
+    "audience_specialization",
+    "audience_country",
+]
+
+def _course_list_item(doc: dict) -> dict:
+    user_input = doc.get("user_input", {})
+    item = {
+        "course_id": doc.get("course_id"),
+        "title": user_input.get("title"),
+        "description": user_input.get("description"),
+        "timestamp": doc.get("timestamp"),
+    }
+    item.update({f: user_input.get(f) for f in COURSE_LIST_FILTERS})
+    return item
+
+@router.get("/courses")
+def list_courses(
+    audience_type: Optional[str] = None,
+    audience_grade: Optional[str] = None,
+    audience_english_level: Optional[str] = None,
+    audience_math_level: Optional[str] = None,
+    audience_specialization: Optional[str] = None,
+    audience_country: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    format: str = Query("json", pattern="^(json|ndjson)$")
+):
+    filters = {
+        "audience_type": audience_type,
+        "audience_grade": audience_grade,
+        "audience_english_level": audience_english_level,
+        "audience_math_level": audience_math_level,
+        "audience_specialization": audience_specialization,
+        "audience_country": audience_country,
+    }
+    match: Dict[str, Any] = {f"user_input.{k}": v for k, v in filters.items() if v is not None}
+    match.update(keyset_filter(cursor))
+
+    projection = {"course_id": 1, "timestamp": 1, "user_input.title": 1, "user_input.description": 1}
+    projection.update({f"user_input.{f}": 1 for f in COURSE_LIST_FILTERS})
+
+    docs = collection_input.find(match, projection).sort(KEYSET_SORT).limit(limit + 1)
+    result = page_response(KeysetPage([docs], limit), _course_list_item, format)
+    return result if isinstance(result, Response) else trusted_response(result)
+
+# ----------------------------- Course Tree -----------------------------
+
+TREE_LEVELS = ["outline", "modules", "submodules", "activities", "content"]
+# Nested levels are only reachable through their parent's version document
+TREE_PARENTS = {"submodules": "modules", "activities": "submodules", "content": "activities"}
+# Where a version document lists its children's ids: edited item array, legacy array, blob-backed id list
+TREE_CHILD_PATHS = {
+    "modules": ("generated_modules.modules.module_id", "modules.module_id", "module_ids"),
+    "submodules": ("generated_submodules.submodules.submodule_id", "submodules.submodule_id", "submodule_ids"),
+    "activities": ("generated_activities.activities.activity_id", "activities.activity_id", "activity_ids"),
+}
+CONTENT_STAGES = [Stage.reading, Stage.lecture, Stage.quiz]
+# Left out of the meta view; "storage" is kept so blob-backed versions can be materialized first
+CONTENT_HEAVY_FIELDS = list(COMPRESSED_FIELDS) + ["quiz_questions", "quiz"]
+
+def _latest_lookup(local_field: str, stages: List[Stage], source, as_field: str, inner: Optional[List[dict]] = None) -> dict:
+    # Join entity ids -> latest_versions pointer -> the versioned document it points at
+    return {"$lookup": {
+        "from": collection_latest_versions.name,
+        "localField": local_field,
+        "foreignField": "entity_id",
+        "pipeline": [
+            {"$match": {"stage": {"$in": [s.value for s in stages]}}},
+            {"$lookup": {
+                "from": source.name,
+                "localField": "latest_version_id",
+                "foreignField": "version_id",
+                "pipeline": [{"$project": {"_id": 0}}] + (inner or []),
+                "as": "doc"
+            }},
+            {"$unwind": "$doc"},
+            {"$replaceRoot": {"newRoot": {"$mergeObjects": [
+                "$doc",
+                {"_pointer": {"entity_id": "$entity_id", "stage": "$stage", "version_id": "$latest_version_id", "ts": "$timestamp"}}
+            ]}}}
+        ],
+        "as": as_field
+    }}
+
+def _child_ids(*paths: str) -> dict:
+    # Prefer ids from the (possibly edited) item array; blob-backed versions only carry the id list inline
+    expr: Any = f"${paths[-1]}"
+    for path in reversed(paths[:-1]):
+        expr = {"$ifNull": [f"${path}", expr]}
+    return {"$addFields": {"_child_ids": {"$ifNull": [expr, []]}}}
+
+def course_tree_pipeline(course_id: str, levels: List[str], full_content: bool) -> List[dict]:
+    inner: List[dict] = []
+    if "content" in levels:
+        content_inner = [] if full_content else [{"$project": {f: 0 for f in CONTENT_HEAVY_FIELDS}}]
+        inner = [
+            _child_ids(*TREE_CHILD_PATHS["activities"]),
+            _latest_lookup("_child_ids", CONTENT_STAGES, collection_content, "content", content_inner)
         ]
-    
-    history = []
-    for stg, coll in collections:
-        if coll is None:
-            continue
-        # Find all versions for this entity
-        cursor = coll.find({
-            "$or": [
-                {"course_id": entity_id},
-                {"module_id": entity_id},
-                {"submodule_id": entity_id},
-                {"activity_id": entity_id}
-            ]
-        }, {"_id": 0, "version_id": 1, "parent_version_id": 1, "timestamp": 1})
-        
-        for doc in cursor:
-            # Get tag if exists
-            tag_doc = collection_version_tags.find_one({"version_id": doc["version_id"]})
-            tag = tag_doc["tag"] if tag_doc else None
-            
-            history.append(VersionHistoryResponse(
-                version_id=doc["version_id"],
-                parent_version_id=doc.get("parent_version_id"),
-                timestamp=doc["timestamp"],
-                stage=stg,
-                tag=tag
-            ))
-    
-    # Sort by timestamp descending
-    history.sort(key=lambda x: x.timestamp, reverse=True)
-    
-    return history
+    if "activities" in levels:
+        inner = [
+            _child_ids(*TREE_CHILD_PATHS["submodules"]),
+            _latest_lookup("_child_ids", [Stage.activity], collection_activities, "activities", inner)
+        ]
+    if "submodules" in levels:
+        inner = [
+            _child_ids(*TREE_CHILD_PATHS["modules"]),
+            _latest_lookup("_child_ids", [Stage.submodule], collection_submodules, "submodules", inner)
+        ]
+
+    pipeline: List[dict] = [
+        {"$match": {"course_id": course_id}},
+        {"$limit": 1},
+        {"$project": {"_id": 0, "course_id": 1, "title": "$user_input.title"}},
+    ]
+    if "outline" in levels:
+        pipeline.append(_latest_lookup("course_id", [Stage.outline], collection_outline, "outline"))
+    if "modules" in levels:
+        pipeline.append(_latest_lookup("course_id", [Stage.module], collection_modules, "modules", inner))
+    return pipeline
+
+def _child_id_values(doc: dict, paths: tuple) -> List[str]:
+    # Python side of _child_ids: the first path that resolves wins, even to an empty list
+    for path in paths:
+        head, _, leaf = path.rpartition(".")
+        value: Any = doc
+        for part in head.split(".") if head else []:
+            value = value.get(part) if isinstance(value, dict) else None
+        if not head:
+            value = value.get(leaf)
+            if value is not None:
+                return list(value)
+        elif isinstance(value, list):
+            return [item[leaf] for item in value if isinstance(item, dict) and leaf in item]
+    return []
+
+def course_tree_pointers(course_id: str, levels: List[str]) -> Optional[List[tuple]]:
+    # The latest pointers course_tree_pipeline would visit, from pointer reads and child-id
+    # projections only (no bodies, no $lookup), so a matching If-None-Match costs little
+    if collection_input.find_one({"course_id": course_id}, {"_id": 1}) is None:
+        return None
+    pointers: List[tuple] = []
+
+    def visit(entity_ids: List[str], stages: List[Stage], source, child_level: Optional[str]) -> List[str]:
+        if not entity_ids:
+            return []
+        found = list(collection_latest_versions.find(
+            {"entity_id": {"$in": entity_ids}, "stage": {"$in": [s.value for s in stages]}},
+            {"_id": 0, "entity_id": 1, "stage": 1, "latest_version_id": 1, "timestamp": 1}
+        ))
+        paths = TREE_CHILD_PATHS[child_level] if child_level else ()
+        docs = {d["version_id"]: d for d in source.find(
+            {"version_id": {"$in": [p["latest_version_id"] for p in found]}},
+            {"_id": 0, "version_id": 1, **{path: 1 for path in paths}}
+        )} if found else {}
+        children: List[str] = []
+        for p in found:
+            doc = docs.get(p["latest_version_id"])
+            if doc is None:
+                continue
+            pointers.append((p["entity_id"], p["stage"], p["latest_version_id"], str(p.get("timestamp"))))
+            children.extend(_child_id_values(doc, paths))
+        return children
+
+    if "outline" in levels:
+        visit([course_id], [Stage.outline], collection_outline, None)
+    if "modules" in levels:
+        module_ids = visit([course_id], [Stage.module], collection_modules, "modules" if "submodules" in levels else None)
+        submodule_ids = visit(module_ids, [Stage.submodule], collection_submodules, "submodules" if "activities" in levels else None)
+        activity_ids = visit(submodule_ids, [Stage.activity], collection_activities, "activities" if "content" in levels else None)
+        visit(activity_ids, CONTENT_STAGES, collection_content, None)
+    return pointers
+
+def tree_etag(course_id: str, pointers: List[tuple], levels: List[str], content: str) -> str:
+    # Composite ETag over every latest pointer (edits bump the pointer timestamp) and the requested shape
+    return make_etag("tree", course_id, *sorted(set(pointers), key=str), levels, content)
+
+def _tree_version(doc: dict, pointers: List[tuple], full_content: bool = False) -> dict:
+    pointer = doc.pop("_pointer", {})
+    doc.pop("_child_ids", None)
+    pointers.append((pointer.get("entity_id"), pointer.get("stage"), pointer.get("version_id"), str(pointer.get("ts"))))
+    if pointer.get("stage") in [s.value for s in CONTENT_STAGES] and not full_content:
+        # Same meta fields whether the body is inline or in a blob
+        doc = version_store.materialize(doc)
+        for field in CONTENT_HEAVY_FIELDS:
+            doc.pop(field, None)
+        return doc
+    doc = version_store.materialize(doc)
+    return decode_document(doc) if full_content else doc
+
+def _items(doc: dict, *paths: str) -> List[dict]:
+    for path in paths:
+        value: Any = doc
+        for part in path.split("."):
+            value = value.get(part) if isinstance(value, dict) else None
+        if value is not None:
+            return value
+    return []
+
+def build_course_tree(root: dict, full_content: bool) -> tuple[dict, List[tuple]]:
+    pointers: List[tuple] = []
+    tree: Dict[str, Any] = {"course_id": root["course_id"], "title": root.get("title")}
+
+    if "outline" in root:
+        outline_docs = [_tree_version(d, pointers) for d in root["outline"]]
+        tree["outline"] = outline_docs[0] if outline_docs else None
+
+    if "modules" in root:
+        modules_doc = _tree_version(root["modules"][0], pointers) if root["modules"] else None
+        if modules_doc is None:
+            tree["modules"] = None
+            return tree, pointers
+
+        submodule_docs = {d.get("module_id"): d for d in (_tree_version(x, pointers) for x in modules_doc.pop("submodules", []) if isinstance(x, dict) and "_pointer" in x)}
+        modules = []
+        for module in _items(modules_doc, "generated_modules.modules", "modules"):
+            node = dict(module)
+            sub_doc = submodule_docs.get(module.get("module_id"))
+            if sub_doc is not None:
+                activity_docs = {d.get("submodule_id"): d for d in (_tree_version(x, pointers) for x in sub_doc.pop("activities", []) if isinstance(x, dict) and "_pointer" in x)}
+                submodules = []
+                for submodule in _items(sub_doc, "generated_submodules.submodules", "submodules"):
+                    sub_node = dict(submodule)
+                    act_doc = activity_docs.get(submodule.get("submodule_id"))
+                    if act_doc is not None:
+                        content_docs = [_tree_version(x, pointers, full_content) for x in act_doc.pop("content", []) if isinstance(x, dict) and "_pointer" in x]
+                        activities = []
+                        for activity in _items(act_doc, "generated_activities.activities", "activities"):
+                            act_node = dict(activity)
+                            act_node["content"] = [c for c in content_docs if c.get("activity_id") == activity.get("activity_id")]
+                            activities.append(act_node)
+                        sub_node["activities"] = {"version_id": act_doc.get("version_id"), "items": activities}
+                    submodules.append(sub_node)
+                node["submodules"] = {
+                    "version_id": sub_doc.get("version_id"),
+                    "suggestions": sub_doc.get("suggestions_submodules", []),
+                    "items": submodules
+                }
+            modules.append(node)
+
+        tree["modules"] = {
+            "version_id": modules_doc.get("version_id"),
+            "suggestions": modules_doc.get("suggestions_modules", []),
+            "items": modules
+        }
+    return tree, pointers
+
+@router.get("/tree")
+def get_course_tree(
+    course_id: str,
+    fields: str = Query(",".join(TREE_LEVELS), description="Comma-separated levels to include (a nested level brings its parents): " + ", ".join(TREE_LEVELS)),
+    content: str = Query("meta", pattern="^(meta|full)$", description="'full' includes reading/lecture/quiz bodies"),
+    if_none_match: Optional[str] = Header(None)
+):
+    levels = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = set(levels) - set(TREE_LEVELS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown tree fields: {sorted(unknown)}")
+    for level in reversed(TREE_LEVELS):
+        if level in levels and TREE_PARENTS.get(level) and TREE_PARENTS[level] not in levels:
+            levels.append(TREE_PARENTS[level])
+    levels = [level for level in TREE_LEVELS if level in levels]
+    full_content = content == "full"
+    cache_control = cache_control_for(False)
+
+    # Revalidation first: a 304 should skip the aggregation, not just the response body
+    if if_none_match:
+        pointers = course_tree_pointers(course_id, levels)
+        if pointers is None:
+            raise HTTPException(status_code=404, detail="Course not found")
+        etag = tree_etag(course_id, pointers, levels, content)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag, cache_control)
+
+    root = next(collection_input.aggregate(course_tree_pipeline(course_id, levels, full_content)), None)
+    if root is None:
+        raise HTTPException(status_code=404, detail="Course not found")
+    tree, pointers = build_course_tree(root, full_content)
+    etag = tree_etag(course_id, pointers, levels, content)
+    return trusted_response(tree, headers=cache_headers(etag, cache_control))
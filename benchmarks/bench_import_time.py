@@ -0,0 +1,92 @@
+# benchmarks/bench_import_time.py
+#
+# Cold-start cost of the service: wall time of `import main` in fresh interpreters,
+# the slowest modules by cumulative import time (python -X importtime), and which
+# heavy dependencies got loaded eagerly.
+#
+#   python benchmarks/bench_import_time.py
+#   python benchmarks/bench_import_time.py --runs 20 --module api --top 25
+#
+# Each run is a new subprocess, so .pyc files are warm but nothing is in sys.modules.
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY = ["google.genai", "google.genai.types", "PyPDF2", "bs4", "requests", "pymongo", "opentelemetry.sdk"]
+
+TIMED_IMPORT = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env.setdefault("GEMINI_API_KEY", "import-benchmark-not-used")
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+def timed_imports(module: str, runs: int) -> dict:
+    seconds: List[float] = []
+    loaded: List[str] = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", TIMED_IMPORT.format(module=module, heavy=HEAVY)],
+            cwd=ROOT, env=_env(), capture_output=True, text=True, check=True,
+        )
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        seconds.append(result["seconds"])
+        loaded = result["loaded"]
+    return {
+        "runs": runs,
+        "median_ms": round(statistics.median(seconds) * 1000, 1),
+        "min_ms": round(min(seconds) * 1000, 1),
+        "max_ms": round(max(seconds) * 1000, 1),
+        "heavy_loaded": loaded,
+    }
+
+def slowest_modules(module: str, top: int) -> List[dict]:
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=_env(), capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append({"module": name, "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000, "depth": len(indent) // 2})
+    # Top-level entries only (depth 0/1) so nested modules do not crowd the list
+    rows = [r for r in rows if r["depth"] <= 1]
+    return sorted(rows, key=lambda r: r["cumulative_ms"], reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure service import time")
+    parser.add_argument("--module", default="main", help="module to import (main, api, ...)")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    summary = timed_imports(args.module, args.runs)
+    print(f"import {args.module}: median {summary['median_ms']} ms "
+          f"(min {summary['min_ms']}, max {summary['max_ms']}, {summary['runs']} runs)")
+    print(f"heavy dependencies loaded at import: {', '.join(summary['heavy_loaded']) or 'none'}")
+    print()
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for row in slowest_modules(args.module, args.top):
+        print(f"{row['cumulative_ms']:>14.1f} {row['self_ms']:>9.1f}  {row['module']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# benchmarks/bench_serialization.py
+#
+# CPU cost of turning handler results into response bytes and prompt context.
+#
+#   python benchmarks/bench_serialization.py
+#   python benchmarks/bench_serialization.py --activities 400 --paragraphs 40
+#
+# "stdlib" is the previous path: response_model re-validation (where the route
+# declared one), jsonable_encoder, then JSONResponse's json.dumps.
+# "orjson" is the trusted_response path used by the routes now.
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+from course_content_generator import LectureScriptOut  # noqa: E402
+from genai_logic import Activity, ActivitySet  # noqa: E402
+from serialization import dumps_compact, trusted_response, to_bson  # noqa: E402
+
+WORDS = (
+    "model gradient loss function neural network layer activation dataset training validation "
+    "learning rate optimizer example analogy concept objective summary regression classification"
+).split()
+
+def _sentence(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n)) + "."
+
+def activity_set(count: int, seed: int = 7) -> ActivitySet:
+    rng = random.Random(seed)
+    return ActivitySet(activities=[
+        Activity(
+            activity_id=str(uuid.UUID(int=rng.getrandbits(128))),
+            activity_name=_sentence(rng, 5),
+            activity_description=_sentence(rng, 60),
+            activity_objective=_sentence(rng, 25),
+            activity_type=rng.choice(["Lecture", "Quiz", "Reading Material", "Assignment"])
+        )
+        for _ in range(count)
+    ])
+
+def lecture(paragraphs: int, seed: int = 7) -> LectureScriptOut:
+    rng = random.Random(seed)
+    return LectureScriptOut(
+        lecture_script="\n\n".join(_sentence(rng, 120) for _ in range(paragraphs)),
+        source_summaries=[_sentence(rng, 80) for _ in range(8)],
+        lecture_script_summary=_sentence(rng, 150)
+    )
+
+def timed(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--activities", type=int, default=200)
+    parser.add_argument("--paragraphs", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    activities = activity_set(args.activities)
+    script = lecture(args.paragraphs)
+    lecture_adapter = TypeAdapter(LectureScriptOut)
+
+    cases = {
+        "activities response": (
+            lambda: JSONResponse(jsonable_encoder({"result": activities, "suggestions": [], "version_id": "v"})).body,
+            lambda: trusted_response({"result": to_bson(activities), "suggestions": [], "version_id": "v"}).body,
+        ),
+        "lecture response": (
+            lambda: JSONResponse(jsonable_encoder(lecture_adapter.validate_python(script))).body,
+            lambda: trusted_response(script).body,
+        ),
+        "activities prompt context": (
+            lambda: json.dumps(activities.model_dump(), indent=2),
+            lambda: dumps_compact(activities),
+        ),
+    }
+
+    print(f"{args.activities} activities, lecture of {len(script.lecture_script)} chars, median of {args.repeat} runs")
+    print(f"{'case':<28}{'stdlib us':>12}{'orjson us':>12}{'speedup':>10}{'stdlib B':>11}{'orjson B':>11}")
+    for name, (old, new) in cases.items():
+        old_us, new_us = timed(old, args.repeat), timed(new, args.repeat)
+        old_size, new_size = len(old()), len(new())
+        print(f"{name:<28}{old_us:>12.1f}{new_us:>12.1f}{old_us / new_us:>9.1f}x{old_size:>11}{new_size:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# benchmarks/bench_storage_codec.py
+#
+# Size and latency tradeoffs of the content codecs in storage_codec.py.
+#
+#   python benchmarks/bench_storage_codec.py                 # synthetic lecture/reading text
+#   python benchmarks/bench_storage_codec.py --from-mongo    # sample real documents from MONGO_URI
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import storage_codec  # noqa: E402
+
+WORDS = (
+    "model gradient loss function neural network layer activation dataset training validation "
+    "learning rate optimizer example analogy concept objective summary regression classification "
+    "vector matrix probability distribution feature embedding transformer attention token"
+).split()
+
+def synthetic_texts(count: int, paragraphs: int, seed: int = 7):
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        parts = []
+        for p in range(paragraphs):
+            parts.append(f"## Segment {p + 1} [{p * 2:02d}:00]")
+            parts.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(60, 140))) + ".")
+            parts.append("**Speaker notes:** " + " ".join(rng.choice(WORDS) for _ in range(25)))
+        texts.append("\n\n".join(parts))
+    return texts
+
+def mongo_texts(limit: int):
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    load_dotenv()
+    content = MongoClient(os.getenv("MONGO_URI"))[os.getenv("MONGO_DB_NAME", "corgen")]["content"]
+    return [s.decode("utf-8") for s in storage_codec._text_samples(content, limit)]
+
+def bench(codec: str, texts, repeat: int):
+    encoded = [storage_codec.compress_text(t, codec) for t in texts]
+    enc_times, dec_times = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for t in texts:
+            storage_codec.compress_text(t, codec)
+        enc_times.append((time.perf_counter() - start) / len(texts))
+        start = time.perf_counter()
+        for e in encoded:
+            storage_codec.decompress_text(e)
+        dec_times.append((time.perf_counter() - start) / len(texts))
+
+    raw = sum(len(t.encode("utf-8")) for t in texts)
+    packed = sum(len(e["data"]) for e in encoded)
+    return {
+        "codec": codec,
+        "raw_kb": raw / 1024,
+        "stored_kb": packed / 1024,
+        "ratio": raw / packed if packed else 0.0,
+        "encode_us": statistics.median(enc_times) * 1e6,
+        "decode_us": statistics.median(dec_times) * 1e6,
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--from-mongo", action="store_true")
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--paragraphs", type=int, default=12)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    texts = mongo_texts(args.docs) if args.from_mongo else synthetic_texts(args.docs, args.paragraphs)
+    texts = [t for t in texts if storage_codec.worth_compressing(t)] or texts
+
+    codecs = ["zlib:1"]
+    if storage_codec.zstandard is not None:
+        codecs.append("zstd:1")
+        codecs += [f"zstd:1:{d}" for d in storage_codec.available_dictionaries()]
+
+    print(f"{len(texts)} texts, median {statistics.median(len(t) for t in texts)} chars")
+    print(f"{'codec':<24}{'raw KB':>10}{'stored KB':>12}{'ratio':>8}{'enc us/doc':>13}{'dec us/doc':>13}")
+    for codec in codecs:
+        r = bench(codec, texts, args.repeat)
+        print(f"{r['codec']:<24}{r['raw_kb']:>10.1f}{r['stored_kb']:>12.1f}{r['ratio']:>8.2f}{r['encode_us']:>13.1f}{r['decode_us']:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
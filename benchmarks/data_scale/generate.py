@@ -0,0 +1,278 @@
+# benchmarks/data_scale/generate.py
+#
+# Fills a Mongo database with synthetic courses in the shapes api.py writes, until it
+# holds the requested number of versions (outline, module, submodule, activity and
+# reading/lecture/quiz records), each with its version tag and latest pointer.
+#
+#   python benchmarks/data_scale/generate.py --versions 1000
+#   python benchmarks/data_scale/generate.py --versions 1000000 --db corgen_scale_1m --drop
+#
+# Redo chains are heavy-tailed (most entities have one or two versions, a few have
+# dozens), which is what makes the per-entity history scans interesting. Only a
+# fraction of activities get generated content (--content-ratio); content bodies
+# go through storage_codec like real writes. Redo versions are stored in full
+# rather than as version_store deltas, so reads never touch version_blobs.
+# Indexes from db_indexes.py are built after loading unless --no-indexes.
+
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(os.path.dirname(HERE)))
+
+from pymongo import MongoClient  # noqa: E402
+
+from db_indexes import ensure_indexes  # noqa: E402
+from genai_logic import Stage  # noqa: E402
+from storage_codec import encode_document  # noqa: E402
+
+WORDS = (
+    "model gradient loss function neural network layer activation dataset training validation "
+    "learning rate optimizer example analogy concept objective summary regression classification "
+    "vector matrix probability distribution feature embedding transformer attention token"
+).split()
+
+AUDIENCES = ["undergraduate", "postgraduate", "school", "professional"]
+COUNTRIES = ["India", "USA", "Germany", "Brazil", "Kenya", None]
+BATCH_SIZE = 2000
+
+class Loader:
+    # Buffers documents per collection and flushes them with unordered insert_many
+    def __init__(self, db, rng: random.Random, content_ratio: float, content_paragraphs: int):
+        self.db = db
+        self.rng = rng
+        self.content_ratio = content_ratio
+        self.content_paragraphs = content_paragraphs
+        self.buffers: Dict[str, List[dict]] = {}
+        self.versions = 0
+        self.inserted: Dict[str, int] = {}
+
+    def add(self, collection: str, doc: dict):
+        buffer = self.buffers.setdefault(collection, [])
+        buffer.append(doc)
+        if len(buffer) >= BATCH_SIZE:
+            self.flush(collection)
+
+    def flush(self, collection: str = None):
+        for name in [collection] if collection else list(self.buffers):
+            docs = self.buffers.get(name)
+            if docs:
+                self.db[name].insert_many(docs, ordered=False)
+                self.inserted[name] = self.inserted.get(name, 0) + len(docs)
+                self.buffers[name] = []
+
+    # ----------------------------- Text -----------------------------
+
+    def sentence(self, n: int) -> str:
+        return " ".join(self.rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+    def paragraphs(self, n: int) -> str:
+        return "\n\n".join(" ".join(self.sentence(self.rng.randint(8, 20)) for _ in range(6)) for _ in range(n))
+
+    def chain_length(self) -> int:
+        # Versions per entity: 1 + redo count, heavy-tailed and capped
+        return min(int(self.rng.paretovariate(1.6)), 60)
+
+    # ----------------------------- Versions -----------------------------
+
+    def version_chain(self, collection: str, entity_key: str, entity_id: str, stage: Stage, started: datetime, body) -> List[dict]:
+        # Writes 1..n versions of one entity; body(i) returns the stage fields of version i
+        records = []
+        previous = None
+        timestamp = started
+        for i in range(self.chain_length()):
+            timestamp += timedelta(minutes=self.rng.randint(1, 600))
+            version_id = str(uuid.uuid4())
+            record = {
+                entity_key: entity_id,
+                "version_id": version_id,
+                "previous_version_id": previous,
+                "stage": stage.value,
+                "timestamp": timestamp,
+                "content_rev": uuid.uuid4().hex,
+                **body(i),
+            }
+            self.add(collection, record)
+            prefix = "initial" if i == 0 else "redo"
+            self.add("version_tags", {
+                "entity_id": entity_id,
+                "stage": stage.value,
+                "tag": f"{prefix}-{stage.value}-{timestamp.strftime('%Y%m%dT%H%M%S')}",
+                "version_id": version_id,
+                "timestamp": timestamp,
+            })
+            records.append(record)
+            previous = version_id
+            self.versions += 1
+        self.add("latest_versions", {
+            "entity_id": entity_id,
+            "stage": stage.value,
+            "latest_version_id": previous,
+            "timestamp": timestamp,
+        })
+        return records
+
+    def course(self, started: datetime):
+        course_id = str(uuid.uuid4())
+        audience = self.rng.choice(AUDIENCES)
+        title = self.sentence(4)[:-1]
+        self.add("course", {
+            "course_id": course_id,
+            "stage": "init",
+            "timestamp": started,
+            "user_input": {
+                "course_id": course_id,
+                "title": title,
+                "description": self.sentence(40),
+                "prerequisites": [self.sentence(3) for _ in range(3)],
+                "learning_objectives": [self.sentence(12) for _ in range(5)],
+                "duration": f"{self.rng.randint(4, 16)} weeks",
+                "credits": float(self.rng.randint(1, 6)),
+                "target_audience": {"audienceType": audience},
+                "audience_type": audience,
+                "audience_grade": None,
+                "audience_english_level": self.rng.choice(["basic", "intermediate", "advanced"]),
+                "audience_math_level": self.rng.choice(["basic", "intermediate", "advanced"]),
+                "audience_specialization": self.rng.choice(["CS", "Math", "Biology", None]),
+                "audience_country": self.rng.choice(COUNTRIES),
+            },
+        })
+
+        self.version_chain("outline", "course_id", course_id, Stage.outline, started, lambda i: {
+            "outline": {
+                "course_id": course_id,
+                "title": title,
+                "prerequisites": [self.sentence(3) for _ in range(3)],
+                "description": self.sentence(60),
+                "learning_outcomes": [self.sentence(12) for _ in range(6)],
+                "duration": "12 weeks",
+                "credits": 4.0,
+            },
+            "suggestions_outlines": {"suggestions": [self.sentence(20) for _ in range(4)]},
+        })
+
+        module_ids = [str(uuid.uuid4()) for _ in range(self.rng.randint(5, 10))]
+        modules = [{
+            "module_id": module_id,
+            "module_title": self.sentence(4),
+            "module_description": self.sentence(60),
+            "module_hours": f"{self.rng.randint(4, 12)} hours",
+        } for module_id in module_ids]
+        self.version_chain("modules", "course_id", course_id, Stage.module, started, lambda i: {
+            "module_ids": module_ids,
+            "generated_modules": {"course_id": course_id, "modules": modules},
+            "suggestions_modules": {"suggestions": [self.sentence(20) for _ in range(4)]},
+        })
+
+        for module_id in module_ids:
+            self.module(module_id, started)
+        return course_id
+
+    def module(self, module_id: str, started: datetime):
+        submodule_ids = [str(uuid.uuid4()) for _ in range(self.rng.randint(3, 8))]
+        submodules = [{
+            "submodule_id": submodule_id,
+            "submodule_title": self.sentence(4),
+            "submodule_description": self.sentence(50),
+        } for submodule_id in submodule_ids]
+        self.version_chain("submodules", "module_id", module_id, Stage.submodule, started, lambda i: {
+            "submodule_ids": submodule_ids,
+            "generated_submodules": {"module_id": module_id, "submodules": submodules},
+            "suggestions_submodules": {"suggestions": [self.sentence(20) for _ in range(4)]},
+        })
+        for submodule_id in submodule_ids:
+            self.submodule(submodule_id, started)
+
+    def submodule(self, submodule_id: str, started: datetime):
+        activity_ids = [str(uuid.uuid4()) for _ in range(self.rng.randint(3, 6))]
+        activities = [{
+            "activity_id": activity_id,
+            "activity_name": self.sentence(5),
+            "activity_description": self.sentence(40),
+            "activity_objective": self.sentence(15),
+            "activity_type": self.rng.choice(["Lecture", "Quiz", "Reading Material"]),
+        } for activity_id in activity_ids]
+        self.version_chain("activities", "submodule_id", submodule_id, Stage.activity, started, lambda i: {
+            "activity_ids": activity_ids,
+            "generated_activities": {"activities": activities},
+        })
+        for activity in activities:
+            if self.rng.random() < self.content_ratio:
+                self.content(activity, started)
+
+    def content(self, activity: dict, started: datetime):
+        meta = {k: activity[k] for k in ("activity_name", "activity_description", "activity_objective")}
+        stage, body = {
+            "Reading Material": (Stage.reading, lambda i: encode_document({
+                **meta, "activity_type": "Reading Material",
+                "reading_material": {
+                    "reading_material": self.paragraphs(self.content_paragraphs),
+                    "reading_material_summary": self.sentence(80),
+                    "source_summaries": None,
+                },
+            })),
+            "Lecture": (Stage.lecture, lambda i: encode_document({
+                **meta, "activity_type": "Lecture",
+                "lecture_script": self.paragraphs(self.content_paragraphs),
+                "lecture_script_summary": self.sentence(80),
+                "source_summaries": {"notesSummary": "", "pdfSummary": "", "examplesSummary": ""},
+            })),
+            "Quiz": (Stage.quiz, lambda i: {
+                **meta, "activity_type": "Quiz", "quiz_type": "MCQ", "number_of_questions": 10, "total_score": 20,
+                "quiz_questions": [{
+                    "question_id": f"Q{q + 1}",
+                    "question": self.sentence(15),
+                    "options": [self.sentence(4) for _ in range(4)],
+                    "answer": self.rng.choice("ABCD"),
+                    "explanation": self.sentence(25),
+                } for q in range(10)],
+            }),
+        }[activity["activity_type"]]
+        self.version_chain("content", "activity_id", activity["activity_id"], stage, started, body)
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic course versions at scale")
+    parser.add_argument("--versions", type=int, default=1000, help="stop once at least this many versions exist")
+    parser.add_argument("--mongo", default=os.getenv("MONGO_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--db", default="corgen_scale")
+    parser.add_argument("--drop", action="store_true", help="drop the database first")
+    parser.add_argument("--content-ratio", type=float, default=0.2, help="fraction of activities with generated content")
+    parser.add_argument("--content-paragraphs", type=int, default=12)
+    parser.add_argument("--no-indexes", action="store_true", help="skip the db_indexes.py bootstrap")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    if args.db == "corgen":
+        parser.error("refusing to write synthetic data into the production database name 'corgen'")
+
+    client = MongoClient(args.mongo)
+    if args.drop:
+        client.drop_database(args.db)
+    db = client[args.db]
+    loader = Loader(db, random.Random(args.seed), args.content_ratio, args.content_paragraphs)
+
+    # Courses start over the past two years so keyset pages and history have real spread
+    start = time.perf_counter()
+    now = datetime.now(timezone.utc)
+    courses = 0
+    while loader.versions < args.versions:
+        loader.course(now - timedelta(days=loader.rng.uniform(0, 730)))
+        courses += 1
+        if courses % 100 == 0:
+            print(f"{courses} courses, {loader.versions} versions, {time.perf_counter() - start:.0f}s")
+    loader.flush()
+    print(f"Loaded {courses} courses / {loader.versions} versions in {time.perf_counter() - start:.1f}s: {loader.inserted}")
+
+    if not args.no_indexes:
+        start = time.perf_counter()
+        ensure_indexes(db)
+        print(f"Indexes built in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+# benchmarks/data_scale/run.py
+#
+# Times the read/write endpoints against a database filled by generate.py and records
+# the query plan (explain, executionStats) of every Mongo access pattern they use.
+#
+#   python benchmarks/data_scale/generate.py --versions 100000 --db corgen_scale --drop
+#   python benchmarks/data_scale/run.py --db corgen_scale
+#
+# Endpoints run in-process through FastAPI's TestClient with the read cache disabled,
+# so every request reaches Mongo. Write endpoints modify the sampled documents; rerun
+# generate.py --drop for a clean baseline. Results go to
+# scale_results/<db>-<versions>.json; plans that scan a collection (COLLSCAN) or
+# examine far more documents than they return are flagged in the summary.
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(os.path.dirname(HERE))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(HERE))
+
+# Examined/returned ratio above which a plan is flagged even when it uses an index
+EXAMINED_RATIO_WARNING = 100
+
+# ----------------------------- Samples -----------------------------
+
+def sample_ids(db, n: int, seed: int) -> Dict[str, List[dict]]:
+    # Random latest versions per stage, with the ids the endpoints need
+    def latest(stage: str, collection: str, entity_key: str) -> List[dict]:
+        pointers = list(db["latest_versions"].aggregate([{"$match": {"stage": stage}}, {"$sample": {"size": n}}]))
+        docs = []
+        for p in pointers:
+            doc = db[collection].find_one({entity_key: p["entity_id"], "version_id": p["latest_version_id"]})
+            if doc is not None:
+                docs.append(doc)
+        return docs
+
+    rng = random.Random(seed)
+    samples = {
+        "outline": latest("outline", "outline", "course_id"),
+        "module": latest("module", "modules", "course_id"),
+        "submodule": latest("submodule", "submodules", "module_id"),
+        "activity": latest("activity", "activities", "submodule_id"),
+    }
+    # Optional: only activities picked by --content-ratio have content
+    content = latest("reading", "content", "activity_id")
+    # Oldest versions too: history reads and rollbacks usually target those
+    samples["old_module"] = list(db["modules"].aggregate([
+        {"$match": {"previous_version_id": None}}, {"$sample": {"size": n}}
+    ]))
+    for docs in samples.values():
+        rng.shuffle(docs)
+    samples["content"] = content
+    return samples
+
+def _item(doc: dict, path: str, key: str) -> Optional[dict]:
+    items = doc
+    for part in path.split("."):
+        items = items.get(part, {}) if isinstance(items, dict) else {}
+    return items[0] if isinstance(items, list) and items and key in items[0] else None
+
+# ----------------------------- Endpoint Timing -----------------------------
+
+def endpoint_cases(samples: Dict[str, List[dict]]) -> Dict[str, Callable[[Any, int], Any]]:
+    # name -> fn(client, i) issuing one request built from the i-th sample
+    def pick(kind: str, i: int) -> dict:
+        docs = samples[kind]
+        return docs[i % len(docs)]
+
+    def module_of(i):
+        doc = pick("module", i)
+        return doc, _item(doc, "generated_modules.modules", "module_id")
+
+    def submodule_of(i):
+        doc = pick("submodule", i)
+        return doc, _item(doc, "generated_submodules.submodules", "submodule_id")
+
+    return {
+        "GET get_outline (latest)": lambda c, i: c.get("/course/get_outline", params={"course_id": pick("outline", i)["course_id"]}),
+        "GET get_outline (by version)": lambda c, i: c.get("/course/get_outline", params={
+            "course_id": pick("outline", i)["course_id"], "version_id": pick("outline", i)["version_id"]}),
+        "GET get_modules": lambda c, i: c.get("/course/get_modules", params={"course_id": pick("module", i)["course_id"]}),
+        "GET get_modules (one module)": lambda c, i: c.get("/course/get_modules", params={
+            "course_id": module_of(i)[0]["course_id"], "module_id": module_of(i)[1]["module_id"]}),
+        "GET get_submodules": lambda c, i: c.get("/course/get_submodules", params={"module_id": pick("submodule", i)["module_id"]}),
+        "GET versions (course, all stages)": lambda c, i: c.get("/course/versions", params={"entity_id": pick("outline", i)["course_id"]}),
+        "GET versions/page (activity)": lambda c, i: c.get("/course/versions/page", params={
+            "entity_id": pick("activity", i)["submodule_id"], "stage": "activity", "limit": 20}),
+        "GET courses": lambda c, i: c.get("/course/courses", params={"limit": 50}),
+        "GET courses (audience filter)": lambda c, i: c.get("/course/courses", params={"limit": 50, "audience_type": "postgraduate"}),
+        "GET tree": lambda c, i: c.get("/course/tree", params={"course_id": pick("outline", i)["course_id"], "fields": "outline,modules,submodules"}),
+        "PUT outline/update": lambda c, i: c.put("/course/outline/update", json={
+            "course_id": pick("outline", i)["course_id"], "version_id": pick("outline", i)["version_id"],
+            "updates": {"duration": f"{i % 12 + 4} weeks"}}),
+        "PUT module/update (positional $set)": lambda c, i: c.put("/course/module/update", json={
+            "course_id": module_of(i)[0]["course_id"], "version_id": module_of(i)[0]["version_id"],
+            "module_id": module_of(i)[1]["module_id"], "updated_fields": {"module_hours": f"{i % 9 + 3} hours"}}),
+        "PUT submodules/update (positional $set)": lambda c, i: c.put("/course/submodules/update", json={
+            "module_id": submodule_of(i)[0]["module_id"], "version_id": submodule_of(i)[0]["version_id"],
+            "submodule_id": submodule_of(i)[1]["submodule_id"], "updated_fields": {"submodule_title": f"Edited {i}"}}),
+        "POST submodules/add ($push)": lambda c, i: c.post("/course/submodules/add", json={
+            "module_id": pick("submodule", i)["module_id"], "version_id": pick("submodule", i)["version_id"],
+            "submodule": {"submodule_id": str(uuid.uuid4()), "submodule_title": "Added", "submodule_description": "Added by the scale benchmark"}}),
+        "DELETE module/delete ($pull)": lambda c, i: c.delete("/course/module/delete", params={
+            "course_id": pick("old_module", i)["course_id"], "version_id": pick("old_module", i)["version_id"],
+            "module_id": _item(pick("old_module", i), "generated_modules.modules", "module_id")["module_id"]}),
+        "POST rollback (find_one by version_id)": lambda c, i: c.post("/course/rollback", params={
+            "stage": "module", "version_id": pick("old_module", i)["version_id"]}),
+        "POST branch (find_one by version_id)": lambda c, i: c.post("/course/branch", json={
+            "stage": "submodule", "version_id": pick("submodule", i)["version_id"]}),
+    }
+
+def time_endpoints(client, cases: Dict[str, Callable], requests: int) -> Dict[str, dict]:
+    results = {}
+    for name, call in cases.items():
+        timings, errors = [], 0
+        for i in range(requests):
+            start = time.perf_counter()
+            response = call(client, i)
+            timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+        timings.sort()
+        results[name] = {
+            "requests": requests,
+            "errors": errors,
+            "p50_ms": round(statistics.median(timings), 3),
+            "p95_ms": round(timings[min(len(timings) - 1, int(0.95 * len(timings)))], 3),
+            "p99_ms": round(timings[min(len(timings) - 1, int(0.99 * len(timings)))], 3),
+            "max_ms": round(timings[-1], 3),
+        }
+        print(f"{name:45s} p50 {results[name]['p50_ms']:9.2f} ms  p99 {results[name]['p99_ms']:9.2f} ms  errors {errors}")
+    return results
+
+# ----------------------------- Query Plans -----------------------------
+
+def query_shapes(samples: Dict[str, List[dict]]) -> Dict[str, tuple]:
+    # name -> (collection, explain command body) mirroring the queries api.py issues
+    outline = samples["outline"][0]
+    module_doc = samples["module"][0]
+    module = _item(module_doc, "generated_modules.modules", "module_id")
+    submodule_doc = samples["submodule"][0]
+    activity_doc = samples["activity"][0]
+    content_id = samples["content"][0]["activity_id"] if samples["content"] else "no-content"
+    inline = {"storage": {"$exists": False}}  # version_store.update_one only touches inline documents
+
+    def history(collection: str, entity_key: str, entity_id: str, extra: Optional[dict] = None) -> dict:
+        # _version_history_sources: per-collection sorted scan plus a $lookup on version_tags
+        return {"aggregate": collection, "cursor": {}, "pipeline": [
+            {"$match": {entity_key: entity_id, **(extra or {})}},
+            {"$sort": {"timestamp": -1, "_id": -1}},
+            {"$limit": 201},
+            {"$lookup": {"from": "version_tags", "localField": "version_id", "foreignField": "version_id", "as": "tags"}},
+        ]}
+
+    return {
+        "latest pointer lookup": {"find": "latest_versions", "filter": {"entity_id": outline["course_id"], "stage": "outline"}, "limit": 1},
+        "find_one outline by course_id+version_id": {"find": "outline", "filter": {"course_id": outline["course_id"], "version_id": outline["version_id"]}, "limit": 1},
+        "find_one by version_id (rollback/branch)": {"find": "modules", "filter": {"version_id": module_doc["version_id"]}, "limit": 1},
+        "content_rev lookup (If-None-Match)": {"find": "modules", "filter": {"course_id": module_doc["course_id"], "version_id": module_doc["version_id"]},
+                                                "projection": {"_id": 0, "content_rev": 1}, "limit": 1},
+        "select_items aggregate (one module)": {"aggregate": "modules", "cursor": {}, "pipeline": [
+            {"$match": {"course_id": module_doc["course_id"], "version_id": module_doc["version_id"]}}, {"$limit": 1}]},
+        "positional $set module": {"update": "modules", "updates": [{
+            "q": {"course_id": module_doc["course_id"], "version_id": module_doc["version_id"],
+                  "generated_modules.modules.module_id": module["module_id"], **inline},
+            "u": {"$set": {"generated_modules.modules.$.module_hours": "9 hours", "content_rev": "explain"}}}]},
+        "$pull module": {"update": "modules", "updates": [{
+            "q": {"course_id": module_doc["course_id"], "version_id": module_doc["version_id"], **inline},
+            "u": {"$pull": {"generated_modules.modules": {"module_id": module["module_id"]}}}}]},
+        "$push submodule": {"update": "submodules", "updates": [{
+            "q": {"module_id": submodule_doc["module_id"], "version_id": submodule_doc["version_id"], **inline},
+            "u": {"$push": {"generated_submodules.submodules": {"submodule_id": "explain"}}}}]},
+        "latest pointer upsert": {"update": "latest_versions", "updates": [{
+            "q": {"entity_id": outline["course_id"], "stage": "outline"},
+            "u": {"$set": {"latest_version_id": outline["version_id"], "timestamp": datetime.now(timezone.utc)}}, "upsert": True}]},
+        "version history: outline": history("outline", "course_id", outline["course_id"]),
+        "version history: activities": history("activities", "submodule_id", activity_doc["submodule_id"]),
+        "version history: content stages": history("content", "activity_id", content_id, {"stage": {"$in": ["reading", "lecture", "quiz"]}}),
+        "version history ETag pointers": {"find": "latest_versions", "filter": {"entity_id": outline["course_id"]}, "sort": {"stage": 1}},
+        "course list page": {"find": "course", "filter": {}, "sort": {"timestamp": -1, "_id": -1}, "limit": 51},
+        "course list with audience filter": {"find": "course", "filter": {"user_input.audience_type": "postgraduate"},
+                                             "sort": {"timestamp": -1, "_id": -1}, "limit": 51},
+    }
+
+def _walk(node: Any, key: str, found: List[Any]):
+    if isinstance(node, dict):
+        for k, v in node.items():
+            if k == key:
+                found.append(v)
+            _walk(v, key, found)
+    elif isinstance(node, list):
+        for v in node:
+            _walk(v, key, found)
+
+def _plan_stages(plan: Any) -> List[str]:
+    # Depth-first list of plan stages, e.g. ["LIMIT", "FETCH", "IXSCAN(version_id_1)"]
+    stages: List[str] = []
+
+    def visit(node):
+        if not isinstance(node, dict):
+            return
+        if "stage" in node:
+            stages.append(f"{node['stage']}({node['indexName']})" if "indexName" in node else node["stage"])
+        for child_key in ("inputStage", "queryPlan"):
+            visit(node.get(child_key))
+        for child in node.get("inputStages", []):
+            visit(child)
+
+    visit(plan)
+    return stages
+
+def summarize_plan(explain: dict) -> dict:
+    plans: List[Any] = []
+    stats: List[Any] = []
+    _walk(explain, "winningPlan", plans)
+    _walk(explain, "executionStats", stats)
+    stages = [s for plan in plans for s in _plan_stages(plan)]
+    examined = sum(s.get("totalDocsExamined", 0) for s in stats if isinstance(s, dict))
+    keys = sum(s.get("totalKeysExamined", 0) for s in stats if isinstance(s, dict))
+    returned = sum(s.get("nReturned", 0) for s in stats if isinstance(s, dict))
+    summary = {
+        "plan": stages,
+        "keys_examined": keys,
+        "docs_examined": examined,
+        "returned": returned,
+        "execution_ms": sum(s.get("executionTimeMillis", 0) for s in stats if isinstance(s, dict)),
+    }
+    warnings = []
+    if any(s.startswith("COLLSCAN") for s in stages):
+        warnings.append("COLLSCAN")
+    if examined > EXAMINED_RATIO_WARNING * max(returned, 1):
+        warnings.append(f"examined {examined} docs for {returned}")
+    summary["warnings"] = warnings
+    return summary
+
+def explain_all(db, shapes: Dict[str, dict]) -> Dict[str, dict]:
+    results = {}
+    for name, command in shapes.items():
+        try:
+            raw = db.command({"explain": command, "verbosity": "executionStats"})
+        except Exception as e:
+            results[name] = {"error": str(e)}
+            print(f"{name:45s} explain failed: {e}")
+            continue
+        summary = summarize_plan(raw)
+        raw.pop("$clusterTime", None)
+        raw.pop("operationTime", None)
+        results[name] = {**summary, "raw": json.loads(json.dumps(raw, default=str))}
+        flag = "  !! " + "; ".join(summary["warnings"]) if summary["warnings"] else ""
+        print(f"{name:45s} {' > '.join(summary['plan'])} keys={summary['keys_examined']} docs={summary['docs_examined']}{flag}")
+    return results
+
+# ----------------------------- Main -----------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Endpoint latency and query plans at data scale")
+    parser.add_argument("--mongo", default=os.getenv("MONGO_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--db", default="corgen_scale")
+    parser.add_argument("--requests", type=int, default=100, help="requests per endpoint")
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--out", default="scale_results")
+    parser.add_argument("--skip-endpoints", action="store_true", help="only record query plans")
+    args = parser.parse_args()
+
+    if args.db == "corgen":
+        parser.error("refusing to run write benchmarks against the production database name 'corgen'")
+    os.environ["MONGO_URI"] = args.mongo
+    os.environ["MONGO_DB_NAME"] = args.db
+    os.environ["READ_CACHE_MAX_ENTRIES"] = "0"
+    os.environ.setdefault("GEMINI_API_KEY", "scale-benchmark-not-used")
+    os.environ.setdefault("LLM_WARMUP", "0")
+
+    from pymongo import MongoClient
+    db = MongoClient(args.mongo)[args.db]
+    versions = sum(db[c].estimated_document_count() for c in ("outline", "modules", "submodules", "activities", "content"))
+    print(f"{args.db}: {versions} versions")
+
+    samples = sample_ids(db, args.requests, args.seed)
+    if not all(docs for kind, docs in samples.items() if kind != "content"):
+        sys.exit(f"{args.db} has no generated data; run generate.py first")
+
+    # Plans first, before the write endpoints modify the sampled documents
+    plans = explain_all(db, query_shapes(samples))
+
+    endpoints = {}
+    if not args.skip_endpoints:
+        from fastapi.testclient import TestClient
+
+        import fake_llm
+        from main import app
+
+        fake_llm.install()
+        with TestClient(app, raise_server_exceptions=False) as client:
+            endpoints = time_endpoints(client, endpoint_cases(samples), args.requests)
+
+    os.makedirs(args.out, exist_ok=True)
+    path = os.path.join(args.out, f"{args.db}-{versions}.json")
+    with open(path, "w") as f:
+        json.dump({
+            "db": args.db,
+            "versions": versions,
+            "collections": {c: db[c].estimated_document_count() for c in db.list_collection_names()},
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+            "endpoints": endpoints,
+            "plans": plans,
+        }, f, indent=2)
+    print(f"Results written to {path}")
+
+if __name__ == "__main__":
+    main()
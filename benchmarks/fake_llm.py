@@ -0,0 +1,156 @@
+# benchmarks/fake_llm.py
+#
+# Schema-valid canned LLM output for the benchmarks and the load test, so only our
+# own code is measured. Responses are stored as JSON bytes and decoded per call,
+# like the real clients decode response.text.
+
+import os
+import random
+import sys
+import time
+from typing import Callable, Optional
+
+import orjson
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import deadline  # noqa: E402
+
+def words(n: int, seed: int = 0) -> str:
+    vocab = ("model gradient loss layer activation dataset training validation optimizer "
+             "example concept objective regression vector matrix embedding attention").split()
+    return " ".join(vocab[(i * 7 + seed) % len(vocab)] for i in range(n))
+
+def distinct_words(n: int, seed: int) -> str:
+    # words() with another seed is the same cycle shifted, which near-duplicate checks
+    # (dedup.py) collapse; quiz stems need to survive them
+    vocab = ("model gradient loss layer activation dataset training validation optimizer "
+             "example concept objective regression vector matrix embedding attention").split()
+    rng = random.Random(seed)
+    return " ".join(rng.choice(vocab) for _ in range(n))
+
+CANNED = {
+    "CourseOutline": lambda: {
+        "course_id": "c-1",
+        "title": "Machine Learning Foundations",
+        "prerequisites": ["Linear algebra", "Python"],
+        "description": words(80),
+        "learning_outcomes": [words(15, i) for i in range(6)],
+        "duration": "12 weeks",
+        "credits": 4.0,
+    },
+    "ModuleSet": lambda: {
+        "course_id": "c-1",
+        "modules": [
+            {"module_id": f"m-{i}", "module_title": words(5, i), "module_description": words(60, i), "module_hours": "6"}
+            for i in range(10)
+        ],
+    },
+    "SubmoduleSet": lambda: {
+        "module_id": "m-1",
+        "submodules": [
+            {"submodule_id": f"s-{i}", "submodule_title": words(5, i), "submodule_description": words(50, i)}
+            for i in range(8)
+        ],
+    },
+    "ActivitySet": lambda: {
+        "activities": [
+            {
+                "activity_id": f"a-{i}",
+                "activity_name": words(5, i),
+                "activity_description": words(60, i),
+                "activity_objective": words(25, i),
+                "activity_type": ["Lecture", "Quiz", "Reading Material"][i % 3],
+            }
+            for i in range(30)
+        ],
+    },
+    "ReadingMaterialOut": lambda: {
+        "reading_material": "\n\n".join(words(150, i) for i in range(20)),
+        "reading_material_summary": "\n".join(f"- {words(20, i)}" for i in range(6)),
+        "source_summaries": [words(60, i) for i in range(3)],
+    },
+    "LectureScriptOut": lambda: {
+        "lecture_script": "\n\n".join(words(150, i) for i in range(25)),
+        "source_summaries": [words(60, i) for i in range(3)],
+        "lecture_script_summary": "\n".join(
+            f"**{section}**\n" + "\n".join(f"- {words(15, i)}" for i in range(3))
+            for section in ("Key Concepts", "Learning Goals", "Examples or Analogies")
+        ),
+    },
+    "QuizSet": lambda: {
+        "module_name": "Supervised Learning",
+        "submodule_name": "Linear Regression",
+        "questions": [
+            {"question_id": f"Q{i}", "question": distinct_words(20, i), "options": ["A", "B", "C", "D"], "answer": "A", "explanation": words(30, i)}
+            for i in range(10)
+        ],
+    },
+    "QuizOut": lambda: {
+        "question_id": "Q1", "question": words(20), "options": ["A", "B", "C", "D"], "answer": "A", "explanation": words(30),
+    },
+    "SuggestionOutput": lambda: {
+        "suggestions": [words(25, i) for i in range(5)],
+    },
+}
+
+_ENCODED = {name: orjson.dumps(build()) for name, build in CANNED.items()}
+
+def canned_response(schema_name: str) -> dict:
+    # A fresh dict per call; handlers mutate what the generators return
+    return orjson.loads(_ENCODED[schema_name])
+
+# ----------------------------- Fake Calls -----------------------------
+
+def delay(latency: float = 0.0, jitter: float = 0.0) -> Callable[[], None]:
+    # Simulated LLM round trip. Sleeps the worker thread like the real blocking
+    # client, and honours request deadlines the same way (call_timeout raises).
+    rng = random.Random()
+
+    def wait():
+        if latency <= 0:
+            return
+        seconds = max(0.0, rng.gauss(latency, jitter)) if jitter else latency
+        time.sleep(min(seconds, deadline.call_timeout()))
+
+    return wait
+
+def make_call_llm(wait: Optional[Callable[[], None]] = None):
+    def call_llm(prompt, system_prompt, response_schema, *args, **kwargs):
+        if wait:
+            wait()
+        return canned_response(response_schema.__name__)
+    return call_llm
+
+def make_call_gemini(wait: Optional[Callable[[], None]] = None):
+    summary = words(120)
+
+    def call_gemini(prompt):
+        if wait:
+            wait()
+        return summary
+    return call_gemini
+
+def make_stage_suggestions(wait: Optional[Callable[[], None]] = None):
+    def get_stage_suggestions(stage, context, feedback_mode="light"):
+        if wait:
+            wait()
+        return canned_response("SuggestionOutput")
+    return get_stage_suggestions
+
+def install(latency: float = 0.0, jitter: float = 0.0):
+    # Replace every LLM entry point the API reaches. api imports get_stage_suggestions
+    # by name, so it is patched there as well as in genai_logic; likewise call_gemini
+    # in summary_strategy.
+    import api
+    import course_content_generator
+    import genai_logic
+    import summary_strategy
+
+    wait = delay(latency, jitter)
+    genai_logic.call_llm = make_call_llm(wait)
+    genai_logic.get_stage_suggestions = make_stage_suggestions(wait)
+    api.get_stage_suggestions = genai_logic.get_stage_suggestions
+    course_content_generator.call_llm = make_call_llm(wait)
+    course_content_generator.call_gemini = make_call_gemini(wait)
+    summary_strategy.call_gemini = course_content_generator.call_gemini
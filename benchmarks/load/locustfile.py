@@ -0,0 +1,182 @@
+# benchmarks/load/locustfile.py
+#
+# Mixed traffic against a running server (see serve.py):
+#   CourseAuthor  - the full authoring journey: outline, modules, submodules, activities,
+#                   then reading, lecture and quiz for one activity, with edits, a redo
+#                   and a look at the version history.
+#   CourseReader  - browsing: course list, course tree, outline/modules with ETag
+#                   revalidation and version pages, on courses the authors created.
+#
+#   locust -f benchmarks/load/locustfile.py --host http://127.0.0.1:8000 \
+#       --headless -u 50 -r 5 -t 5m --csv load --csv-full-history
+#
+# Requests are grouped by route (not by id) so the stats are per endpoint. A 429 shed
+# counts as a failure; its share of the total is reported separately by report.py.
+# X-Request-Timeout is sent with every generation call; override with LOAD_REQUEST_TIMEOUT.
+
+import os
+import random
+from collections import deque
+
+from locust import HttpUser, between, task
+
+REQUEST_TIMEOUT = os.getenv("LOAD_REQUEST_TIMEOUT", "300")
+
+# (course_id, module_id) pairs written by authors, read by readers
+known_courses: deque = deque(maxlen=500)
+
+class JourneyAborted(Exception):
+    pass
+
+class _CourseClient(HttpUser):
+    abstract = True
+
+    def call(self, method: str, path: str, name: str, generation: bool = False, **kwargs):
+        headers = kwargs.pop("headers", {})
+        if generation:
+            headers["X-Request-Timeout"] = REQUEST_TIMEOUT
+        with self.client.request(method, path, name=name, headers=headers, catch_response=True, **kwargs) as response:
+            if response.status_code == 304:
+                response.success()
+                return None
+            if response.status_code >= 400:
+                response.failure(f"HTTP {response.status_code}")
+                raise JourneyAborted(name)
+            body = response.json()
+            if isinstance(body, dict) and "error" in body:
+                # Generation failures are 5xx now; an {"error": ...} body would still be a failure
+                response.failure(body["error"])
+                raise JourneyAborted(name)
+            return body
+
+class CourseAuthor(_CourseClient):
+    weight = 1
+    wait_time = between(1, 5)
+
+    @task
+    def author_course(self):
+        try:
+            self._journey()
+        except JourneyAborted:
+            pass
+
+    def _journey(self):
+        n = random.randint(0, 10**6)
+        outline = self.call("POST", "/course/generate/outline", "generate/outline", generation=True, json={
+            "title": f"Load test course {n}",
+            "prerequisites": ["Python", "Linear algebra"],
+            "description": "An applied introduction to machine learning.",
+            "learning_objectives": ["Train and evaluate models", "Explain bias and variance"],
+            "target_audience": {"audienceType": random.choice(["undergraduate", "postgraduate", "school"]), "country": "India"},
+            "duration": "12 weeks",
+            "credits": 4,
+        })
+        course_id = outline["course_id"]
+        self.call("PUT", "/course/outline/update", "outline/update", json={
+            "course_id": course_id, "version_id": outline["version_id"], "updates": {"duration": "10 weeks"},
+        })
+        course_outline = dict(outline["result"], course_id=course_id)
+        self.call("GET", f"/course/get_outline?course_id={course_id}", "get_outline")
+
+        self.call("POST", "/course/generate/modules", "generate/modules", generation=True, json=course_outline)
+        modules = self.call("GET", f"/course/get_modules?course_id={course_id}", "get_modules")
+        module = random.choice(modules["modules"])
+        self.call("PUT", "/course/module/update", "module/update", json={
+            "course_id": course_id, "version_id": modules["version_id"], "module_id": module["module_id"],
+            "updated_fields": {"module_hours": "8"},
+        })
+
+        self.call("POST", "/course/generate/submodules", "generate/submodules", generation=True, json=module)
+        submodules = self.call("GET", f"/course/get_submodules?module_id={module['module_id']}", "get_submodules")
+        submodule = random.choice(submodules["submodules"])
+        known_courses.append((course_id, module["module_id"]))
+
+        activities = self.call("POST", "/course/generate/activities", "generate/activities", generation=True, json={
+            "submodule_id": submodule["submodule_id"],
+            "submodule_name": submodule["submodule_title"],
+            "submodule_description": submodule["submodule_description"],
+            "activity_types": ["Lecture", "Quiz", "Reading Material"],
+        })
+        activity = random.choice(activities["result"]["activities"])
+        content_input = {
+            "course_outline": course_outline,
+            "module_name": module["module_title"],
+            "submodule_name": submodule["submodule_title"],
+            "activity_id": activity["activity_id"],
+            "activity_name": activity["activity_name"],
+            "activity_description": activity["activity_description"],
+            "activity_objective": activity["activity_objective"],
+            "user_prompt": "Friendly tone with worked examples",
+        }
+
+        reading = self.call("POST", "/course/generate-reading-material", "generate-reading-material", generation=True,
+                            json=dict(content_input, previous_material_summary=""))
+        self.call("POST", "/course/generate-lecture-script", "generate-lecture-script", generation=True,
+                  json=dict(content_input, prev_activities_summary=reading["reading_material_summary"]))
+        quiz_input = {k: v for k, v in content_input.items() if k != "course_outline"}
+        self.call("POST", "/course/generate-quiz", "generate-quiz", generation=True, json=dict(
+            quiz_input, material_summary=reading["reading_material_summary"],
+            number_of_questions=10, quiz_type="MCQ", total_score=20,
+        ))
+
+        self.call("POST", "/course/redo", "redo", generation=True, json={
+            "stage": "activity",
+            "prev_content": dict(activities["result"], submodule_id=submodule["submodule_id"], version_id=activities["version_id"]),
+            "user_message": "Add a hands-on lab",
+        })
+        self.call("GET", f"/course/versions?entity_id={submodule['submodule_id']}&stage=activity", "versions")
+
+class CourseReader(_CourseClient):
+    weight = 4
+    wait_time = between(0.5, 2)
+
+    def on_start(self):
+        self.etags = {}
+
+    def _conditional(self, path: str, name: str):
+        headers = {"If-None-Match": self.etags[path]} if path in self.etags else {}
+        with self.client.get(path, name=name, headers=headers, catch_response=True) as response:
+            if response.status_code in (200, 304):
+                if response.headers.get("ETag"):
+                    self.etags[path] = response.headers["ETag"]
+                response.success()
+            else:
+                response.failure(f"HTTP {response.status_code}")
+
+    def _pick(self):
+        return random.choice(known_courses) if known_courses else None
+
+    @task(3)
+    def list_courses(self):
+        try:
+            page = self.call("GET", "/course/courses?limit=20", "courses")
+            if page and page.get("next_cursor"):
+                self.call("GET", f"/course/courses?limit=20&cursor={page['next_cursor']}", "courses (next page)")
+        except JourneyAborted:
+            pass
+
+    @task(3)
+    def read_outline_and_modules(self):
+        picked = self._pick()
+        if picked:
+            course_id, _ = picked
+            self._conditional(f"/course/get_outline?course_id={course_id}", "get_outline (reader)")
+            self._conditional(f"/course/get_modules?course_id={course_id}", "get_modules (reader)")
+
+    @task(2)
+    def read_submodules(self):
+        picked = self._pick()
+        if picked:
+            self._conditional(f"/course/get_submodules?module_id={picked[1]}", "get_submodules (reader)")
+
+    @task(2)
+    def read_tree(self):
+        picked = self._pick()
+        if picked:
+            self._conditional(f"/course/tree?course_id={picked[0]}", "tree")
+
+    @task(1)
+    def read_versions(self):
+        picked = self._pick()
+        if picked:
+            self._conditional(f"/course/versions/page?entity_id={picked[0]}&limit=20", "versions/page")
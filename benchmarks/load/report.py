@@ -0,0 +1,135 @@
+# benchmarks/load/report.py
+#
+# Summarises a load-test run: per-endpoint throughput, latency percentiles and error
+# rates from Locust's CSV output, server resource usage from serve.py's samples, and
+# the server's own /metrics snapshot (admission pools, caches) taken at the end.
+#
+#   python benchmarks/load/report.py load_results/20260101-120000
+#
+# Writes report.md and report.json next to the inputs.
+
+import argparse
+import csv
+import json
+import os
+import statistics
+from typing import Dict, List, Optional
+
+def _num(value: str) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def endpoint_stats(stats_csv: str, failures_csv: Optional[str]) -> List[dict]:
+    shed: Dict[str, int] = {}
+    if failures_csv and os.path.exists(failures_csv):
+        with open(failures_csv, newline="") as f:
+            for row in csv.DictReader(f):
+                if "HTTP 429" in row["Error"]:
+                    shed[row["Name"]] = shed.get(row["Name"], 0) + int(row["Occurrences"])
+
+    rows = []
+    with open(stats_csv, newline="") as f:
+        for row in csv.DictReader(f):
+            requests = int(row["Request Count"])
+            failures = int(row["Failure Count"])
+            rows.append({
+                "endpoint": row["Name"] if row["Name"] == "Aggregated" else f"{row['Type']} {row['Name']}",
+                "requests": requests,
+                "rps": _num(row["Requests/s"]),
+                "p50_ms": _num(row["50%"]),
+                "p95_ms": _num(row["95%"]),
+                "p99_ms": _num(row["99%"]),
+                "max_ms": _num(row["Max Response Time"]),
+                "error_rate": failures / requests if requests else 0.0,
+                "shed_rate": shed.get(row["Name"], 0) / requests if requests else 0.0,
+            })
+    return rows
+
+def resource_stats(samples_path: str) -> Optional[dict]:
+    if not os.path.exists(samples_path):
+        return None
+    with open(samples_path) as f:
+        samples = [json.loads(line) for line in f if line.strip()]
+    if not samples:
+        return None
+    summary = {
+        "samples": len(samples),
+        "rss_mb_start": round(samples[0]["rss_mb"], 1),
+        "rss_mb_max": round(max(s["rss_mb"] for s in samples), 1),
+        "threads_max": max(s["threads"] for s in samples),
+    }
+    cpu = [s["cpu_percent"] for s in samples if s.get("cpu_percent") is not None]
+    if cpu:
+        summary.update({"cpu_percent_mean": round(statistics.fmean(cpu), 1), "cpu_percent_max": round(max(cpu), 1)})
+    elif "cpu_seconds" in samples[0]:
+        elapsed = samples[-1]["ts"] - samples[0]["ts"]
+        used = samples[-1]["cpu_seconds"] - samples[0]["cpu_seconds"]
+        summary["cpu_percent_mean"] = round(100 * used / elapsed, 1) if elapsed > 0 else None
+    fds = [s["open_fds"] for s in samples if s.get("open_fds") is not None]
+    if fds:
+        summary["open_fds_max"] = max(fds)
+    return summary
+
+def _fmt(value, pattern: str = "{:.0f}") -> str:
+    return "-" if value is None else pattern.format(value)
+
+def render_markdown(endpoints: List[dict], resources: Optional[dict], metrics: Optional[dict]) -> str:
+    lines = [
+        "# Load test report",
+        "",
+        "| Endpoint | Requests | RPS | p50 ms | p95 ms | p99 ms | max ms | Errors | 429 shed |",
+        "|---|---:|---:|---:|---:|---:|---:|---:|---:|",
+    ]
+    for e in endpoints:
+        lines.append(
+            f"| {e['endpoint']} | {e['requests']} | {_fmt(e['rps'], '{:.2f}')} | {_fmt(e['p50_ms'])} | "
+            f"{_fmt(e['p95_ms'])} | {_fmt(e['p99_ms'])} | {_fmt(e['max_ms'])} | "
+            f"{e['error_rate']:.2%} | {e['shed_rate']:.2%} |"
+        )
+    if resources:
+        lines += ["", "## Server resources", ""]
+        lines += [f"- {k}: {v}" for k, v in resources.items()]
+    if metrics:
+        lines += ["", "## Admission pools at end of run", ""]
+        for name, pool in metrics.get("admission", {}).items():
+            lines.append(
+                f"- {name}: admitted {pool['admitted']}, rejected {pool['rejected']}, "
+                f"p50 {pool['p50_seconds']}s, p99 {pool['p99_seconds']}s, service EWMA {pool['service_seconds_ewma']}s"
+            )
+        cache = metrics.get("read_cache")
+        if cache:
+            lines += ["", f"Read cache: {json.dumps(cache)}"]
+    return "\n".join(lines) + "\n"
+
+def build_report(results_dir: str, csv_prefix: str = "load") -> dict:
+    endpoints = endpoint_stats(
+        os.path.join(results_dir, f"{csv_prefix}_stats.csv"),
+        os.path.join(results_dir, f"{csv_prefix}_failures.csv"),
+    )
+    resources = resource_stats(os.path.join(results_dir, "resources.jsonl"))
+    metrics_path = os.path.join(results_dir, "metrics.json")
+    metrics = None
+    if os.path.exists(metrics_path):
+        with open(metrics_path) as f:
+            metrics = json.load(f)
+
+    report = {"endpoints": endpoints, "resources": resources, "server_metrics": metrics}
+    with open(os.path.join(results_dir, "report.json"), "w") as f:
+        json.dump(report, f, indent=2)
+    with open(os.path.join(results_dir, "report.md"), "w") as f:
+        f.write(render_markdown(endpoints, resources, metrics))
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarise a load-test run")
+    parser.add_argument("results_dir")
+    parser.add_argument("--csv-prefix", default="load")
+    args = parser.parse_args()
+    build_report(args.results_dir, args.csv_prefix)
+    with open(os.path.join(args.results_dir, "report.md")) as f:
+        print(f.read())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# benchmarks/load/run.py
+#
+# One-shot load test: starts serve.py, drives it with the Locust scenarios headless,
+# snapshots /metrics and writes the report.
+#
+#   python benchmarks/load/run.py --users 50 --spawn-rate 5 --duration 5m --llm-latency 2
+#   python benchmarks/load/run.py --mongo memory --users 10 --duration 30s     # no mongod needed
+#
+# Everything lands in load_results/<timestamp>/: Locust CSVs, resources.jsonl,
+# metrics.json, server.log, report.md and report.json.
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+from report import build_report  # noqa: E402
+
+def wait_until_up(url: str, timeout: float = 60.0):
+    give_up_at = time.monotonic() + timeout
+    while time.monotonic() < give_up_at:
+        try:
+            with urllib.request.urlopen(url, timeout=2):
+                return
+        except OSError:
+            time.sleep(0.5)
+    raise RuntimeError(f"Server did not come up at {url} within {timeout}s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the load test end to end")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--spawn-rate", type=float, default=2)
+    parser.add_argument("--duration", default="2m", help="Locust run time, e.g. 90s, 5m")
+    parser.add_argument("--llm-latency", type=float, default=1.0)
+    parser.add_argument("--llm-jitter", type=float, default=0.25)
+    parser.add_argument("--mongo", default=os.getenv("MONGO_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--db", default="corgen_loadtest")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--out", default=os.path.join("load_results", datetime.now().strftime("%Y%m%d-%H%M%S")))
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    host = f"http://127.0.0.1:{args.port}"
+    with open(os.path.join(args.out, "server.log"), "w") as server_log:
+        server = subprocess.Popen([
+            sys.executable, os.path.join(HERE, "serve.py"),
+            "--port", str(args.port),
+            "--llm-latency", str(args.llm_latency),
+            "--llm-jitter", str(args.llm_jitter),
+            "--mongo", args.mongo,
+            "--db", args.db,
+            "--resources-file", os.path.join(args.out, "resources.jsonl"),
+        ], stdout=server_log, stderr=subprocess.STDOUT)
+        try:
+            wait_until_up(host + "/health/ready")
+            subprocess.run([
+                sys.executable, "-m", "locust",
+                "-f", os.path.join(HERE, "locustfile.py"),
+                "--host", host,
+                "--headless",
+                "-u", str(args.users),
+                "-r", str(args.spawn_rate),
+                "-t", args.duration,
+                "--csv", os.path.join(args.out, "load"),
+                "--only-summary",
+            ], check=False)
+            with urllib.request.urlopen(host + "/metrics", timeout=10) as response:
+                metrics = json.load(response)
+            with open(os.path.join(args.out, "metrics.json"), "w") as f:
+                json.dump(metrics, f, indent=2)
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    build_report(args.out)
+    with open(os.path.join(args.out, "report.md")) as f:
+        print(f.read())
+    print(f"Results in {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# benchmarks/load/serve.py
+#
+# Runs main.app under uvicorn with every LLM call replaced by canned output after a
+# simulated delay, for load testing. Resource usage of this process is sampled once
+# a second into a JSONL file that report.py summarises.
+#
+#   python benchmarks/load/serve.py --llm-latency 2 --llm-jitter 0.5
+#   python benchmarks/load/serve.py --mongo mongodb://localhost:27017     # local mongod (default: $MONGO_URI)
+#   python benchmarks/load/serve.py --mongo memory                        # mongomock, no server needed
+#
+# Writes go to the database named by --db (default corgen_loadtest), never to corgen.
+# The in-memory stand-in has no transactions, $lookup sub-pipelines or TTL indexes,
+# so /tree, /versions and idempotency behave differently there; use a real mongod
+# for release numbers.
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, os.path.dirname(os.path.dirname(HERE)))
+
+try:
+    import psutil
+except ImportError:  # resource samples fall back to getrusage (no CPU %, RSS high-water mark only)
+    psutil = None
+
+def sample_resources(path: str, interval: float = 1.0):
+    # One line per interval: CPU %, RSS, threads and open fds of this server process
+    if psutil is not None:
+        proc = psutil.Process()
+        proc.cpu_percent(None)
+    else:
+        import resource
+    with open(path, "w", encoding="utf-8") as f:
+        while True:
+            time.sleep(interval)
+            if psutil is not None:
+                with proc.oneshot():
+                    sample = {
+                        "ts": time.time(),
+                        "cpu_percent": proc.cpu_percent(None),
+                        "rss_mb": proc.memory_info().rss / 2**20,
+                        "threads": proc.num_threads(),
+                        "open_fds": proc.num_fds() if hasattr(proc, "num_fds") else None,
+                    }
+            else:
+                usage = resource.getrusage(resource.RUSAGE_SELF)
+                sample = {
+                    "ts": time.time(),
+                    "cpu_seconds": usage.ru_utime + usage.ru_stime,
+                    "rss_mb": usage.ru_maxrss / 1024,
+                    "threads": threading.active_count(),
+                }
+            f.write(json.dumps(sample) + "\n")
+            f.flush()
+
+def patch_mongomock_bulk():
+    # pymongo >= 4.11 passes sort= from UpdateOne to the bulk builder; mongomock 4.3 does
+    # not accept it, so question bank and dedup index writes would fail in memory mode.
+    # UpdateOne without a sort argument passes sort=None, which is safe to drop.
+    import inspect
+
+    from mongomock.collection import BulkOperationBuilder
+
+    add_update = BulkOperationBuilder.add_update
+    if "sort" in inspect.signature(add_update).parameters:
+        return
+
+    def add_update_without_sort(self, *args, sort=None, **kwargs):
+        if sort is not None:
+            raise NotImplementedError("mongomock does not support sort in bulk updates")
+        return add_update(self, *args, **kwargs)
+
+    BulkOperationBuilder.add_update = add_update_without_sort
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve main.app with a fake LLM for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--llm-latency", type=float, default=float(os.getenv("FAKE_LLM_LATENCY_SECONDS", "1.0")),
+                        help="mean seconds per simulated LLM call")
+    parser.add_argument("--llm-jitter", type=float, default=float(os.getenv("FAKE_LLM_JITTER_SECONDS", "0.0")),
+                        help="standard deviation of the simulated latency")
+    parser.add_argument("--mongo", default=os.getenv("MONGO_URI", "mongodb://localhost:27017"),
+                        help="Mongo URI, or 'memory' for the mongomock stand-in")
+    parser.add_argument("--db", default="corgen_loadtest", help="database to write to")
+    parser.add_argument("--resources-file", default="load_resources.jsonl")
+    args = parser.parse_args()
+
+    os.environ.setdefault("GEMINI_API_KEY", "load-test-not-used")
+    os.environ.setdefault("LLM_WARMUP", "0")
+    os.environ["MONGO_DB_NAME"] = args.db
+    if args.mongo == "memory":
+        import mongomock
+        import pymongo
+        # clients.py does `from pymongo import MongoClient`, so patch before it is imported
+        pymongo.MongoClient = mongomock.MongoClient
+        patch_mongomock_bulk()
+    else:
+        os.environ["MONGO_URI"] = args.mongo
+
+    import uvicorn
+
+    import fake_llm
+    from main import app
+
+    fake_llm.install(args.llm_latency, args.llm_jitter)
+    threading.Thread(target=sample_resources, args=(args.resources_file,), name="resource-sampler", daemon=True).start()
+    print(f"Serving with fake LLM latency {args.llm_latency}s ± {args.llm_jitter}s, mongo={args.mongo}, db={args.db}")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# benchmarks/micro/conftest.py
+#
+# pytest-benchmark suite for the pure-Python hot paths: text cleanup, prompt
+# construction, result parsing/serialization and PDF/HTML extraction. LLM calls are
+# replaced by canned responses so only our own code is timed.
+#
+#   pytest benchmarks/micro                                  # run, save and compare against the last run
+#   pytest benchmarks/micro --benchmark-disable              # smoke-run every benchmark once
+#   pytest-benchmark compare --group-by=name                 # history across saved runs
+#
+# Runs are autosaved under benchmarks/micro/.benchmarks/ with the commit id (see
+# pytest.ini), and a run fails when any benchmark's min (fastest round) regresses
+# by more than the threshold against the latest saved run on this machine.
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+# clients.py builds the LLM client lazily on first use, which the canned responses
+# below never reach; the placeholder key only matters if a call slips through
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-not-used")
+
+import course_content_generator  # noqa: E402
+import genai_logic  # noqa: E402
+
+sys.path.insert(0, str(ROOT / "benchmarks"))
+from fake_llm import CANNED, make_call_gemini, make_call_llm, words as _words  # noqa: E402
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+STORAGE = Path(__file__).resolve().parent / ".benchmarks"
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    # Same history whether pytest runs from the repo root or from here
+    if config.getoption("benchmark_storage", None) == "file://./.benchmarks":
+        config.option.benchmark_storage = f"file://{STORAGE}"
+    # The first run on a machine has no baseline: record it instead of failing
+    if config.getoption("benchmark_compare_fail", None) and not any(STORAGE.glob("*/*.json")):
+        config.option.benchmark_compare = None
+        config.option.benchmark_compare_fail = None
+
+@pytest.fixture(scope="session")
+def canned():
+    return {name: build() for name, build in CANNED.items()}
+
+@pytest.fixture
+def fake_llm(monkeypatch, canned):
+    # No delay: only prompt construction and result handling are timed
+    monkeypatch.setattr(genai_logic, "call_llm", make_call_llm())
+    monkeypatch.setattr(course_content_generator, "call_llm", make_call_llm())
+    monkeypatch.setattr(course_content_generator, "call_gemini", make_call_gemini())
+    return canned
+
+# ----------------------------- Inputs -----------------------------
+
+@pytest.fixture(scope="session")
+def raw_text():
+    # Extracted-document shaped text: runs of whitespace, markup and long tracking URLs
+    chunk = "  " + _words(60) + "\n\n<b>" + _words(10) + "</b>\t https://tracker.example.com/" + "x" * 90 + " "
+    return chunk * 200
+
+@pytest.fixture(scope="session")
+def outline_items():
+    return [{"module": _words(4, i), "description": _words(40, i)} for i in range(40)]
+
+@pytest.fixture(scope="session")
+def submodule_items():
+    return [{"submoduleName": _words(4, i), "submoduleDescription": _words(40, i)} for i in range(60)]
+
+@pytest.fixture(scope="session")
+def pdf_path():
+    return str(FIXTURES / "optimization_notes.pdf")
+
+@pytest.fixture(scope="session")
+def html_bytes():
+    return (FIXTURES / "attention_article.html").read_bytes()
@@ -0,0 +1,49 @@
+# benchmarks/micro/test_dedup_bench.py
+#
+# Near-duplicate detection: MinHash signatures, LSH lookups against a populated
+# index, the prompt-side paragraph collapse and the quiz merge.
+
+import random
+
+import pytest
+
+from dedup import LSHIndex, collapse_repeats, minhash, unique_questions
+
+pytestmark = pytest.mark.benchmark(group="dedup")
+
+# fake_llm.words() cycles through a handful of sequences; these need to be distinct
+VOCAB = [f"{stem}{suffix}" for stem in (
+    "model gradient loss layer activation dataset training validation optimizer example concept "
+    "objective regression vector matrix embedding attention token kernel margin entropy cluster"
+).split() for suffix in ("", "s", "ing", "ed", "al")]
+
+def words(n: int, seed: int) -> str:
+    rng = random.Random(seed)
+    return " ".join(rng.choice(VOCAB) for _ in range(n))
+
+@pytest.fixture(scope="module")
+def paragraphs():
+    return [words(80, i) for i in range(2000)]
+
+@pytest.fixture(scope="module")
+def lsh_index(paragraphs):
+    index = LSHIndex()
+    for i, paragraph in enumerate(paragraphs):
+        index.add(("paragraph", f"activity-{i % 50}", str(i)), minhash(paragraph))
+    return index
+
+def test_minhash_paragraph(benchmark, paragraphs):
+    assert len(benchmark(minhash, paragraphs[0])) == 64
+
+def test_lsh_query(benchmark, lsh_index, paragraphs):
+    signature = minhash(paragraphs[123])
+    matches = benchmark(lsh_index.query, signature, 0.7)
+    assert ("paragraph", "activity-23", "123") in [key for key, _ in matches]
+
+def test_collapse_repeats(benchmark, paragraphs):
+    text = "\n\n".join(paragraphs[:20] * 3)
+    assert benchmark(collapse_repeats, text).count("\n\n") == 19
+
+def test_unique_questions(benchmark):
+    questions = [{"question": words(20, i % 40)} for i in range(120)]
+    assert len(benchmark(unique_questions, questions)) <= 40
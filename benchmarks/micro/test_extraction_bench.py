@@ -0,0 +1,27 @@
+# benchmarks/micro/test_extraction_bench.py
+#
+# Source extraction on checked-in fixtures. The URL scraper gets the HTML fixture
+# from a stubbed requests.get, so only parsing is timed.
+
+import pytest
+import requests
+
+import course_content_generator as ccg
+
+pytestmark = pytest.mark.benchmark(group="extraction")
+
+class _FakeResponse:
+    def __init__(self, content: bytes):
+        self.content = content
+
+def test_extract_text_from_pdf(benchmark, pdf_path):
+    assert len(benchmark(ccg.extract_text_from_pdf, pdf_path)) > 1000
+
+def test_scrape_text_from_url(benchmark, monkeypatch, html_bytes):
+    monkeypatch.setattr(requests, "get", lambda url, timeout=None: _FakeResponse(html_bytes))
+    text = benchmark(ccg.scrape_text_from_url, "https://example.com/attention")
+    assert text and "<script" not in text
+
+def test_clean_extracted_pdf(benchmark, pdf_path):
+    text = ccg.extract_text_from_pdf(pdf_path)
+    assert benchmark(ccg.clean_text, text)
@@ -0,0 +1,85 @@
+# benchmarks/micro/test_prompt_bench.py
+#
+# Every generate_* function end to end with the LLM replaced by canned output:
+# what is left is prompt construction, context assembly and result handling.
+
+import pytest
+
+import course_content_generator as ccg
+import genai_logic
+from genai_logic import CourseInit, CourseOutline, Module, Stage, Submodule
+
+pytestmark = pytest.mark.benchmark(group="prompts")
+
+@pytest.fixture(scope="module")
+def course_init():
+    return CourseInit(
+        title="Machine Learning Foundations",
+        prerequisites=["Linear algebra", "Python"],
+        description="An applied introduction to supervised learning. " * 10,
+        learning_objectives=[f"Objective {i}: explain and apply concept {i}" for i in range(8)],
+        target_audience={"audienceType": "undergraduate", "specialization": "Computer Science", "country": "India"},
+        duration="12 weeks",
+        credits=4,
+    )
+
+def _activity_kwargs(outline_items):
+    return dict(
+        course_outline=outline_items,
+        module_name="Supervised Learning",
+        submodule_name="Linear Regression",
+        activity_name="Fitting a line",
+        activity_description="Derive and fit ordinary least squares. " * 5,
+        activity_objective="Fit and interpret a linear model",
+        user_prompt="Friendly tone with worked examples",
+    )
+
+def test_generate_course_outline(benchmark, fake_llm, course_init):
+    assert "error" not in benchmark(genai_logic.generate_course_outline, course_init)
+
+def test_generate_modules(benchmark, fake_llm):
+    outline = CourseOutline.model_validate(fake_llm["CourseOutline"])
+    assert "error" not in benchmark(genai_logic.generate_modules, outline)
+
+def test_generate_submodules(benchmark, fake_llm):
+    module = Module.model_validate(fake_llm["ModuleSet"]["modules"][0])
+    assert "error" not in benchmark(genai_logic.generate_submodules, module)
+
+def test_generate_activities(benchmark, fake_llm):
+    submodule = Submodule.model_validate(fake_llm["SubmoduleSet"]["submodules"][0])
+    assert "error" not in benchmark(genai_logic.generate_activities, submodule, "Lecture, Quiz, Reading Material", "Keep it hands-on")
+
+def test_redo_stage(benchmark, fake_llm):
+    assert "error" not in benchmark(genai_logic.redo_stage, Stage.activity, fake_llm["ActivitySet"], "Add a lab")
+
+def test_generate_reading_material(benchmark, fake_llm, outline_items):
+    material, _ = benchmark(
+        ccg.generate_reading_material,
+        previous_material_summary="Covered gradient descent. " * 20,
+        **_activity_kwargs(outline_items),
+    )
+    assert material.reading_material
+
+def test_generate_lecture_script(benchmark, fake_llm, outline_items):
+    script, _, _ = benchmark(
+        ccg.generate_lecture_script,
+        prev_activities_summary="Covered gradient descent. " * 20,
+        text_examples=["Predicting house prices from floor area."] * 5,
+        **_activity_kwargs(outline_items),
+    )
+    assert script
+
+def test_generate_quiz(benchmark, fake_llm):
+    quiz = benchmark(
+        ccg.generate_quiz,
+        "Supervised Learning", "Linear Regression", "Fitting a line",
+        "Derive and fit ordinary least squares", "Fit and interpret a linear model",
+        fake_llm["ReadingMaterialOut"]["reading_material_summary"], 10, "MCQ", 20, "Beginner friendly",
+    )
+    assert "error" not in quiz
+
+def test_generate_assignment(benchmark, fake_llm, submodule_items):
+    assert benchmark(ccg.generate_assignment, "Supervised Learning", "Linear Regression", "Project based", submodule_items)
+
+def test_generate_mindmap(benchmark, fake_llm, submodule_items):
+    assert benchmark(ccg.generate_mindmap, "Supervised Learning", submodule_items)
@@ -0,0 +1,40 @@
+# benchmarks/micro/test_serialization_bench.py
+#
+# Turning LLM output into validated models, Mongo documents and prompt context.
+
+import orjson
+import pytest
+
+from api import as_json, parse_result
+from course_content_generator import LectureScriptOut, QuizSet, ReadingMaterialOut
+from genai_logic import ActivitySet, ModuleSet
+from serialization import to_bson
+
+pytestmark = pytest.mark.benchmark(group="serialization")
+
+CASES = [
+    ("ModuleSet", ModuleSet),
+    ("ActivitySet", ActivitySet),
+    ("ReadingMaterialOut", ReadingMaterialOut),
+    ("LectureScriptOut", LectureScriptOut),
+    ("QuizSet", QuizSet),
+]
+
+@pytest.mark.parametrize("name,model", CASES, ids=[name for name, _ in CASES])
+def test_parse_result_dict(benchmark, canned, name, model):
+    assert isinstance(benchmark(parse_result, canned[name], model), model)
+
+@pytest.mark.parametrize("name,model", CASES, ids=[name for name, _ in CASES])
+def test_parse_result_str(benchmark, canned, name, model):
+    raw = orjson.dumps(canned[name]).decode()
+    assert isinstance(benchmark(parse_result, raw, model), model)
+
+@pytest.mark.parametrize("name,model", CASES, ids=[name for name, _ in CASES])
+def test_to_bson(benchmark, canned, name, model):
+    result = model.model_validate(canned[name])
+    assert isinstance(benchmark(to_bson, result), dict)
+
+@pytest.mark.parametrize("name,model", CASES, ids=[name for name, _ in CASES])
+def test_as_json(benchmark, canned, name, model):
+    result = model.model_validate(canned[name])
+    assert benchmark(as_json, result).startswith("{")
@@ -0,0 +1,31 @@
+# benchmarks/micro/test_text_bench.py
+#
+# Text cleanup and the prompt-context helpers every content generator runs.
+
+import pytest
+
+from course_content_generator import (
+    MAX_CHARS_PER_CONTEXT,
+    clean_text,
+    course_outline_to_text,
+    submodules_to_bullets,
+    truncate_text,
+)
+
+pytestmark = pytest.mark.benchmark(group="text")
+
+def test_clean_text(benchmark, raw_text):
+    cleaned = benchmark(clean_text, raw_text)
+    assert "<b>" not in cleaned and "tracker.example.com" not in cleaned
+
+def test_truncate_text(benchmark, raw_text):
+    assert len(benchmark(truncate_text, raw_text)) == MAX_CHARS_PER_CONTEXT
+
+def test_course_outline_to_text_list(benchmark, outline_items):
+    assert benchmark(course_outline_to_text, outline_items).count("\n") == len(outline_items) - 1
+
+def test_course_outline_to_text_dict(benchmark, canned):
+    assert benchmark(course_outline_to_text, canned["CourseOutline"]).startswith("- course_id:")
+
+def test_submodules_to_bullets(benchmark, submodule_items):
+    assert benchmark(submodules_to_bullets, submodule_items).count("\n") == len(submodule_items) - 1
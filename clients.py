@@ -0,0 +1,115 @@
+# clients.py
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+load_dotenv()
+
+logger = logging.getLogger("course_api.clients")
+
+# ----------------------------- Lazy Clients -----------------------------
+# The google-genai SDK is the most expensive import in the service and its client
+# opens an HTTP pool, so neither happens at import time: the first caller (a request,
+# or the startup warm-up below) builds the shared client. The MongoClient is created
+# with connect=False, so api.py can still bind its collections at import while the
+# pool and server monitoring only start on first use.
+
+MONGO_URI = os.getenv("MONGO_URI")
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+WARMUP_MODEL = "gemini-2.5-flash"
+
+# LLM_WARMUP=0 skips the model lookup at startup (no outbound call; the client is still built)
+LLM_WARMUP = os.getenv("LLM_WARMUP", "1") != "0"
+MONGO_WARMUP_ATTEMPTS = int(os.getenv("MONGO_WARMUP_ATTEMPTS", "30"))
+
+_lock = threading.Lock()
+_genai_client = None
+_mongo_client = None
+
+def genai_client():
+    global _genai_client
+    if _genai_client is None:
+        with _lock:
+            if _genai_client is None:
+                from google import genai
+                _genai_client = genai.Client(api_key=GEMINI_API_KEY)
+    return _genai_client
+
+def mongo_client():
+    global _mongo_client
+    if _mongo_client is None:
+        with _lock:
+            if _mongo_client is None:
+                _mongo_client = MongoClient(MONGO_URI, connect=False)
+    return _mongo_client
+
+# ----------------------------- Warm-up / Readiness -----------------------------
+# Liveness only says the process is serving; readiness waits for the Mongo ping,
+# since no route works without it. The LLM warm-up is reported but never gates
+# readiness: CRUD and reads stay available while the model endpoint is slow.
+
+readiness: Dict[str, dict] = {
+    "mongo": {"status": "pending"},
+    "llm": {"status": "pending"},
+    "imports": {"status": "pending"},
+}
+
+def _mark(check: str, status: str, started: float, error: Optional[str] = None):
+    readiness[check] = {"status": status, "seconds": round(time.perf_counter() - started, 3)}
+    if error:
+        readiness[check]["error"] = error
+
+def warm_mongo():
+    started = time.perf_counter()
+    for attempt in range(1, MONGO_WARMUP_ATTEMPTS + 1):
+        try:
+            mongo_client().admin.command("ping")
+            _mark("mongo", "ready", started)
+            return
+        except Exception as e:
+            _mark("mongo", "pending" if attempt < MONGO_WARMUP_ATTEMPTS else "failed", started, str(e))
+            if attempt < MONGO_WARMUP_ATTEMPTS:
+                time.sleep(min(2 ** attempt * 0.1, 5.0))
+    logger.warning(f"Mongo warm-up gave up after {MONGO_WARMUP_ATTEMPTS} attempts: {readiness['mongo'].get('error')}")
+
+def warm_llm():
+    started = time.perf_counter()
+    try:
+        client = genai_client()
+        if LLM_WARMUP:
+            # Metadata lookup: opens the TLS connection without spending tokens
+            client.models.get(model=WARMUP_MODEL)
+        _mark("llm", "ready" if LLM_WARMUP else "skipped", started)
+    except Exception as e:
+        _mark("llm", "failed", started, str(e))
+        logger.warning(f"LLM warm-up failed: {e}")
+
+def warm_imports():
+    # Parsers used by content generation; loaded here so the first upload does not pay for them
+    started = time.perf_counter()
+    try:
+        import bs4  # noqa: F401
+        import PyPDF2  # noqa: F401
+        import requests  # noqa: F401
+        from google.genai import types  # noqa: F401
+        _mark("imports", "ready", started)
+    except ImportError as e:
+        _mark("imports", "failed", started, str(e))
+
+def warm_up():
+    threads = [
+        threading.Thread(target=target, name=f"warmup-{target.__name__}", daemon=True)
+        for target in (warm_mongo, warm_llm, warm_imports)
+    ]
+    for thread in threads:
+        thread.start()
+    return threads
+
+def is_ready() -> bool:
+    return readiness["mongo"]["status"] == "ready"
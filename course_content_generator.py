@@ -3,55 +3,80 @@
 import os
 import re
 import json
-import requests
-from typing import List, Dict, Union, Optional, Type
+import hashlib
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Dict, Union, Optional, Sequence, Type, TYPE_CHECKING
 from dotenv import load_dotenv
-from bs4 import BeautifulSoup
 from pydantic import BaseModel
-import PyPDF2
-from google import genai
-from google.genai.types import GenerateContentConfig, Content, Part, Tool, GoogleSearch
+
+import deadline
+from deadline import RequestAbandoned
+from tracing import span, record_usage
+from profiling import profiled
+from read_cache import ReadCache, MISSING
+from clients import genai_client
+from dedup import collapse_repeats, unique_questions
 # Load environment
 load_dotenv()
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-client = genai.Client(api_key=GEMINI_API_KEY)
+
+# google-genai, PyPDF2, bs4 and requests are imported where they are used (see clients.py)
+if TYPE_CHECKING:
+    from google.genai.types import Content, HttpOptions
 
 # ----------------------------- Constants -----------------------------
 MAX_CHARS_PER_CONTEXT = 12000
+MODEL = "gemini-2.5-flash"
 
 # ----------------------------- Utility Functions -----------------------------
 
 def read_file(path: str, mode: str = "r", encoding: Optional[str] = "utf-8") -> str:
-    try:
-        with open(path, mode, encoding=encoding) as f:
-            return f.read().strip()
-    except Exception as e:
-        raise ValueError(f"Failed to read file: {e}")
+    with span("extract.file", {"extract.source": "file"}) as sp:
+        try:
+            with open(path, mode, encoding=encoding) as f:
+                text = f.read().strip()
+        except Exception as e:
+            raise ValueError(f"Failed to read file: {e}")
+        sp.set_attribute("extract.output_chars", len(text))
+        return text
 
 def extract_text_from_pdf(pdf_path: str) -> str:
-    try:
-        with open(pdf_path, "rb") as f:
-            reader = PyPDF2.PdfReader(f)
-            return "".join(page.extract_text() or "" for page in reader.pages).strip()
-    except Exception as e:
-        raise ValueError(f"Failed to extract text from PDF: {e}")
+    import PyPDF2
+    with span("extract.pdf", {"extract.source": "pdf"}) as sp:
+        try:
+            with open(pdf_path, "rb") as f:
+                reader = PyPDF2.PdfReader(f)
+                text = "".join(page.extract_text() or "" for page in reader.pages).strip()
+        except Exception as e:
+            raise ValueError(f"Failed to extract text from PDF: {e}")
+        sp.set_attributes({"extract.pages": len(reader.pages), "extract.output_chars": len(text)})
+        return text
 
 def extract_text_from_txt(txt_path: str) -> str:
-    try:
-        with open(txt_path, "r", encoding="utf-8") as f:
-            return f.read().strip()
-    except Exception as e:
-        raise ValueError(f"Failed to read text file: {e}")
+    with span("extract.txt", {"extract.source": "txt"}) as sp:
+        try:
+            with open(txt_path, "r", encoding="utf-8") as f:
+                text = f.read().strip()
+        except Exception as e:
+            raise ValueError(f"Failed to read text file: {e}")
+        sp.set_attribute("extract.output_chars", len(text))
+        return text
 
 def scrape_text_from_url(url: str) -> str:
-    try:
-        response = requests.get(url, timeout=10)
-        soup = BeautifulSoup(response.content, "html.parser")
-        for tag in soup(["script", "style"]):
-            tag.extract()
-        return soup.get_text(separator="\n").strip()
-    except Exception as e:
-        raise ValueError(f"Failed to scrape URL '{url}': {e}")
+    import requests
+    from bs4 import BeautifulSoup
+    with span("extract.url", {"extract.source": "url"}) as sp:
+        try:
+            response = requests.get(url, timeout=10)
+            soup = BeautifulSoup(response.content, "html.parser")
+            for tag in soup(["script", "style"]):
+                tag.extract()
+            text = soup.get_text(separator="\n").strip()
+        except Exception as e:
+            raise ValueError(f"Failed to scrape URL '{url}': {e}")
+        sp.set_attributes({"extract.input_bytes": len(response.content), "extract.output_chars": len(text)})
+        return text
 
 def clean_text(text: str) -> str:
     text = re.sub(r'\s+', ' ', text)
@@ -64,30 +89,49 @@ def truncate_text(text: str, max_chars: int = MAX_CHARS_PER_CONTEXT) -> str:
 
 # ----------------------------- LLM Interaction -----------------------------
 
+def _http_options() -> "HttpOptions":
+    from google.genai.types import HttpOptions
+    # google-genai takes the timeout in milliseconds
+    return HttpOptions(timeout=int(deadline.call_timeout() * 1000))
+
 def call_gemini(prompt: str) -> str:
-    response = client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=prompt,
-    )
-    raw = response.text.strip() if response.text else ""
-    return re.sub(r'^```(?:json)?|```$', '', raw.strip())
+    from google.genai.types import GenerateContentConfig
+    with span("llm.call_gemini", {"gen_ai.request.model": MODEL, "llm.prompt_chars": len(prompt)}) as sp:
+        response = genai_client().models.generate_content(
+            model=MODEL,
+            contents=prompt,
+            config=GenerateContentConfig(http_options=_http_options()),
+        )
+        record_usage(sp, response)
+        raw = response.text.strip() if response.text else ""
+        sp.set_attribute("llm.response_chars", len(raw))
+        return re.sub(r'^```(?:json)?|```$', '', raw.strip())
 
-def call_llm(prompt: Content, system_prompt: str, response_schema: Type[BaseModel], debug: bool = False, temp: float = 0.2) -> Optional[dict]:
+def call_llm(prompt: "Content", system_prompt: str, response_schema: Type[BaseModel], debug: bool = False, temp: float = 0.2) -> Optional[dict]:
+    from google.genai.types import GenerateContentConfig, Tool, GoogleSearch
     grounding_tool = Tool(
         google_search=GoogleSearch()
     )
     try:
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=prompt,
-            config=GenerateContentConfig(
-                system_instruction=system_prompt,
-                response_mime_type="application/json",
-                response_schema=response_schema,
-                temperature=temp,
-                tools=[grounding_tool]
+        with span("llm.call_llm", {
+            "gen_ai.request.model": MODEL,
+            "llm.schema": response_schema.__name__,
+            "llm.system_prompt_chars": len(system_prompt),
+        }) as sp:
+            response = genai_client().models.generate_content(
+                model=MODEL,
+                contents=prompt,
+                config=GenerateContentConfig(
+                    system_instruction=system_prompt,
+                    response_mime_type="application/json",
+                    response_schema=response_schema,
+                    temperature=temp,
+                    tools=[grounding_tool],
+                    http_options=_http_options()
+                )
             )
-        )
+            record_usage(sp, response)
+            sp.set_attribute("llm.response_chars", len(response.text or ""))
         if debug or True:  # force debug always for now
             print(f"\n=== LLM RAW RESPONSE ===\n{response.text}\n=== END ===\n")
 
@@ -96,12 +140,21 @@ def call_llm(prompt: Content, system_prompt: str, response_schema: Type[BaseMode
             parsed_response = json.loads(response.text)
         return parsed_response
 
+    except RequestAbandoned:
+        raise
     except Exception as e:
         print(f"LLM call failed: {e}")
         return None
 
 # ----------------------------- Prompt Helpers -----------------------------
 
+# Source summaries are cached by content, so a retry after a timeout or disconnect
+# reuses every summary the abandoned request already paid for.
+summary_cache = ReadCache(
+    max_entries=int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "512")),
+    ttl_seconds=float(os.getenv("SUMMARY_CACHE_TTL_SECONDS", str(6 * 3600))),
+)
+
 def summarize_text_with_gemini(text: str, label: str) -> str:
     if not text.strip():
         return ""
@@ -110,7 +163,16 @@ You are a concise summarizer.
 Summarize the following {label} in simple bullet points. Avoid examples or repetition.
 {text[:MAX_CHARS_PER_CONTEXT]}
 """
-    return call_gemini(prompt)
+    key = ("source_summaries", hashlib.sha256(prompt.encode("utf-8")).hexdigest(), None)
+    with span("summarize", {"summarize.label": label, "summarize.input_chars": len(text)}) as sp:
+        summary = summary_cache.get(key)
+        sp.set_attribute("cache.hit", summary is not MISSING)
+        if summary is MISSING:
+            summary = call_gemini(prompt)
+            if summary:
+                summary_cache.set(key, summary)
+        sp.set_attribute("summarize.output_chars", len(summary or ""))
+        return summary
 
 def course_outline_to_text(outline: Union[dict, List[dict]]) -> str:
     if isinstance(outline, dict):
@@ -165,6 +227,8 @@ class QuizInput(BaseModel):
     quiz_type: str  # "MCQ" or "T/F"
     total_score: int
     user_prompt: str
+    submodule_id: Optional[str] = None  # question bank key; falls back to module/submodule names
+    use_question_bank: bool = True
 
 class AssignmentInput(BaseModel):
     module_name: str
@@ -216,6 +280,8 @@ def generate_reading_material(
     notes_text = clean_text(read_file(notes_path)) if notes_path else ""
     pdf_text = clean_text(extract_text_from_pdf(pdf_path)) if pdf_path else ""
     url_text = clean_text(scrape_text_from_url(url)) if url else ""
+    # Summaries carried over redo cycles repeat themselves; only send each point once
+    previous_material_summary = collapse_repeats(previous_material_summary)
 
     summarized_notes = summarize_text_with_gemini(notes_text, label="lecture notes") if notes_text else ""
     summarized_pdf = summarize_text_with_gemini(pdf_text, label="PDF reading") if pdf_text else ""
@@ -263,9 +329,11 @@ Context:
 ### Output Format:
 Return a JSON object with the following fields:
 - reading_material: Markdown passage with clear structure, explanations, examples, code, math, applications, suggested visuals, and ending summary.
+- reading_material_summary: A concise summary of the reading material in at least 3 bullet points.
 - source_summaries: A list of summaries for notes, PDF, and URL (omit if not available).
 """
 
+    from google.genai.types import Content, Part
     user_content = Content(
         role="user",
         parts=[
@@ -285,18 +353,10 @@ Return a JSON object with the following fields:
             "urlSummary": summarized_url
         }
 
-    # Fallback summarization (auto-summarize if missing)
-    material_summary = response.get("reading_material_summary")
-    if not material_summary:
-        summary_prompt = f"""
-Summarize the following reading material in concise bullet points:
-{response['reading_material']}
-"""
-        material_summary = call_gemini(summary_prompt) or ""
-
+    # The summary is returned as generated; summary_strategy decides whether it is good enough
     return ReadingMaterialOut(
         reading_material=response["reading_material"],
-        reading_material_summary=material_summary,
+        reading_material_summary=response.get("reading_material_summary") or "",
         source_summaries=response.get("source_summaries")
     ), {
         "notesSummary": summarized_notes,
@@ -331,7 +391,7 @@ def generate_lecture_script(
         f"--- Notes Summary ---\n{summarized_notes}" if summarized_notes else "",
         f"--- PDF Summary ---\n{summarized_pdf}" if summarized_pdf else "",
         f"--- Example Summary ---\n{summarized_examples}" if summarized_examples else "",
-        f"--- Previous Activities Summary ---\n{prev_activities_summary}" if prev_activities_summary else ""
+        f"--- Previous Activities Summary ---\n{collapse_repeats(prev_activities_summary)}" if prev_activities_summary else ""
     ]).strip()
 
     combined_context = truncate_text(combined_context)
@@ -379,6 +439,7 @@ Return a JSON object with the following fields:
 Return in bullet points, grouped under "Key Concepts", "Learning Goals", and "Examples or Analogies".
 """
 
+    from google.genai.types import Content, Part
     user_content = Content(
         role="user",
         parts=[
@@ -395,19 +456,8 @@ Return in bullet points, grouped under "Key Concepts", "Learning Goals", and "Ex
         }, None
 
     lecture_script = response["lecture_script"]
-
-    # ✅ Auto-generate summary if not provided by LLM
-    summary_prompt = f"""
-Summarize the following lecture script in bullet points grouped by:
-
-- Key Concepts
-- Learning Goals
-- Examples or Analogies
-
-Lecture Script:
-{lecture_script}
-"""
-    lecture_script_summary = call_gemini(summary_prompt) or ""
+    # Returned as generated; summary_strategy decides whether it is good enough
+    lecture_script_summary = response.get("lecture_script_summary")
 
     return (
         lecture_script,
@@ -420,16 +470,74 @@ Lecture Script:
     )
 
 
-def generate_quiz(module_name: str,
-                 submodule_name: str,
-                 activity_name: str,
-                 activity_description: str,
-                 activity_objective: str,
-                 material_summary: str,
-                 number_of_questions: int,
-                 quiz_type: str,
-                 total_score: int,
-                 user_prompt: str) -> Optional[Dict]:
+# ----------------------------- Quiz Sharding -----------------------------
+# Quizzes larger than QUIZ_SHARD_SIZE are split into shards that run in parallel, each
+# steered to a different difficulty tier and, when the material is long enough, a
+# different slice of it. Shards over-generate by QUIZ_OVERGENERATE; the merge drops
+# near-duplicates (dedup.py), and one sequential top-up call, told which questions
+# already exist, covers any shortfall that is left.
+
+QUIZ_SHARD_SIZE = int(os.getenv("QUIZ_SHARD_SIZE", "10"))
+QUIZ_SHARD_WORKERS = int(os.getenv("QUIZ_SHARD_WORKERS", "4"))
+QUIZ_OVERGENERATE = float(os.getenv("QUIZ_OVERGENERATE", "0.2"))
+MAX_AVOID_QUESTIONS = 40
+DIFFICULTY_TIERS = [
+    "foundational recall of definitions and facts",
+    "conceptual understanding",
+    "application to new examples",
+    "analysis of edge cases and common misconceptions",
+]
+
+def _material_slices(material_summary: str, shards: int) -> List[Optional[str]]:
+    # Contiguous paragraph (or sentence) groups, one per shard; None when too short to split
+    parts = [p.strip() for p in material_summary.split("\n\n") if p.strip()]
+    if len(parts) < shards:
+        parts = [p for p in re.split(r"(?<=[.!?])\s+", material_summary) if p.strip()]
+    if shards < 2 or len(parts) < shards * 2:
+        return [None] * shards
+    size, extra = divmod(len(parts), shards)
+    slices, start = [], 0
+    for i in range(shards):
+        end = start + size + (1 if i < extra else 0)
+        slices.append(" ".join(parts[start:end]))
+        start = end
+    return slices
+
+def _run_parallel(calls: List[Callable[[], Any]]) -> List[Any]:
+    # Each shard gets its own copy of the request context (deadline, trace parent,
+    # profile session), and its thread is sampled along with the handler's
+    if len(calls) == 1:
+        return [calls[0]()]
+    with ThreadPoolExecutor(max_workers=min(QUIZ_SHARD_WORKERS, len(calls)), thread_name_prefix="quiz-shard") as pool:
+        futures = [pool.submit(contextvars.copy_context().run, profiled(call)) for call in calls]
+        return [future.result() for future in futures]
+
+def _shard_questions(response) -> List[Dict]:
+    if isinstance(response, dict) and "error" not in response:
+        return [q for q in response.get("questions") or [] if isinstance(q, dict) and q.get("question")]
+    if isinstance(response, list):
+        return [q for q in response if isinstance(q, dict) and q.get("question")]
+    return []
+
+def _interleave(groups: List[List[Dict]]) -> List[Dict]:
+    # Round-robin across shards so any cut keeps the difficulty mix
+    merged = []
+    for i in range(max((len(g) for g in groups), default=0)):
+        merged.extend(g[i] for g in groups if i < len(g))
+    return merged
+
+def _quiz_call(module_name: str,
+               submodule_name: str,
+               activity_name: str,
+               activity_description: str,
+               activity_objective: str,
+               material_summary: str,
+               number_of_questions: int,
+               quiz_type: str,
+               total_score: int,
+               user_prompt: str,
+               focus: Optional[str] = None,
+               avoid_questions: Sequence[str] = ()) -> Optional[Dict]:
 
     prompt = f"""
 You are a quiz designer for an educational AI system.
@@ -450,30 +558,112 @@ Generate a quiz for the **submodule** "{submodule_name}" under the module "{modu
 - Ensure the questions are relevant to the submodule content and activity objective.
 - For MCQs, provide exactly 4 options (A, B, C, D) and one correct answer.
 - For True/False questions, provide a clear explanation and the 1st option as True and 2nd option as False and correct answer as "A" for True and "B" for False.
-
+"""
+    if focus:
+        prompt += f"""
+### Focus:
+{focus}
+"""
+    if avoid_questions:
+        avoid = "\n".join(f"- {q}" for q in list(avoid_questions)[:MAX_AVOID_QUESTIONS])
+        prompt += f"""
+### Already Asked (do not repeat or rephrase these):
+{avoid}
+"""
+    prompt += """
 ### Output Format:
 Return a **JSON array** where each item follows this schema:
-{{
+{
   "question_id": "<unique_id>",  # e.g. "Q1", "Q2", etc.
   "question": "<question_text>",
   "options": ["<A>", "<B>", "<C>", "<D>"] Or True/False
   "answer": "<correct_option>",  # "A", "B", "C", "D" or "A" for True/"B" for False
   "explanation": "<why this is the correct answer>"
-}}
+}
 
 ### Rules:
 - For **MCQ**, provide exactly 4 options and one correct answer.
 - For **T/F**, avoid ambiguity and give direct true/false questions.
 - Only return the JSON array. No markdown or comments.
 """
+    from google.genai.types import Content, Part
     user_content=Content(
         role="user",
         parts=[
             Part(text="Generate a quiz based on the following instructions:"),
         ]
     )
-    response = call_llm(user_content, prompt, QuizSet)
-    return response if response is not None else {"error": "Nothing was generated. Please try again."}
+    return call_llm(user_content, prompt, QuizSet)
+
+
+def generate_quiz(module_name: str,
+                 submodule_name: str,
+                 activity_name: str,
+                 activity_description: str,
+                 activity_objective: str,
+                 material_summary: str,
+                 number_of_questions: int,
+                 quiz_type: str,
+                 total_score: int,
+                 user_prompt: str,
+                 avoid_questions: Sequence[str] = ()) -> Optional[Dict]:
+
+    material_summary = collapse_repeats(material_summary)
+    common = dict(
+        module_name=module_name,
+        submodule_name=submodule_name,
+        activity_name=activity_name,
+        activity_description=activity_description,
+        activity_objective=activity_objective,
+        material_summary=material_summary,
+        quiz_type=quiz_type,
+        total_score=total_score,
+        user_prompt=user_prompt,
+    )
+    shards = max(1, -(-number_of_questions // QUIZ_SHARD_SIZE))
+    existing = [{"question": q} for q in avoid_questions]
+
+    with span("quiz.generate", {"quiz.questions": number_of_questions, "quiz.shards": shards}) as sp:
+        if shards == 1:
+            calls = [functools.partial(_quiz_call, **common, number_of_questions=number_of_questions, avoid_questions=avoid_questions)]
+        else:
+            calls = []
+            slices = _material_slices(material_summary, shards)
+            per_shard, extra = divmod(number_of_questions, shards)
+            for i in range(shards):
+                count = per_shard + (1 if i < extra else 0)
+                focus = (
+                    f"This is part {i + 1} of {shards} of a {number_of_questions}-question quiz; other parts are written separately. "
+                    f"Target difficulty for this part: {DIFFICULTY_TIERS[i % len(DIFFICULTY_TIERS)]}."
+                )
+                if slices[i]:
+                    focus += f"\nDraw mainly on this part of the material:\n{slices[i]}"
+                calls.append(functools.partial(
+                    _quiz_call, **common,
+                    number_of_questions=count + max(1, round(count * QUIZ_OVERGENERATE)),
+                    focus=focus, avoid_questions=avoid_questions,
+                ))
+
+        generated = _interleave([_shard_questions(r) for r in _run_parallel(calls)])
+        unique = unique_questions(generated, existing=existing)
+        questions = unique[:number_of_questions]
+        sp.set_attributes({"quiz.generated": len(generated), "quiz.duplicates_dropped": len(generated) - len(unique)})
+
+        # Also when every question was a near-duplicate of avoid_questions: one more try
+        shortfall = number_of_questions - len(questions)
+        if shortfall > 0:
+            deadline.check()
+            top_up = _quiz_call(
+                **common,
+                number_of_questions=shortfall,
+                avoid_questions=[q["question"] for q in existing + questions],
+            )
+            questions += unique_questions(_shard_questions(top_up), existing=existing + questions)[:shortfall]
+            sp.set_attribute("quiz.top_up", shortfall)
+
+    if not questions:
+        return {"error": "Nothing was generated. Please try again."}
+    return {"module_name": module_name, "submodule_name": submodule_name, "questions": questions}
 
 
 def generate_assignment(module_name, submodule_name, user_prompt, all_submodule_summaries):
@@ -0,0 +1,122 @@
+# db_indexes.py
+
+import logging
+from typing import Dict, List, Tuple, Any
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger("course_api.indexes")
+
+# ----------------------------- Index Specs -----------------------------
+# collection name -> list of (index name, keys, options)
+# Names are fixed so that re-running the bootstrap is a no-op and a changed
+# key pattern under the same name is detected instead of silently duplicated.
+
+IndexSpec = Tuple[str, List[Tuple[str, int]], Dict[str, Any]]
+
+INDEX_SPECS: Dict[str, List[IndexSpec]] = {
+    "course": [
+        ("course_id_1", [("course_id", ASCENDING)], {}),
+        ("timestamp_-1__id_-1", [("timestamp", DESCENDING), ("_id", DESCENDING)], {}),
+    ] + [
+        # Backs the flattened audience filters on /courses, in keyset order
+        (f"user_input.{field}_1_timestamp_-1__id_-1",
+         [(f"user_input.{field}", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)], {})
+        for field in (
+            "audience_type",
+            "audience_grade",
+            "audience_english_level",
+            "audience_math_level",
+            "audience_specialization",
+            "audience_country",
+        )
+    ],
+    "outline": [
+        ("course_id_1_version_id_1", [("course_id", ASCENDING), ("version_id", ASCENDING)], {}),
+        ("version_id_1", [("version_id", ASCENDING)], {}),
+        ("course_id_1_timestamp_-1__id_-1", [("course_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)], {}),
+    ],
+    "modules": [
+        ("course_id_1_version_id_1", [("course_id", ASCENDING), ("version_id", ASCENDING)], {}),
+        ("version_id_1", [("version_id", ASCENDING)], {}),
+        ("course_id_1_timestamp_-1__id_-1", [("course_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)], {}),
+    ],
+    "submodules": [
+        ("module_id_1_version_id_1", [("module_id", ASCENDING), ("version_id", ASCENDING)], {}),
+        ("version_id_1", [("version_id", ASCENDING)], {}),
+        ("module_id_1_timestamp_-1__id_-1", [("module_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)], {}),
+    ],
+    "activities": [
+        ("submodule_id_1_version_id_1", [("submodule_id", ASCENDING), ("version_id", ASCENDING)], {}),
+        ("version_id_1", [("version_id", ASCENDING)], {}),
+        ("submodule_id_1_timestamp_-1__id_-1", [("submodule_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)], {}),
+    ],
+    "content": [
+        ("activity_id_1", [("activity_id", ASCENDING)], {}),
+        ("version_id_1", [("version_id", ASCENDING)], {}),
+        ("activity_id_1_stage_1_timestamp_-1__id_-1", [("activity_id", ASCENDING), ("stage", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)], {}),
+    ],
+    "version_tags": [
+        ("version_id_1", [("version_id", ASCENDING)], {}),
+        ("entity_id_1_stage_1", [("entity_id", ASCENDING), ("stage", ASCENDING)], {}),
+    ],
+    "idempotency_keys": [
+        # Stored generation responses expire IDEMPOTENCY_TTL_SECONDS after the first request
+        ("expires_at_1", [("expires_at", ASCENDING)], {"expireAfterSeconds": 0}),
+    ],
+    "question_bank": [
+        ("submodule_key_1_quiz_type_1_material_hash_1_instructions_hash_1_question_hash_1",
+         [("submodule_key", ASCENDING), ("quiz_type", ASCENDING), ("material_hash", ASCENDING), ("instructions_hash", ASCENDING), ("question_hash", ASCENDING)],
+         {"unique": True}),
+        # Draw order: least served, then oldest
+        ("submodule_key_1_quiz_type_1_material_hash_1_instructions_hash_1_times_served_1_created_at_1",
+         [("submodule_key", ASCENDING), ("quiz_type", ASCENDING), ("material_hash", ASCENDING), ("instructions_hash", ASCENDING), ("times_served", ASCENDING), ("created_at", ASCENDING)],
+         {}),
+    ],
+    "latest_versions": [
+        ("entity_id_1_stage_1", [("entity_id", ASCENDING), ("stage", ASCENDING)], {"unique": True}),
+    ],
+}
+
+
+def _same_keys(existing: Dict[str, Any], keys: List[Tuple[str, int]]) -> bool:
+    return [(k, int(v)) for k, v in existing.get("key", [])] == [(k, int(v)) for k, v in keys]
+
+
+def ensure_indexes(db, specs: Dict[str, List[IndexSpec]] = INDEX_SPECS) -> Dict[str, Dict[str, str]]:
+    report: Dict[str, Dict[str, str]] = {}
+
+    for collection_name, indexes in specs.items():
+        collection = db[collection_name]
+        status: Dict[str, str] = {}
+        try:
+            existing = collection.index_information()
+        except OperationFailure:
+            # Collection does not exist yet; create_index will create it.
+            existing = {}
+
+        for name, keys, options in indexes:
+            current = existing.get(name)
+            if current is not None:
+                if _same_keys(current, keys) and bool(current.get("unique")) == bool(options.get("unique")):
+                    status[name] = "present"
+                else:
+                    status[name] = "conflict"
+                    logger.warning(f"Index {collection_name}.{name} exists with a different definition: {current}")
+                continue
+
+            try:
+                collection.create_index(keys, name=name, **options)
+                status[name] = "created"
+                logger.info(f"Created index {collection_name}.{name}")
+            except OperationFailure as e:
+                status[name] = "failed"
+                logger.error(f"Failed to create index {collection_name}.{name}: {e}")
+
+        report[collection_name] = status
+
+    created = sum(1 for s in report.values() for v in s.values() if v == "created")
+    failed = sum(1 for s in report.values() for v in s.values() if v in ("failed", "conflict"))
+    logger.info(f"Index bootstrap finished: {created} created, {failed} failed or conflicting")
+    return report
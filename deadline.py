@@ -0,0 +1,144 @@
+# deadline.py
+
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger("course_api.deadline")
+
+# ----------------------------- Request Deadlines -----------------------------
+# Clients send X-Request-Timeout (seconds they are willing to wait). The middleware
+# turns it into a monotonic deadline and watches for client disconnects; both are
+# carried in a contextvar, which AnyIO copies into the worker thread running the
+# sync route handler. Generators call check() between LLM steps and size each LLM
+# call with call_timeout(), so an abandoned request stops after the current step.
+
+DEADLINE_HEADER = b"x-request-timeout"
+LLM_CALL_TIMEOUT_SECONDS = float(os.getenv("LLM_CALL_TIMEOUT_SECONDS", "120"))
+# Never start an LLM call with less than this left; it would only be cut off
+MIN_CALL_SECONDS = float(os.getenv("LLM_MIN_CALL_SECONDS", "2"))
+
+class RequestAbandoned(Exception):
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+class RequestContext:
+    def __init__(self, deadline: Optional[float] = None):
+        self.deadline = deadline
+        self._cancelled = threading.Event()
+        self.reason: Optional[str] = None
+        # Set when someone other than the original client can still collect the result
+        self.survives_disconnect = False
+
+    def client_disconnected(self):
+        if not self.survives_disconnect:
+            self.cancel("client disconnected")
+
+    def cancel(self, reason: str):
+        if not self._cancelled.is_set():
+            self.reason = reason
+            self._cancelled.set()
+
+    def remaining(self) -> Optional[float]:
+        return None if self.deadline is None else self.deadline - time.monotonic()
+
+    def check(self):
+        if self._cancelled.is_set():
+            raise RequestAbandoned(self.reason or "cancelled")
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            self.cancel("deadline exceeded")
+            raise RequestAbandoned(self.reason)
+
+# Requests whose remaining steps were skipped, by reason (reported under /metrics)
+abandoned = {"deadline exceeded": 0, "client disconnected": 0}
+
+def stats() -> dict:
+    return dict(abandoned)
+
+_current: contextvars.ContextVar[Optional[RequestContext]] = contextvars.ContextVar("request_context", default=None)
+
+def current() -> Optional[RequestContext]:
+    return _current.get()
+
+def survive_disconnect():
+    # Keep running after the client goes away (the deadline still applies)
+    ctx = _current.get()
+    if ctx is not None:
+        ctx.survives_disconnect = True
+
+def check():
+    ctx = _current.get()
+    if ctx is not None:
+        ctx.check()
+
+def call_timeout(default: float = LLM_CALL_TIMEOUT_SECONDS) -> float:
+    # Per-call timeout in seconds: the default, capped by what is left of the request deadline
+    ctx = _current.get()
+    if ctx is None:
+        return default
+    ctx.check()
+    remaining = ctx.remaining()
+    if remaining is None:
+        return default
+    if remaining < MIN_CALL_SECONDS:
+        ctx.cancel("deadline exceeded")
+        raise RequestAbandoned(ctx.reason)
+    return min(default, remaining)
+
+def _parse_timeout(scope) -> Optional[float]:
+    for name, value in scope.get("headers", []):
+        if name == DEADLINE_HEADER:
+            try:
+                seconds = float(value.decode("latin-1"))
+            except ValueError:
+                return None
+            return seconds if seconds > 0 else None
+    return None
+
+# ----------------------------- Middleware -----------------------------
+
+class DeadlineMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timeout = _parse_timeout(scope)
+        ctx = RequestContext(time.monotonic() + timeout if timeout else None)
+        body_read = asyncio.Event()
+
+        async def tracked_receive():
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                ctx.client_disconnected()
+            elif not message.get("more_body", False):
+                body_read.set()
+            return message
+
+        async def watch_disconnect():
+            # Once the handler has the whole body, the only message left is the disconnect
+            await body_read.wait()
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    ctx.client_disconnected()
+                    if ctx.reason:
+                        logger.info(f"Client disconnected from {scope['method']} {scope['path']}; cancelling remaining steps")
+                    return
+
+        token = _current.set(ctx)
+        watcher = asyncio.create_task(watch_disconnect())
+        try:
+            await self.app(scope, tracked_receive, send)
+        finally:
+            watcher.cancel()
+            _current.reset(token)
@@ -0,0 +1,154 @@
+# dedup.py
+
+import hashlib
+import os
+import re
+from array import array
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+# ----------------------------- Near-Duplicate Questions -----------------------------
+# Two questions are near-duplicates when the word 3-gram shingles of their normalised
+# stems overlap by at least QUESTION_SIMILARITY (Jaccard). Options are left out on
+# purpose: the same stem with reshuffled or reworded options still asks the student
+# the same thing.
+
+QUESTION_SIMILARITY = 0.6
+SHINGLE_WORDS = 3
+
+_NON_WORD = re.compile(r"[^\w\s]")
+_SPACE = re.compile(r"\s+")
+
+def normalize(text: str) -> str:
+    return _SPACE.sub(" ", _NON_WORD.sub(" ", (text or "").lower())).strip()
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(normalize(text).encode("utf-8")).hexdigest()
+
+def shingles(text: str, size: int = SHINGLE_WORDS) -> FrozenSet[str]:
+    words = normalize(text).split()
+    if len(words) <= size:
+        return frozenset([" ".join(words)]) if words else frozenset()
+    return frozenset(" ".join(words[i:i + size]) for i in range(len(words) - size + 1))
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+def question_hash(question: Dict) -> str:
+    return text_hash(question.get("question", ""))
+
+def unique_questions(questions: Iterable[Dict], existing: Iterable[Dict] = (), threshold: float = QUESTION_SIMILARITY) -> List[Dict]:
+    # Keeps questions in order, dropping any that near-duplicate an earlier one or one in `existing`
+    seen = [shingles(q.get("question", "")) for q in existing]
+    kept = []
+    for question in questions:
+        stem = shingles(question.get("question", ""))
+        if not stem or any(jaccard(stem, other) >= threshold for other in seen):
+            continue
+        seen.append(stem)
+        kept.append(question)
+    return kept
+
+# ----------------------------- MinHash / LSH -----------------------------
+# MinHash signatures estimate Jaccard similarity between shingle sets; LSH banding
+# turns "find everything similar to this" into a few dict lookups. With 64 slots in
+# 16 bands of 4 rows, a pair at similarity 0.7 collides in some band ~99% of the time
+# and a pair at 0.3 ~12%; candidates are then confirmed on the full signature.
+# Signatures use one-permutation hashing: each shingle is hashed once and lands in one
+# of NUM_PERM bins (keeping the minimum), and empty bins borrow from the next filled
+# one (rotation densification). That is ~10x cheaper than 64 independent hash
+# functions in pure Python for a small loss of accuracy.
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+CONTENT_SIMILARITY = float(os.getenv("DEDUP_CONTENT_SIMILARITY", "0.7"))
+MIN_PARAGRAPH_WORDS = 12
+
+_MASK32 = 0xFFFFFFFF
+_ROTATION = 0x9E3779B1
+
+def _shingle_hash(shingle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+
+def minhash(text: str) -> array:
+    bins: List[Optional[int]] = [None] * NUM_PERM
+    for shingle in shingles(text):
+        h = _shingle_hash(shingle)
+        slot, value = h % NUM_PERM, h >> 32
+        current = bins[slot]
+        if current is None or value < current:
+            bins[slot] = value
+    if all(value is None for value in bins):
+        return array("I", [_MASK32] * NUM_PERM)
+    signature = array("I")
+    for slot in range(NUM_PERM):
+        distance = 0
+        while bins[(slot + distance) % NUM_PERM] is None:
+            distance += 1
+        signature.append((bins[(slot + distance) % NUM_PERM] + _ROTATION * distance) & _MASK32)
+    return signature
+
+def signature_similarity(a: Sequence[int], b: Sequence[int]) -> float:
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_PERM
+
+class LSHIndex:
+    # Signatures live in one flat array (row i at [i * NUM_PERM, (i + 1) * NUM_PERM));
+    # buckets map a band's hash to the rows sharing it.
+    def __init__(self):
+        self.signatures = array("I")
+        self.keys: List[Tuple] = []
+        self._rows: Dict[Tuple, int] = {}
+        self._buckets: Dict[int, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, key: Tuple) -> bool:
+        return key in self._rows
+
+    @staticmethod
+    def _band_hashes(signature: Sequence[int]) -> List[int]:
+        return [hash((band,) + tuple(signature[band * ROWS:(band + 1) * ROWS])) for band in range(BANDS)]
+
+    def add(self, key: Tuple, signature: Sequence[int]) -> bool:
+        if key in self._rows:
+            return False
+        row = len(self.keys)
+        self.keys.append(key)
+        self._rows[key] = row
+        self.signatures.extend(signature)
+        for band_hash in self._band_hashes(signature):
+            self._buckets.setdefault(band_hash, []).append(row)
+        return True
+
+    def signature(self, row: int) -> array:
+        return self.signatures[row * NUM_PERM:(row + 1) * NUM_PERM]
+
+    def query(self, signature: Sequence[int], threshold: float) -> List[Tuple[Tuple, float]]:
+        candidates = set()
+        for band_hash in self._band_hashes(signature):
+            candidates.update(self._buckets.get(band_hash, ()))
+        matches = []
+        for row in candidates:
+            similarity = signature_similarity(self.signature(row), signature)
+            if similarity >= threshold:
+                matches.append((self.keys[row], similarity))
+        return sorted(matches, key=lambda m: m[1], reverse=True)
+
+def collapse_repeats(text: str, threshold: float = CONTENT_SIMILARITY) -> str:
+    # Drops paragraphs that near-duplicate an earlier one (e.g. summaries stacked up over redo cycles)
+    blocks = [b for b in re.split(r"\n\s*\n", text or "") if b.strip()]
+    if len(blocks) < 2:
+        return text
+    index = LSHIndex()
+    kept = []
+    for i, block in enumerate(blocks):
+        if len(block.split()) >= MIN_PARAGRAPH_WORDS:
+            signature = minhash(block)
+            if index.query(signature, threshold):
+                continue
+            index.add((i,), signature)
+        kept.append(block)
+    return text if len(kept) == len(blocks) else "\n\n".join(kept)
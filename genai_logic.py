@@ -1,39 +1,49 @@
 import os
-from google import genai
-from google.genai import types
-from google.genai.types import GenerateContentConfig, Content, Part
 from dotenv import load_dotenv
 from pydantic import BaseModel
-from typing import List, Dict, Optional, Type
+from typing import List, Dict, Optional, Type, TYPE_CHECKING
 import json
 import uuid
+import orjson
+import deadline
+from deadline import RequestAbandoned
+from tracing import span, record_usage
 from pydantic import BaseModel
 from course_content_generator import QuizOut, ReadingMaterialOut, LectureScriptOut
+from clients import genai_client
 load_dotenv()
 
-llmclient = genai.Client(api_key=os.getenv("GEMINI_API_KEY")) 
+if TYPE_CHECKING:
+    from google.genai.types import Content
                   
 ################## GENERIC LLM FUNCTIONS #######################################################
-def call_llm(prompt: Content, system_prompt: str, response_schema: Type[BaseModel], debug: bool = False) -> Optional[dict]:
+def call_llm(prompt: "Content", system_prompt: str, response_schema: Type[BaseModel], debug: bool = False) -> Optional[dict]:
+    from google.genai.types import GenerateContentConfig, HttpOptions
     try:
-        response = llmclient.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=prompt,
-            config=GenerateContentConfig(
-                system_instruction=system_prompt,
-                response_mime_type="application/json",
-                response_schema=response_schema,
-                temperature=0.2
+        with span("llm.call_llm", {"gen_ai.request.model": "gemini-2.5-flash", "llm.schema": response_schema.__name__}) as sp:
+            response = genai_client().models.generate_content(
+                model="gemini-2.5-flash",
+                contents=prompt,
+                config=GenerateContentConfig(
+                    system_instruction=system_prompt,
+                    response_mime_type="application/json",
+                    response_schema=response_schema,
+                    temperature=0.2,
+                    http_options=HttpOptions(timeout=int(deadline.call_timeout() * 1000))
+                )
             )
-        )
+            record_usage(sp, response)
+            sp.set_attribute("llm.response_chars", len(response.text or ""))
         if debug or True:  # force debug always for now
             print(f"\n=== LLM RAW RESPONSE ===\n{response.text}\n=== END ===\n")
 
         parsed_response = None
         if response.text is not None:
-            parsed_response = json.loads(response.text)
+            parsed_response = orjson.loads(response.text)
         return parsed_response
 
+    except RequestAbandoned:
+        raise
     except Exception as e:
         print(f"LLM call failed: {e}")
         return None
@@ -136,6 +146,7 @@ Do NOT include additional fields like 'suggestions', 'notes', or 'explanations'.
 Only return the raw structured object.
 
 """
+    from google.genai.types import Content, Part
     user_content = Content(
         role="user",
         parts=[
@@ -186,11 +197,12 @@ Only return the raw structured object.
 
 """
 
+    from google.genai.types import Content, Part
     user_content = Content(
         role="user",
         parts=[
             Part(text="Generate suitable course modules for this course."),
-            Part(text=json.dumps(course_outline.model_dump(), indent=2))
+            Part(text=course_outline.model_dump_json())
 
         ]
     )
@@ -239,10 +251,11 @@ Do NOT include additional fields like 'suggestions', 'notes', or 'explanations'.
 Only return the raw structured object.
 
     """
+    from google.genai.types import Content, Part
     user_content=Content(
             role="user",
             parts=[
-                Part(text="Module Info:\n" + json.dumps(module.model_dump(), indent=2)),
+                Part(text="Module Info:\n" + module.model_dump_json()),
             ]
         )
     
@@ -301,6 +314,7 @@ Do NOT include additional fields like 'suggestions', 'notes', or 'explanations'.
 Only return the raw structured object.
 
 """
+    from google.genai.types import Content, Part
     user_content = Content(
         role="user",
         parts=[
@@ -361,17 +375,22 @@ Current Context:
 Carefully follow the stage instructions and provide actionable, stage-appropriate suggestions.
 """
 
+    from google.genai.types import GenerateContentConfig, Content, Part, HttpOptions
     try:
-        response = llmclient.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=[Content(role="user", parts=[Part(text=context)])],
-            config=GenerateContentConfig(
-                system_instruction=prompt,
-                response_mime_type='application/json',
-                response_schema=SuggestionOutput
+        with span("llm.suggestions", {"gen_ai.request.model": "gemini-2.5-flash", "course.stage": stage.value, "llm.context_chars": len(context)}) as sp:
+            response = genai_client().models.generate_content(
+                model="gemini-2.5-flash",
+                contents=[Content(role="user", parts=[Part(text=context)])],
+                config=GenerateContentConfig(
+                    system_instruction=prompt,
+                    response_mime_type='application/json',
+                    response_schema=SuggestionOutput,
+                    # Suggestions are optional: an abandoned request skips them (RequestAbandoned lands in the except below)
+                    http_options=HttpOptions(timeout=int(deadline.call_timeout() * 1000))
+                )
             )
-        )
-        return json.loads(response.text) if response.text else {}
+            record_usage(sp, response)
+        return orjson.loads(response.text) if response.text else {}
     except Exception as e:
         return {"error": str(e)}
     
@@ -412,11 +431,12 @@ Output Requirements:
 - Do NOT include additional fields or explanations.
 - Only return the raw structured object.
 """
+    from google.genai.types import Content, Part
     user_content = Content(
         role="user",
         parts=[
             Part(text="Redo the content based on the user's suggestion."),
-            Part(text=json.dumps(prev_content, indent=2)),
+            Part(text=json.dumps(prev_content, separators=(",", ":"), default=str)),
             Part(text="User Message: " + user_message)
         ]
     )
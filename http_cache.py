@@ -0,0 +1,45 @@
+# http_cache.py
+
+import hashlib
+import json
+import os
+from typing import Any, Optional
+
+from fastapi.responses import Response
+
+# ----------------------------- Cache-Control -----------------------------
+# A version_id never points at different content unless an SME edits it in place,
+# and every in-place edit rotates the document's content_rev. Responses are therefore
+# stored by browsers/CDNs and revalidated with If-None-Match (cheap 304s) by default.
+# Deployments without in-place editing can set VERSIONED_CACHE_CONTROL to
+# "public, max-age=31536000, immutable".
+
+VERSIONED_CACHE_CONTROL = os.getenv("VERSIONED_CACHE_CONTROL", "public, no-cache")
+LATEST_CACHE_CONTROL = os.getenv("LATEST_CACHE_CONTROL", "private, no-cache")
+
+def cache_control_for(version_pinned: bool) -> str:
+    return VERSIONED_CACHE_CONTROL if version_pinned else LATEST_CACHE_CONTROL
+
+# ----------------------------- ETags -----------------------------
+
+def make_etag(*parts: Any) -> str:
+    digest = hashlib.sha256("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+def body_hash(body: Any) -> str:
+    return hashlib.sha256(json.dumps(body, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    if not if_none_match or not etag:
+        return False
+    candidates = [t.strip() for t in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+def cache_headers(etag: str, cache_control: str) -> dict:
+    return {"ETag": etag, "Cache-Control": cache_control}
+
+def set_cache_headers(response: Response, etag: str, cache_control: str):
+    response.headers.update(cache_headers(etag, cache_control))
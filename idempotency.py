@@ -0,0 +1,241 @@
+# idempotency.py
+
+import asyncio
+import hashlib
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import anyio
+import orjson
+from bson.binary import Binary
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+import deadline
+from admission import LONG_GENERATION_PATHS, SHORT_GENERATION_PATHS
+from serialization import dumps
+
+logger = logging.getLogger("course_api.idempotency")
+
+# ----------------------------- Idempotency Keys -----------------------------
+# A generation request carrying an Idempotency-Key header runs at most once per key:
+#   - the first request claims the key (state "running", with a lease) and runs;
+#   - a retry while it runs attaches to it (in-process future, or polling when
+#     the original runs in another worker) and gets the same response;
+#   - a retry after it finished replays the stored response;
+#   - reusing a key for a different request body is rejected with 422.
+# Only successful responses are stored; errors (including a JSON body with a
+# top-level "error" key), 429 sheds and abandoned requests release the key so a
+# retry runs again.
+# Keys live in a TTL collection; expires_at is indexed in db_indexes.py.
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+IDEMPOTENT_PATHS = LONG_GENERATION_PATHS | SHORT_GENERATION_PATHS
+TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600)))
+# How long a running claim is trusted before another worker may take it over
+LEASE_SECONDS = float(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "600"))
+# How long a retry waits on an execution running in another worker before giving up with 409
+WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "300"))
+POLL_SECONDS = 1.0
+MAX_STORED_BYTES = 8 * 1024 * 1024
+
+RUNNING = "running"
+DONE = "done"
+
+counters = {"executed": 0, "replayed": 0, "attached": 0, "conflicts": 0}
+
+def stats() -> dict:
+    return dict(counters)
+
+def fingerprint(method: str, path: str, query: bytes, body: bytes) -> str:
+    digest = hashlib.sha256()
+    for part in (method.encode("ascii"), path.encode("utf-8"), query, body):
+        digest.update(part)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+class IdempotencyStore:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def claim(self, key: str, fp: str, owner: str) -> Optional[dict]:
+        # None: the caller owns the key and must run the request. Otherwise the existing record.
+        now = datetime.now(timezone.utc)
+        record = {
+            "_id": key,
+            "fingerprint": fp,
+            "state": RUNNING,
+            "owner": owner,
+            "lease_expires_at": now + timedelta(seconds=LEASE_SECONDS),
+            "created_at": now,
+            "expires_at": now + timedelta(seconds=TTL_SECONDS),
+        }
+        try:
+            self.collection.insert_one(record)
+            return None
+        except DuplicateKeyError:
+            pass
+        # Take over a claim whose owner died without finishing
+        taken = self.collection.find_one_and_update(
+            {"_id": key, "fingerprint": fp, "state": RUNNING, "lease_expires_at": {"$lt": now}},
+            {"$set": {"owner": owner, "lease_expires_at": record["lease_expires_at"]}},
+            return_document=ReturnDocument.AFTER
+        )
+        if taken is not None:
+            logger.warning(f"Took over expired idempotency claim {key}")
+            return None
+        existing = self.collection.find_one({"_id": key})
+        # The record can vanish between the insert and this read if its owner failed; claim again
+        return existing if existing is not None else self.claim(key, fp, owner)
+
+    def get(self, key: str) -> Optional[dict]:
+        return self.collection.find_one({"_id": key})
+
+    def complete(self, key: str, owner: str, response: dict):
+        self.collection.update_one(
+            {"_id": key, "owner": owner},
+            {"$set": {"state": DONE, "response": response}, "$unset": {"lease_expires_at": ""}}
+        )
+
+    def release(self, key: str, owner: str):
+        self.collection.delete_one({"_id": key, "owner": owner, "state": RUNNING})
+
+# ----------------------------- Middleware -----------------------------
+
+def _is_error_body(headers: List[tuple], payload: bytes) -> bool:
+    # Generators report failures as {"error": ...}; never replay one of those as a success
+    content_type = next((v for k, v in headers if k.lower() == "content-type"), "")
+    if "json" not in content_type or not payload.lstrip().startswith(b"{"):
+        return False
+    try:
+        body = orjson.loads(payload)
+    except orjson.JSONDecodeError:
+        return False
+    return isinstance(body, dict) and "error" in body
+
+async def _send_stored(send, response: dict):
+    headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in response["headers"]]
+    headers.append((b"idempotent-replayed", b"true"))
+    await send({"type": "http.response.start", "status": response["status"], "headers": headers})
+    await send({"type": "http.response.body", "body": bytes(response["body"])})
+
+async def _send_json(send, status: int, content: dict, extra_headers: Optional[List[tuple]] = None):
+    body = dumps(content)
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode("ascii"))]
+    await send({"type": "http.response.start", "status": status, "headers": headers + (extra_headers or [])})
+    await send({"type": "http.response.body", "body": body})
+
+class IdempotencyMiddleware:
+    def __init__(self, app, collection):
+        self.app = app
+        self.store = IdempotencyStore(collection)
+        # key -> future resolved with the stored response (or None on failure) for in-process retries
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def __call__(self, scope, receive, send):
+        key = None
+        if scope["type"] == "http" and scope["method"] == "POST" and scope["path"] in IDEMPOTENT_PATHS:
+            key = dict(scope.get("headers", [])).get(IDEMPOTENCY_HEADER)
+        if not key:
+            await self.app(scope, receive, send)
+            return
+        key = key.decode("latin-1")
+
+        # Buffer the body to fingerprint it, then hand it to the app unchanged
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+        fp = fingerprint(scope["method"], scope["path"], scope.get("query_string", b""), body)
+
+        owner = uuid.uuid4().hex
+        give_up_at = asyncio.get_running_loop().time() + WAIT_SECONDS
+        while True:
+            existing = await anyio.to_thread.run_sync(self.store.claim, key, fp, owner)
+            if existing is None:
+                await self._execute(scope, receive, send, key, owner, body)
+                return
+            if existing["fingerprint"] != fp:
+                counters["conflicts"] += 1
+                await _send_json(send, 422, {"detail": "Idempotency-Key was already used for a different request"})
+                return
+            if existing["state"] == DONE:
+                counters["replayed"] += 1
+                await _send_stored(send, existing["response"])
+                return
+
+            # Still running: attach to it
+            counters["attached"] += 1
+            response = await self._wait(key, give_up_at)
+            if response is not None:
+                await _send_stored(send, response)
+                return
+            if asyncio.get_running_loop().time() >= give_up_at:
+                await _send_json(send, 409, {"detail": "A request with this Idempotency-Key is still running"}, [(b"retry-after", b"5")])
+                return
+            # The original failed and released the key; try to claim it ourselves
+
+    async def _wait(self, key: str, give_up_at: float) -> Optional[dict]:
+        future = self._inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+        # Running in another worker: poll until it finishes, fails or we run out of patience
+        loop = asyncio.get_running_loop()
+        while loop.time() < give_up_at:
+            await asyncio.sleep(POLL_SECONDS)
+            record = await anyio.to_thread.run_sync(self.store.get, key)
+            if record is None:
+                return None
+            if record["state"] == DONE:
+                return record["response"]
+        return None
+
+    async def _execute(self, scope, receive, send, key: str, owner: str, body: bytes):
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        counters["executed"] += 1
+        # A dropped connection is exactly when the retry arrives, so finish for it
+        deadline.survive_disconnect()
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        captured = {"status": 500, "headers": [], "body": []}
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                captured["status"] = message["status"]
+                captured["headers"] = [(k.decode("latin-1"), v.decode("latin-1")) for k, v in message.get("headers", [])]
+            elif message["type"] == "http.response.body":
+                captured["body"].append(message.get("body", b""))
+            await send(message)
+
+        response = None
+        try:
+            await self.app(scope, replay_receive, capture_send)
+            payload = b"".join(captured["body"])
+            if (200 <= captured["status"] < 400 and len(payload) <= MAX_STORED_BYTES
+                    and not _is_error_body(captured["headers"], payload)):
+                response = {"status": captured["status"], "headers": captured["headers"], "body": Binary(payload)}
+        finally:
+            try:
+                if response is not None:
+                    await anyio.to_thread.run_sync(self.store.complete, key, owner, response)
+                else:
+                    await anyio.to_thread.run_sync(self.store.release, key, owner)
+            finally:
+                self._inflight.pop(key, None)
+                future.set_result(response)
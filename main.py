@@ -1,24 +1,98 @@
 # main.py
-from fastapi import FastAPI
-from api import router as course_router
+import threading
+from contextlib import asynccontextmanager
+import anyio
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from api import router as course_router, db, collection_idempotency, question_bank
+from read_cache import read_cache
+import admission
+import clients
+import summary_strategy
+import deadline
+import idempotency
+import profiling
+from deadline import DeadlineMiddleware, RequestAbandoned
+from db_indexes import ensure_indexes
+from tracing import setup_tracing
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI(title="AI Course Generator")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    anyio.to_thread.current_default_thread_limiter().total_tokens = admission.thread_limit()
+    # Build/verify Mongo indexes without blocking startup on large collections
+    threading.Thread(target=ensure_indexes, args=(db,), name="index-bootstrap", daemon=True).start()
+    # Mongo pool, LLM connection and parser imports warm in the background; /health/ready tracks them
+    clients.warm_up()
+    yield
+
+app = FastAPI(title="AI Course Generator", lifespan=lifespan)
+
+# OpenTelemetry (TRACING_EXPORTER=otlp|file|console); a no-op unless configured
+setup_tracing(app)
 
 # Include API router (with optional prefix and tags)
 app.include_router(course_router, prefix="/course", tags=["Course Generation"])
 
+# Debug endpoints (404 unless PROFILE_ADMIN_TOKEN is set)
+app.include_router(profiling.router)
+
+# Opt-in per-request profiling (X-Profile-Token or PROFILE_SAMPLE_RATE); not installed otherwise
+if profiling.ENABLED:
+    app.add_middleware(profiling.ProfilingMiddleware)
+
+# Separate pools for CRUD/reads, short and long generation; sheds with 429 + Retry-After.
+# Added before CORS so rejected requests still carry CORS headers.
+app.add_middleware(admission.AdmissionMiddleware)
+
+# Idempotency-Key on generation endpoints: retries attach to the running request or replay its
+# stored response. Sits outside admission so replays never take a generation slot.
+app.add_middleware(idempotency.IdempotencyMiddleware, collection=collection_idempotency)
+
+# X-Request-Timeout budget and client-disconnect detection; queueing time counts against the budget
+app.add_middleware(DeadlineMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Or ["http://localhost:3000"] for React dev server
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Retry-After", "Idempotent-Replayed", "X-Profile-Id"],
 )
 
+@app.exception_handler(RequestAbandoned)
+def request_abandoned(request: Request, exc: RequestAbandoned):
+    # 499 is nginx's "client closed request"; nobody reads it, but it keeps logs honest
+    deadline.abandoned[exc.reason] = deadline.abandoned.get(exc.reason, 0) + 1
+    status = 504 if exc.reason == "deadline exceeded" else 499
+    return JSONResponse(status_code=status, content={"detail": f"Request abandoned: {exc.reason}"})
+
+@app.get("/metrics", tags=["Health"])
+def metrics():
+    return {
+        "read_cache": read_cache.stats(),
+        "admission": admission.stats(),
+        "abandoned": deadline.stats(),
+        "idempotency": idempotency.stats(),
+        "question_bank": question_bank.stats(),
+        "summaries": summary_strategy.stats(),
+    }
+
 # Health check or root endpoint
 @app.get("/", tags=["Health"])
 def read_root():
     return {"message": "AI Course Generator backend is running"}
 
+# Liveness: the process is serving requests (restart it if this fails)
+@app.get("/health/live", tags=["Health"])
+async def liveness():
+    return {"status": "alive"}
+
+# Readiness: Mongo answered a ping (route traffic here only once this is 200)
+@app.get("/health/ready", tags=["Health"])
+async def readiness():
+    ready = clients.is_ready()
+    return JSONResponse(status_code=200 if ready else 503, content={"status": "ready" if ready else "starting", "checks": clients.readiness})
+
                            
\ No newline at end of file
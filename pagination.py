@@ -0,0 +1,72 @@
+# pagination.py
+
+import base64
+import heapq
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from serialization import dumps
+
+# ----------------------------- Cursor Encoding -----------------------------
+# Pages are ordered newest-first by (timestamp, _id). The cursor is the sort key
+# of the last item returned, so the next page is a range scan on the index.
+
+def encode_cursor(timestamp: datetime, oid: ObjectId) -> str:
+    raw = json.dumps({"t": timestamp.isoformat(), "i": str(oid)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(data["t"]), ObjectId(data["i"])
+    except (ValueError, KeyError, TypeError, InvalidId):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+def keyset_filter(cursor: Optional[str]) -> Dict[str, Any]:
+    if not cursor:
+        return {}
+    timestamp, oid = decode_cursor(cursor)
+    return {"$or": [
+        {"timestamp": {"$lt": timestamp}},
+        {"timestamp": timestamp, "_id": {"$lt": oid}}
+    ]}
+
+KEYSET_SORT = [("timestamp", -1), ("_id", -1)]
+
+# ----------------------------- Page Assembly -----------------------------
+
+class KeysetPage:
+    # Merges already-sorted sources lazily and stops after `limit` items.
+    # Each source should be fetched with limit + 1 so an extra item signals more pages.
+    def __init__(self, sources: List[Iterable[dict]], limit: int):
+        self.sources = sources
+        self.limit = limit
+        self.next_cursor: Optional[str] = None
+
+    def __iter__(self) -> Iterator[dict]:
+        merged = heapq.merge(*self.sources, key=lambda d: (d["timestamp"], d["_id"]), reverse=True)
+        last = None
+        for i, doc in enumerate(merged):
+            if i == self.limit:
+                self.next_cursor = encode_cursor(last["timestamp"], last["_id"])
+                break
+            last = doc
+            yield doc
+
+def page_response(page: KeysetPage, serialize, fmt: str = "json"):
+    if fmt == "ndjson":
+        def stream():
+            for doc in page:
+                yield dumps(serialize(doc)) + b"\n"
+            yield dumps({"next_cursor": page.next_cursor}) + b"\n"
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    items = [serialize(doc) for doc in page]
+    return {"items": items, "next_cursor": page.next_cursor}
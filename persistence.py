@@ -0,0 +1,121 @@
+# persistence.py
+
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import Callable, List, Optional
+
+from pymongo import InsertOne, UpdateOne
+
+from genai_logic import Stage
+from tracing import span
+
+logger = logging.getLogger("course_api.persistence")
+
+# Server wire version that introduced the cross-collection bulkWrite command (MongoDB 8.0)
+CLIENT_BULK_WRITE_WIRE_VERSION = 25
+
+# ----------------------------- Record Builders -----------------------------
+
+def version_tag(entity_id: str, version_id: str, stage: Stage, prefix: str) -> dict:
+    now = datetime.now(timezone.utc)
+    return {
+        "entity_id": entity_id,
+        "stage": stage.value,
+        "tag": f"{prefix}-{now.strftime('%Y%m%dT%H%M%S')}",
+        "version_id": version_id,
+        "timestamp": now
+    }
+
+def latest_pointer(entity_id: str, stage: Stage, version_id: str) -> tuple[dict, dict]:
+    return (
+        {"entity_id": entity_id, "stage": stage.value},
+        {"$set": {"latest_version_id": version_id, "timestamp": datetime.now(timezone.utc)}}
+    )
+
+# ----------------------------- Version Writer -----------------------------
+
+class VersionWriter:
+    # Writes a stage record together with its version tag and latest pointer.
+    # Uses a transaction on replica sets/sharded clusters, a single ordered
+    # client-level bulkWrite on standalone 8.0+ servers, and otherwise falls back
+    # to ordered writes with the stage record first so a tag never outlives it.
+
+    def __init__(self, client, tags_collection, latest_collection):
+        self.client = client
+        self.tags_collection = tags_collection
+        self.latest_collection = latest_collection
+        self._mode: Optional[str] = None
+        # Called as listener(entity_id, stage, version_id) after every successful write
+        self.listeners: List[Callable[[str, Stage, str], None]] = []
+
+    def add_listener(self, listener: Callable[[str, Stage, str], None]):
+        self.listeners.append(listener)
+
+    def _notify(self, entity_id: str, stage: Stage, version_id: str):
+        for listener in self.listeners:
+            try:
+                listener(entity_id, stage, version_id)
+            except Exception:
+                logger.exception(f"Write listener failed for {stage.value} version {version_id}")
+
+    def _detect_mode(self) -> str:
+        if self._mode is None:
+            try:
+                hello = self.client.admin.command("hello")
+                if hello.get("setName") or hello.get("msg") == "isdbgrid":
+                    self._mode = "transaction"
+                elif hello.get("maxWireVersion", 0) >= CLIENT_BULK_WRITE_WIRE_VERSION and hasattr(self.client, "bulk_write"):
+                    self._mode = "bulk"
+                else:
+                    self._mode = "sequential"
+            except Exception as e:
+                logger.warning(f"Could not detect Mongo topology, using sequential writes: {e}")
+                return "sequential"
+            logger.info(f"Version writes will use '{self._mode}' mode")
+        return self._mode
+
+    def write_version(self, collection, record: dict, entity_id: str, stage: Stage, tag_prefix: str) -> dict:
+        # content_rev identifies this exact content for HTTP caching; in-place edits rotate it
+        record["content_rev"] = uuid.uuid4().hex
+        tag = version_tag(entity_id, record["version_id"], stage, tag_prefix)
+        pointer_filter, pointer_update = latest_pointer(entity_id, stage, record["version_id"])
+        mode = self._detect_mode()
+
+        with span("mongo.write_version", {"course.stage": stage.value, "db.collection.name": collection.name, "mongo.write_mode": mode}):
+            if mode == "transaction":
+                def txn(session):
+                    collection.insert_one(record, session=session)
+                    self.tags_collection.insert_one(tag, session=session)
+                    self.latest_collection.update_one(pointer_filter, pointer_update, upsert=True, session=session)
+                with self.client.start_session() as session:
+                    session.with_transaction(txn)
+
+            elif mode == "bulk":
+                self.client.bulk_write([
+                    InsertOne(record, namespace=collection.full_name),
+                    InsertOne(tag, namespace=self.tags_collection.full_name),
+                    UpdateOne(pointer_filter, pointer_update, upsert=True, namespace=self.latest_collection.full_name),
+                ], ordered=True)
+
+            else:
+                collection.insert_one(record)
+                self.tags_collection.insert_one(tag)
+                self.latest_collection.update_one(pointer_filter, pointer_update, upsert=True)
+
+        logger.info(f"Stored {stage.value} version {record['version_id']} for {entity_id} as '{tag['tag']}'")
+        self._notify(entity_id, stage, record["version_id"])
+        return tag
+
+    def touch_latest(self, entity_id: str, stage: Stage, version_id: str):
+        # In-place edits keep their version_id but still become the latest version
+        pointer_filter, pointer_update = latest_pointer(entity_id, stage, version_id)
+        self.latest_collection.update_one(pointer_filter, pointer_update, upsert=True)
+        self._notify(entity_id, stage, version_id)
+
+    def latest_version_id(self, entity_id: str, stage: Stage) -> Optional[str]:
+        pointer = self.latest_collection.find_one(
+            {"entity_id": entity_id, "stage": stage.value},
+            {"_id": 0, "latest_version_id": 1}
+        )
+        return pointer["latest_version_id"] if pointer else None
@@ -0,0 +1,319 @@
+# profiling.py
+
+import contextvars
+import functools
+import hmac
+import html
+import inspect
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+import zlib
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import anyio
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import FileResponse
+from fastapi.routing import APIRoute
+
+logger = logging.getLogger("course_api.profiling")
+
+# ----------------------------- Per-request Profiling -----------------------------
+# A request is profiled when it carries X-Profile-Token matching PROFILE_ADMIN_TOKEN,
+# or is picked by PROFILE_SAMPLE_RATE. A sampler thread then snapshots the stack of
+# the worker thread running the route handler every PROFILE_INTERVAL_MS and writes,
+# per request, a flame graph (.svg), collapsed stacks (.folded, for speedscope or
+# flamegraph.pl) and the top hot frames (.json) to PROFILE_DIR.
+# With neither setting configured, routes are not wrapped and the middleware is not
+# installed, so there is no per-request cost at all.
+
+PROFILE_HEADER = b"x-profile-token"
+ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN")
+SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+INTERVAL_SECONDS = float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+MAX_PROFILES = int(os.getenv("PROFILE_MAX_FILES", "200"))
+TOP_FRAMES = 30
+
+ENABLED = bool(ADMIN_TOKEN) or SAMPLE_RATE > 0
+
+class ProfileSession:
+    def __init__(self, method: str, path: str, reason: str):
+        self.id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.method = method
+        self.path = path
+        self.reason = reason
+        self.threads: set = set()
+        self._threads_lock = threading.Lock()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started = time.perf_counter()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._run, name=f"profiler-{self.id}", daemon=True)
+
+    def start(self):
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        self._sampler.join()
+
+    def add_thread(self, ident: int):
+        with self._threads_lock:
+            self.threads.add(ident)
+
+    def discard_thread(self, ident: int):
+        with self._threads_lock:
+            self.threads.discard(ident)
+
+    def _run(self):
+        while not self._stop.wait(INTERVAL_SECONDS):
+            frames = sys._current_frames()
+            with self._threads_lock:
+                threads = list(self.threads)
+            for ident in threads:
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.stacks[_stack(frame)] += 1
+                    self.samples += 1
+
+_current: contextvars.ContextVar[Optional[ProfileSession]] = contextvars.ContextVar("profile_session", default=None)
+
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    for marker in ("site-packages" + os.sep, "lib" + os.sep + "python"):
+        if marker in filename:
+            filename = filename.split(marker, 1)[1]
+            break
+    else:
+        filename = os.path.basename(filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+def _stack(frame) -> Tuple[str, ...]:
+    # Root-first labels, starting at the route handler (the wrapper and everything below it is dropped)
+    labels = []
+    while frame is not None and frame.f_code is not _WRAPPER_CODE:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return tuple(reversed(labels))
+
+# ----------------------------- Route Wrapping -----------------------------
+
+def profiled(fn):
+    # Samples the calling thread for the current request's session, if any. Route
+    # handlers get this from ProfiledRoute; helper threads that fan work out of a
+    # handler (with the request context copied in) wrap their callables with it.
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        session = _current.get()
+        if session is None:
+            return fn(*args, **kwargs)
+        ident = threading.get_ident()
+        session.add_thread(ident)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            session.discard_thread(ident)
+    return wrapper
+
+_WRAPPER_CODE = profiled(lambda: None).__code__
+
+class ProfiledRoute(APIRoute):
+    # Sync handlers run in worker threads; the wrapper tells the sampler which thread
+    # belongs to the profiled request. Async handlers are left alone.
+    def __init__(self, path: str, endpoint, **kwargs):
+        if ENABLED and not inspect.iscoroutinefunction(endpoint):
+            endpoint = profiled(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+# ----------------------------- Output -----------------------------
+
+def _hot_frames(stacks: Counter, limit: int = TOP_FRAMES) -> Dict[str, List[dict]]:
+    self_counts: Counter = Counter()
+    total_counts: Counter = Counter()
+    for stack, count in stacks.items():
+        if not stack:
+            continue
+        self_counts[stack[-1]] += count
+        for label in set(stack):
+            total_counts[label] += count
+    samples = sum(stacks.values()) or 1
+
+    def rows(counts: Counter) -> List[dict]:
+        return [{"frame": label, "samples": n, "percent": round(100 * n / samples, 2)} for label, n in counts.most_common(limit)]
+
+    return {"self": rows(self_counts), "total": rows(total_counts)}
+
+def _flame_svg(stacks: Counter, title: str, width: int = 1200, row_height: int = 16) -> str:
+    # Classic flame graph: root at the bottom, width proportional to samples
+    tree: dict = {"count": 0, "children": {}}
+    for stack, count in stacks.items():
+        node = tree
+        node["count"] += count
+        for label in stack:
+            node = node["children"].setdefault(label, {"count": 0, "children": {}})
+            node["count"] += count
+
+    def depth(node) -> int:
+        return 1 + max((depth(child) for child in node["children"].values()), default=0)
+
+    levels = depth(tree)
+    height = (levels + 2) * row_height
+    total = tree["count"] or 1
+    rects: List[str] = []
+
+    def draw(node, label: str, x: float, level: int):
+        w = width * node["count"] / total
+        if w < 0.5:
+            return
+        y = height - (level + 1) * row_height
+        hue = 20 + zlib.crc32(label.encode("utf-8")) % 40
+        text = html.escape(label)
+        pct = 100 * node["count"] / total
+        rects.append(
+            f'<g><title>{text} ({node["count"]} samples, {pct:.1f}%)</title>'
+            f'<rect x="{x:.1f}" y="{y}" width="{w:.1f}" height="{row_height - 1}" fill="hsl({hue},80%,60%)"/>'
+            + (f'<text x="{x + 3:.1f}" y="{y + row_height - 4}" font-size="11" font-family="monospace">'
+               f'{html.escape(label[:int(w / 7)])}</text>' if w > 35 else "")
+            + "</g>"
+        )
+        offset = x
+        for child_label, child in sorted(node["children"].items()):
+            draw(child, child_label, offset, level + 1)
+            offset += width * child["count"] / total
+
+    draw(tree, "all", 0, 0)
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" viewBox="0 0 {width} {height}">'
+        f'<text x="4" y="14" font-size="12" font-family="monospace">{html.escape(title)}</text>'
+        + "".join(rects) + "</svg>"
+    )
+
+def save(session: ProfileSession, status: int, duration: float):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    base = os.path.join(PROFILE_DIR, session.id)
+    title = f"{session.method} {session.path} -> {status} in {duration * 1000:.0f} ms, {session.samples} samples"
+    with open(base + ".folded", "w", encoding="utf-8") as f:
+        for stack, count in session.stacks.most_common():
+            f.write(";".join(stack) + f" {count}\n")
+    with open(base + ".svg", "w", encoding="utf-8") as f:
+        f.write(_flame_svg(session.stacks, title))
+    with open(base + ".json", "w", encoding="utf-8") as f:
+        json.dump({
+            "id": session.id,
+            "method": session.method,
+            "path": session.path,
+            "status": status,
+            "reason": session.reason,
+            "duration_ms": round(duration * 1000, 1),
+            "samples": session.samples,
+            "interval_ms": INTERVAL_SECONDS * 1000,
+            "hot_frames": _hot_frames(session.stacks),
+        }, f, indent=2)
+    _prune()
+    logger.info(f"Saved profile {session.id}: {title}")
+
+def _prune():
+    profiles = sorted(name[:-5] for name in os.listdir(PROFILE_DIR) if name.endswith(".json"))
+    for stale in profiles[:-MAX_PROFILES] if MAX_PROFILES > 0 else []:
+        for ext in (".json", ".svg", ".folded"):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, stale + ext))
+            except FileNotFoundError:
+                pass
+
+# ----------------------------- Middleware -----------------------------
+
+def _token_equals(raw: bytes) -> bool:
+    # Constant-time, so response timing does not leak the admin token
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(raw, ADMIN_TOKEN.encode("utf-8"))
+
+def _token_matches(scope) -> bool:
+    if not ADMIN_TOKEN:
+        return False
+    for name, value in scope.get("headers", []):
+        if name == PROFILE_HEADER:
+            return _token_equals(value)
+    return False
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith("/debug/"):
+            await self.app(scope, receive, send)
+            return
+        if _token_matches(scope):
+            reason = "header"
+        elif SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE:
+            reason = "sampled"
+        else:
+            await self.app(scope, receive, send)
+            return
+
+        session = ProfileSession(scope["method"], scope["path"], reason)
+        status = 500
+
+        async def tagged_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": list(message.get("headers", [])) + [(b"x-profile-id", session.id.encode("ascii"))]}
+            await send(message)
+
+        token = _current.set(session)
+        session.start()
+        try:
+            await self.app(scope, receive, tagged_send)
+        finally:
+            _current.reset(token)
+            duration = time.perf_counter() - session.started
+            session.stop()
+            try:
+                await anyio.to_thread.run_sync(save, session, status, duration)
+            except OSError:
+                logger.exception(f"Failed to save profile {session.id}")
+
+# ----------------------------- Debug Endpoints -----------------------------
+
+router = APIRouter()
+
+PROFILE_FILES = {"svg": "image/svg+xml", "folded": "text/plain", "json": "application/json"}
+
+def _require_admin(token: Optional[str]):
+    # Hidden entirely unless an admin token is configured
+    # Starlette decodes header values as latin-1, so this recovers the raw bytes
+    if token is None or not _token_equals(token.encode("latin-1")):
+        raise HTTPException(status_code=404, detail="Not found")
+
+@router.get("/debug/profiles", tags=["Debug"])
+def list_profiles(x_profile_token: Optional[str] = Header(None)):
+    _require_admin(x_profile_token)
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(PROFILE_DIR), reverse=True):
+        if name.endswith(".json"):
+            with open(os.path.join(PROFILE_DIR, name), encoding="utf-8") as f:
+                meta = json.load(f)
+            meta.pop("hot_frames", None)
+            meta["files"] = {ext: f"/debug/profiles/{meta['id']}.{ext}" for ext in PROFILE_FILES}
+            profiles.append(meta)
+    return profiles
+
+@router.get("/debug/profiles/{profile_id}.{ext}", tags=["Debug"])
+def download_profile(profile_id: str, ext: str, x_profile_token: Optional[str] = Header(None)):
+    _require_admin(x_profile_token)
+    if ext not in PROFILE_FILES or os.path.basename(profile_id) != profile_id:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.{ext}")
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type=PROFILE_FILES[ext], filename=f"{profile_id}.{ext}")
@@ -0,0 +1,95 @@
+# question_bank.py
+
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple
+
+from pymongo import ASCENDING, UpdateOne
+
+from dedup import question_hash, text_hash
+
+logger = logging.getLogger("course_api.question_bank")
+
+# ----------------------------- Question Bank -----------------------------
+# Every question accepted into a quiz is kept under (submodule, quiz type, material
+# hash, instructions hash). A later quiz over the same material and instructions draws
+# the least-served questions first and only asks the model for the shortfall. The
+# material hash covers the normalised material summary, so a regenerated lecture or
+# reading starts a fresh bank; the instructions hash covers the user prompt and total
+# score, so new instructions always reach the model.
+
+QUESTION_FIELDS = ("question", "options", "answer", "explanation")
+# Upper bound on questions read back per draw; a quiz never needs more
+MAX_DRAW = int(os.getenv("QUESTION_BANK_MAX_DRAW", "200"))
+
+class BankKey(NamedTuple):
+    submodule_key: str
+    quiz_type: str
+    material_hash: str
+    instructions_hash: str
+
+    def filter(self) -> dict:
+        return self._asdict()
+
+def bank_key(submodule_key: str, quiz_type: str, material_summary: str, user_prompt: str, total_score: int) -> BankKey:
+    return BankKey(submodule_key, quiz_type.strip().upper(), text_hash(material_summary), text_hash(f"{user_prompt}\n{total_score}"))
+
+class QuestionBank:
+    def __init__(self, collection):
+        self.collection = collection
+        self.drawn = 0
+        self.added = 0
+
+    def draw(self, key: BankKey, count: int) -> List[Dict]:
+        # Least-served first, then oldest, so repeated quizzes rotate through the bank
+        if count <= 0:
+            return []
+        cursor = self.collection.find(
+            key.filter(),
+            {"_id": 0, "question_hash": 1, **{field: 1 for field in QUESTION_FIELDS}},
+        ).sort([("times_served", ASCENDING), ("created_at", ASCENDING)]).limit(min(count, MAX_DRAW))
+        return list(cursor)
+
+    def mark_served(self, key: BankKey, questions: List[Dict]):
+        hashes = [q["question_hash"] for q in questions if q.get("question_hash")]
+        if not hashes:
+            return
+        self.collection.update_many(
+            {**key.filter(), "question_hash": {"$in": hashes}},
+            {"$inc": {"times_served": 1}, "$set": {"last_served_at": datetime.now(timezone.utc)}},
+        )
+        self.drawn += len(hashes)
+
+    def add(self, key: BankKey, questions: List[Dict], activity_id: str) -> int:
+        # Exact repeats (same normalised stem) collapse onto the existing entry
+        now = datetime.now(timezone.utc)
+        ops = []
+        for question in questions:
+            digest = question_hash(question)
+            question["question_hash"] = digest
+            ops.append(UpdateOne(
+                {**key.filter(), "question_hash": digest},
+                {"$setOnInsert": {
+                    **key.filter(),
+                    "question_hash": digest,
+                    **{field: question.get(field) for field in QUESTION_FIELDS},
+                    "source_activity_id": activity_id,
+                    "created_at": now,
+                    "times_served": 1,
+                    "last_served_at": now,
+                }},
+                upsert=True,
+            ))
+        if not ops:
+            return 0
+        result = self.collection.bulk_write(ops, ordered=False)
+        self.added += result.upserted_count
+        logger.info(f"Question bank {key.submodule_key}/{key.quiz_type}: {result.upserted_count} of {len(ops)} questions new")
+        return result.upserted_count
+
+    def stats(self) -> dict:
+        return {"drawn": self.drawn, "added": self.added}
+
+def public_question(question: Dict) -> Dict:
+    return {field: question.get(field) for field in QUESTION_FIELDS}
@@ -0,0 +1,120 @@
+# read_cache.py
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Set, Tuple
+
+MISSING = object()
+
+# Invalidation is in-process only (VersionWriter listeners), so with several workers a
+# cached entry can outlive a write made by another worker. Cached version bodies are
+# revalidated against Mongo's content_rev, but only once per REVALIDATE_SECONDS: a
+# poller hitting the same version inside that window is served from memory, so another
+# worker's edit can take up to REVALIDATE_SECONDS to show. Latest-version pointers have
+# no cheaper check than re-reading them, so unless this is the sole worker
+# (WEB_CONCURRENCY unset or 1) they are only cached for REVALIDATE_SECONDS.
+REVALIDATE_SECONDS = float(os.getenv("READ_CACHE_REVALIDATE_SECONDS", "2"))
+CACHE_LATEST_POINTERS = os.getenv(
+    "READ_CACHE_LATEST_POINTERS",
+    "1" if int(os.getenv("WEB_CONCURRENCY", "1")) <= 1 else "0",
+) == "1"
+
+# ----------------------------- TTL/LRU Cache -----------------------------
+# Keys are tuples that start with (collection, entity_id, version_id, ...) so
+# writes can drop every cached read for one entity or one version at once.
+
+class ReadCache:
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 30.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # key -> (expires_at, value, checked_at)
+        self._data: "OrderedDict[Tuple, Tuple[float, Any, float]]" = OrderedDict()
+        self._by_entity: Dict[Tuple[Hashable, Hashable], Set[Tuple]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _drop(self, key: Tuple):
+        self._data.pop(key, None)
+        keys = self._by_entity.get(key[:2])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_entity[key[:2]]
+
+    def get_checked(self, key: Tuple) -> Tuple[Any, float]:
+        # The cached value and seconds since it was stored or last revalidated
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING, 0.0
+            expires_at, value, checked_at = entry
+            now = time.monotonic()
+            if expires_at < now:
+                self._drop(key)
+                self.misses += 1
+                return MISSING, 0.0
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value, now - checked_at
+
+    def get(self, key: Tuple) -> Any:
+        return self.get_checked(key)[0]
+
+    def mark_checked(self, key: Tuple):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data[key] = (entry[0], entry[1], time.monotonic())
+
+    def set(self, key: Tuple, value: Any, ttl_seconds: Optional[float] = None):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._drop(key)
+            now = time.monotonic()
+            self._data[key] = (now + (self.ttl_seconds if ttl_seconds is None else ttl_seconds), value, now)
+            self._by_entity.setdefault(key[:2], set()).add(key)
+            while len(self._data) > self.max_entries:
+                oldest = next(iter(self._data))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def invalidate(self, collection: str, entity_id: Hashable, version_id: Optional[Hashable] = None):
+        with self._lock:
+            for key in list(self._by_entity.get((collection, entity_id), ())):
+                if version_id is None or key[2] == version_id:
+                    self._drop(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._by_entity.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "latest_pointers": CACHE_LATEST_POINTERS,
+                "revalidate_seconds": REVALIDATE_SECONDS,
+            }
+
+
+read_cache = ReadCache(
+    max_entries=int(os.getenv("READ_CACHE_MAX_ENTRIES", "2048")),
+    ttl_seconds=float(os.getenv("READ_CACHE_TTL_SECONDS", "60")),
+)
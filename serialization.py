@@ -0,0 +1,54 @@
+# serialization.py
+
+from typing import Any
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+# ----------------------------- JSON Encoding -----------------------------
+# orjson serializes dict/list/str/datetime/enum natively and only calls the
+# default hook for types it does not know, so Pydantic models nested inside
+# response dicts are dumped exactly once, on demand, with no jsonable_encoder pass.
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+def orjson_default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, bytes):
+        # Includes bson Binary: a compressed field that was never decoded must fail, not ship as mojibake
+        raise TypeError(f"Refusing to serialize {type(obj).__name__} ({len(obj)} bytes); decode it first")
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps(obj: Any) -> bytes:
+    return orjson.dumps(obj, default=orjson_default, option=ORJSON_OPTIONS)
+
+def dumps_compact(obj: Any) -> str:
+    # Compact JSON for prompt context: no indentation, no extra whitespace
+    if isinstance(obj, BaseModel):
+        return obj.model_dump_json()
+    return dumps(obj).decode("utf-8")
+
+
+class CourseJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def trusted_response(content: Any, status_code: int = 200, headers: dict | None = None) -> CourseJSONResponse:
+    # For objects the handler built and validated itself: returning a Response
+    # directly skips FastAPI's response_model re-validation and jsonable_encoder.
+    return CourseJSONResponse(content=content, status_code=status_code, headers=headers)
+
+# ----------------------------- BSON -----------------------------
+
+def to_bson(obj: Any) -> Any:
+    # Pydantic -> BSON-ready dict in a single model_dump; dicts pass through untouched
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="python")
+    return obj
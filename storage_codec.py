@@ -0,0 +1,237 @@
+# storage_codec.py
+
+import argparse
+import glob
+import logging
+import os
+import zlib
+from typing import Any, Dict, Iterable, List, Optional
+
+from bson.binary import Binary
+
+import tracing
+from tracing import span
+
+logger = logging.getLogger("course_api.codec")
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; zlib is always available
+    zstandard = None
+
+# ----------------------------- Configuration -----------------------------
+# Large text fields in collection_content are stored as
+#     {"__codec__": "<codec id>", "data": Binary, "n": <original length>}
+# Codec ids are versioned ("zlib:1", "zstd:1", "zstd:1:<dict_id>") so old
+# documents stay readable when the default codec or dictionary changes.
+
+CODEC_MARKER = "__codec__"
+COMPRESSED_FIELDS = ("reading_material", "lecture_script", "lecture_script_summary", "source_summaries")
+MIN_BYTES = int(os.getenv("CONTENT_COMPRESS_MIN_BYTES", "1024"))
+CODEC = os.getenv("CONTENT_CODEC", "zlib")
+ZLIB_LEVEL = int(os.getenv("CONTENT_ZLIB_LEVEL", "6"))
+ZSTD_LEVEL = int(os.getenv("CONTENT_ZSTD_LEVEL", "9"))
+DICT_DIR = os.getenv("CONTENT_CODEC_DICT_DIR", "codec_dicts")
+DICT_ID = os.getenv("CONTENT_CODEC_DICT_ID")
+
+# ----------------------------- Codecs -----------------------------
+
+_dictionaries: Dict[str, Any] = {}
+
+def _load_dictionary(dict_id: str):
+    if dict_id not in _dictionaries:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd-compressed content")
+        with open(os.path.join(DICT_DIR, f"{dict_id}.zstd-dict"), "rb") as f:
+            _dictionaries[dict_id] = zstandard.ZstdCompressionDict(f.read())
+    return _dictionaries[dict_id]
+
+def active_codec() -> str:
+    if CODEC == "zstd" and zstandard is not None:
+        return f"zstd:1:{DICT_ID}" if DICT_ID else "zstd:1"
+    if CODEC == "zstd":
+        logger.warning("CONTENT_CODEC=zstd but zstandard is not installed (pip install .[zstd]), falling back to zlib")
+    return "zlib:1"
+
+def compress_text(text: str, codec: Optional[str] = None) -> dict:
+    codec = codec or active_codec()
+    raw = text.encode("utf-8")
+    if codec == "zlib:1":
+        data = zlib.compress(raw, ZLIB_LEVEL)
+    elif codec.startswith("zstd:1"):
+        dict_id = codec.split(":")[2] if codec.count(":") == 2 else None
+        dict_data = _load_dictionary(dict_id) if dict_id else None
+        data = zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=dict_data).compress(raw)
+    else:
+        raise ValueError(f"Unknown content codec '{codec}'")
+    return {CODEC_MARKER: codec, "data": Binary(data), "n": len(text)}
+
+def decompress_text(value: dict) -> str:
+    codec = value[CODEC_MARKER]
+    data = bytes(value["data"])
+    if codec == "zlib:1":
+        return zlib.decompress(data).decode("utf-8")
+    if codec.startswith("zstd:1"):
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd-compressed content")
+        dict_id = codec.split(":")[2] if codec.count(":") == 2 else None
+        dict_data = _load_dictionary(dict_id) if dict_id else None
+        return zstandard.ZstdDecompressor(dict_data=dict_data).decompress(data).decode("utf-8")
+    raise ValueError(f"Unknown content codec '{codec}'")
+
+def is_compressed(value: Any) -> bool:
+    return isinstance(value, dict) and CODEC_MARKER in value
+
+# ----------------------------- Documents -----------------------------
+
+def worth_compressing(text: str) -> bool:
+    # MIN_BYTES is a UTF-8 size; character count is a lower bound, so only
+    # short strings pay for the encode.
+    return len(text) >= MIN_BYTES or len(text.encode("utf-8")) >= MIN_BYTES
+
+def _encode_value(value: Any, codec: str) -> Any:
+    if isinstance(value, str):
+        return compress_text(value, codec) if worth_compressing(value) else value
+    if isinstance(value, dict) and not is_compressed(value):
+        return {k: _encode_value(v, codec) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_encode_value(v, codec) for v in value]
+    return value
+
+def _decode_value(value: Any) -> Any:
+    if is_compressed(value):
+        return decompress_text(value)
+    if isinstance(value, dict):
+        return {k: _decode_value(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_decode_value(v) for v in value]
+    return value
+
+def encode_document(doc: dict, fields: Iterable[str] = COMPRESSED_FIELDS) -> dict:
+    codec = active_codec()
+    with span("codec.encode", {"codec.id": codec}) as sp:
+        for field in fields:
+            if field in doc:
+                doc[field] = _encode_value(doc[field], codec)
+        if tracing.enabled():
+            sp.set_attribute("codec.stored_bytes", sum(len(v["data"]) for v in _compressed_values(doc)))
+    return doc
+
+def decode_document(doc: Optional[dict], fields: Optional[Iterable[str]] = None) -> Optional[dict]:
+    # Only the requested fields are decompressed; callers that project heavy
+    # fields away (history, tree without content, copies) never pay for it.
+    if not doc:
+        return doc
+    for field in (fields if fields is not None else COMPRESSED_FIELDS):
+        if field in doc:
+            doc[field] = _decode_value(doc[field])
+    return doc
+
+# ----------------------------- Maintenance -----------------------------
+
+def migrate_collection(collection, batch_size: int = 200, dry_run: bool = False) -> dict:
+    from pymongo import UpdateOne
+
+    codec = active_codec()
+    # Blob-backed versions keep their body in the version blobs collection, so the
+    # fields below are absent here and those documents are reported, not rewritten.
+    projection = {**{f: 1 for f in COMPRESSED_FIELDS}, "storage": 1}
+    scanned = updated = blob_backed = bytes_before = bytes_after = 0
+    ops: List[UpdateOne] = []
+
+    for doc in collection.find({}, projection, batch_size=batch_size):
+        scanned += 1
+        if "storage" in doc:
+            blob_backed += 1
+            continue
+        changes = {}
+        for field in COMPRESSED_FIELDS:
+            if field not in doc:
+                continue
+            decoded = _decode_value(doc[field])
+            encoded = _encode_value(decoded, codec)
+            if encoded != doc[field]:
+                changes[field] = encoded
+                bytes_before += len(str(decoded).encode("utf-8"))
+                bytes_after += sum(len(v["data"]) for v in _compressed_values(encoded))
+        if changes:
+            updated += 1
+            ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": changes}))
+        if len(ops) >= batch_size:
+            if not dry_run:
+                collection.bulk_write(ops, ordered=False)
+            ops = []
+
+    if ops and not dry_run:
+        collection.bulk_write(ops, ordered=False)
+
+    report = {
+        "codec": codec, "scanned": scanned, "updated": updated, "skipped_blob_backed": blob_backed,
+        "text_bytes": bytes_before, "compressed_bytes": bytes_after
+    }
+    logger.info(f"Content codec migration: {report}")
+    if blob_backed:
+        logger.warning(f"Content codec migration left {blob_backed} blob-backed versions untouched; their bodies live in the version blobs collection")
+    return report
+
+def _compressed_values(value: Any):
+    if is_compressed(value):
+        yield value
+    elif isinstance(value, dict):
+        for v in value.values():
+            yield from _compressed_values(v)
+    elif isinstance(value, list):
+        for v in value:
+            yield from _compressed_values(v)
+
+def _text_samples(collection, limit: int) -> List[bytes]:
+    samples = []
+    for doc in collection.find({}, {f: 1 for f in COMPRESSED_FIELDS}).limit(limit):
+        for field in COMPRESSED_FIELDS:
+            stack = [_decode_value(doc.get(field))]
+            while stack:
+                value = stack.pop()
+                if isinstance(value, str) and value:
+                    samples.append(value.encode("utf-8"))
+                elif isinstance(value, dict):
+                    stack.extend(value.values())
+                elif isinstance(value, list):
+                    stack.extend(value)
+    return samples
+
+def train_dictionary(collection, sample_docs: int = 2000, dict_size: int = 112 * 1024) -> str:
+    if zstandard is None:
+        raise RuntimeError("zstandard is required to train a dictionary")
+    trained = zstandard.train_dictionary(dict_size, _text_samples(collection, sample_docs))
+    dict_id = str(trained.dict_id())
+    os.makedirs(DICT_DIR, exist_ok=True)
+    with open(os.path.join(DICT_DIR, f"{dict_id}.zstd-dict"), "wb") as f:
+        f.write(trained.as_bytes())
+    logger.info(f"Trained zstd dictionary {dict_id}; set CONTENT_CODEC=zstd CONTENT_CODEC_DICT_ID={dict_id}")
+    return dict_id
+
+def available_dictionaries() -> List[str]:
+    return sorted(os.path.basename(p).split(".")[0] for p in glob.glob(os.path.join(DICT_DIR, "*.zstd-dict")))
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Content compression maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+    migrate = sub.add_parser("migrate", help="Re-encode existing content documents with the active codec")
+    migrate.add_argument("--batch-size", type=int, default=200)
+    migrate.add_argument("--dry-run", action="store_true")
+    train = sub.add_parser("train-dict", help="Train a zstd dictionary from stored content")
+    train.add_argument("--samples", type=int, default=2000)
+    args = parser.parse_args()
+
+    content = MongoClient(os.getenv("MONGO_URI"))[os.getenv("MONGO_DB_NAME", "corgen")]["content"]
+    if args.command == "migrate":
+        print(migrate_collection(content, batch_size=args.batch_size, dry_run=args.dry_run))
+    else:
+        print(train_dictionary(content, sample_docs=args.samples))
@@ -0,0 +1,138 @@
+# summary_strategy.py
+
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+from course_content_generator import call_gemini
+from tracing import span
+
+logger = logging.getLogger("course_api.summaries")
+
+# ----------------------------- Summary Strategy -----------------------------
+# Lecture and reading responses already carry a summary field in their schema. It is
+# used as-is when it passes the quality checks below; otherwise the response goes out
+# with whatever the model gave (possibly empty) and a post-response job summarises
+# the full text and writes the result onto the stored version. Either way the version
+# records which path produced its summary under "summary_source".
+
+SUMMARY_MIN_CHARS = int(os.getenv("SUMMARY_MIN_CHARS", "150"))
+# A "summary" longer than this fraction of the text it summarises is not one
+SUMMARY_MAX_RATIO = float(os.getenv("SUMMARY_MAX_RATIO", "0.6"))
+SUMMARY_MIN_BULLETS = 3
+SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", "2"))
+
+class SummarySpec(NamedTuple):
+    sections: Tuple[str, ...]
+    prompt: str
+
+SPECS: Dict[str, SummarySpec] = {
+    "lecture": SummarySpec(
+        sections=("Key Concepts", "Learning Goals", "Examples or Analogies"),
+        prompt="""
+Summarize the following lecture script in bullet points grouped by:
+
+- Key Concepts
+- Learning Goals
+- Examples or Analogies
+
+Lecture Script:
+{text}
+""",
+    ),
+    "reading": SummarySpec(
+        sections=(),
+        prompt="""
+Summarize the following reading material in concise bullet points:
+{text}
+""",
+    ),
+}
+
+_BULLET = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+\S", re.MULTILINE)
+
+def check(kind: str, summary: Optional[str], text: str) -> Optional[str]:
+    # None when the summary is usable, otherwise the first failed check
+    summary = (summary or "").strip()
+    if not summary:
+        return "missing"
+    if len(summary) < SUMMARY_MIN_CHARS:
+        return "too short"
+    if text and len(summary) > SUMMARY_MAX_RATIO * len(text):
+        return "too long"
+    lowered = summary.lower()
+    missing = [s for s in SPECS[kind].sections if s.lower() not in lowered]
+    if missing:
+        return f"missing sections: {', '.join(missing)}"
+    if len(_BULLET.findall(summary)) < SUMMARY_MIN_BULLETS:
+        return "too few bullet points"
+    return None
+
+class SummaryDecision(NamedTuple):
+    summary: str
+    source: dict
+
+    @property
+    def deferred(self) -> bool:
+        return self.source["path"] == "post_response"
+
+# Decisions and job outcomes since start (reported under /metrics)
+counts = {"in_schema": 0, "skipped": 0, "post_response": 0, "post_response_done": 0, "post_response_failed": 0}
+_counts_lock = threading.Lock()
+
+def _count(key: str):
+    with _counts_lock:
+        counts[key] += 1
+
+def decide(kind: str, summary: Optional[str], text: str) -> SummaryDecision:
+    if len(text or "") < 2 * SUMMARY_MIN_CHARS:
+        # Nothing worth a second pass (including failed generations)
+        _count("skipped")
+        return SummaryDecision((summary or "").strip(), {"path": "skipped"})
+    reason = check(kind, summary, text)
+    if reason is None:
+        _count("in_schema")
+        return SummaryDecision(summary.strip(), {"path": "in_schema"})
+    _count("post_response")
+    return SummaryDecision((summary or "").strip(), {"path": "post_response", "status": "pending", "reason": reason})
+
+# ----------------------------- Post-Response Jobs -----------------------------
+# Jobs run on their own small pool, outside the request: no request deadline or
+# disconnect applies, and they never hold a route worker thread.
+
+_executor = ThreadPoolExecutor(max_workers=SUMMARY_WORKERS, thread_name_prefix="summary-job")
+
+def _run(kind: str, text: str, reason: str, store: Callable[[Optional[str], dict], None]):
+    started = time.perf_counter()
+    with span("summary.post_response", {"summary.kind": kind, "summary.reason": reason, "summary.input_chars": len(text)}) as sp:
+        try:
+            summary = call_gemini(SPECS[kind].prompt.format(text=text))
+        except Exception as e:
+            logger.warning(f"Post-response {kind} summary failed: {e}")
+            summary = None
+        source = {
+            "path": "post_response",
+            "status": "done" if summary else "failed",
+            "reason": reason,
+            "seconds": round(time.perf_counter() - started, 2),
+        }
+        if summary:
+            source["check"] = check(kind, summary, text) or "passed"
+        sp.set_attribute("summary.status", source["status"])
+    _count("post_response_done" if summary else "post_response_failed")
+    try:
+        store(summary or None, source)
+    except Exception:
+        logger.exception(f"Failed to store post-response {kind} summary")
+
+def schedule(kind: str, text: str, decision: SummaryDecision, store: Callable[[Optional[str], dict], None]):
+    # Call after the version is written: `store` updates it in place
+    _executor.submit(_run, kind, text, decision.source.get("reason", ""), store)
+
+def stats() -> dict:
+    with _counts_lock:
+        return dict(counts)
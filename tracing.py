@@ -0,0 +1,138 @@
+# tracing.py
+
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Optional
+
+logger = logging.getLogger("course_api.tracing")
+
+try:
+    from opentelemetry import trace
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SpanExporter, SpanExportResult
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+except ImportError:  # tracing is optional; every span below becomes a no-op
+    trace = None
+
+# ----------------------------- Configuration -----------------------------
+# TRACING_EXPORTER: none (default) | otlp | file | console
+#   otlp    -> OTLP/HTTP, endpoint from the standard OTEL_EXPORTER_OTLP_ENDPOINT
+#   file    -> one JSON span per line in TRACING_FILE_PATH
+# TRACING_SAMPLE_RATIO: fraction of new traces kept (children follow their parent)
+
+EXPORTER = os.getenv("TRACING_EXPORTER", "none").lower()
+SAMPLE_RATIO = float(os.getenv("TRACING_SAMPLE_RATIO", "1.0"))
+FILE_PATH = os.getenv("TRACING_FILE_PATH", "traces.jsonl")
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "course-api")
+
+_tracer = None
+
+# ----------------------------- No-op Fallback -----------------------------
+
+class _NoopSpan:
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, attributes: dict):
+        pass
+
+    def record_exception(self, exc: BaseException):
+        pass
+
+_NOOP_SPAN = _NoopSpan()
+
+# ----------------------------- Exporters -----------------------------
+
+if trace is not None:
+    class FileSpanExporter(SpanExporter):
+        def __init__(self, path: str):
+            self.path = path
+            self._lock = threading.Lock()
+
+        def export(self, spans) -> "SpanExportResult":
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                for span in spans:
+                    f.write(span.to_json(indent=None) + "\n")
+            return SpanExportResult.SUCCESS
+
+        def shutdown(self):
+            pass
+
+def _exporter():
+    if EXPORTER == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        return OTLPSpanExporter()
+    if EXPORTER == "file":
+        return FileSpanExporter(FILE_PATH)
+    if EXPORTER == "console":
+        return ConsoleSpanExporter()
+    return None
+
+def setup_tracing(app=None):
+    global _tracer
+    if EXPORTER == "none":
+        return
+    if trace is None:
+        logger.warning(f"TRACING_EXPORTER={EXPORTER} but opentelemetry-sdk is not installed; tracing disabled")
+        return
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": SERVICE_NAME}),
+        sampler=ParentBased(TraceIdRatioBased(SAMPLE_RATIO)),
+    )
+    provider.add_span_processor(BatchSpanProcessor(_exporter()))
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer("course_api")
+
+    # Request and raw Mongo command spans, when the instrumentation packages are present
+    try:
+        from opentelemetry.instrumentation.pymongo import PymongoInstrumentor
+        PymongoInstrumentor().instrument()
+    except ImportError:
+        pass
+    if app is not None:
+        try:
+            from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+            FastAPIInstrumentor.instrument_app(app)
+        except ImportError:
+            pass
+    logger.info(f"Tracing enabled: exporter={EXPORTER}, sample_ratio={SAMPLE_RATIO}")
+
+# ----------------------------- Spans -----------------------------
+
+def enabled() -> bool:
+    # For attributes that cost something to compute
+    return _tracer is not None
+
+@contextmanager
+def span(name: str, attributes: Optional[dict] = None):
+    # Child span of whatever is current (the request span, or an enclosing step)
+    if _tracer is None:
+        yield _NOOP_SPAN
+        return
+    with _tracer.start_as_current_span(name) as current:
+        current.set_attributes(_clean(attributes))
+        yield current
+
+def annotate(attributes: dict):
+    # Attach attributes to the current span, e.g. the stage on the request span
+    if _tracer is None:
+        return
+    trace.get_current_span().set_attributes(_clean(attributes))
+
+def _clean(attributes: Optional[dict]) -> dict:
+    return {k: v for k, v in (attributes or {}).items() if v is not None}
+
+def record_usage(current, response: Optional[Any]):
+    # Token counts from a google-genai response, under the GenAI semantic convention names
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    current.set_attributes(_clean({
+        "gen_ai.usage.input_tokens": usage.prompt_token_count,
+        "gen_ai.usage.output_tokens": usage.candidates_token_count,
+        "gen_ai.usage.total_tokens": usage.total_token_count,
+    }))
@@ -0,0 +1,219 @@
+# version_store.py
+
+import copy
+import hashlib
+import json
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from read_cache import ReadCache, MISSING
+
+logger = logging.getLogger("course_api.versions")
+
+# ----------------------------- Storage Layout -----------------------------
+# A version document either holds its body inline (everything generated so far,
+# and anything edited in place), or carries
+#     "storage": {"blob": <sha256 of body>, "patch": [<JSON patch ops>]}
+# where the body lives once in the blobs collection and the optional patch turns
+# that body into this version's body. Blobs are content-addressed, so identical
+# payloads are stored once and never change; branch and rollback only copy the
+# reference, and redo of a blob-backed version stores a small patch against its
+# lineage's base blob.
+
+# Fields that stay on the version document: identity, lineage and anything queried on.
+INLINE_FIELDS = {
+    "_id",
+    "version_id",
+    "parent_version_id",
+    "previous_version_id",
+    "copied_from_version_id",
+    "timestamp",
+    "stage",
+    "course_id",
+    "module_id",
+    "submodule_id",
+    "activity_id",
+    "activity_name",
+    "activity_description",
+    "activity_objective",
+    "activity_type",
+    "module_ids",
+    "submodule_ids",
+    "activity_ids",
+    "content_rev",
+    "storage",
+}
+
+# Store a delta only when it is meaningfully smaller than the full body
+MAX_DELTA_RATIO = 0.5
+
+def _canonical(body: dict) -> str:
+    return json.dumps(body, sort_keys=True, default=str, separators=(",", ":"))
+
+def split_document(doc: dict) -> Tuple[dict, dict]:
+    meta = {k: v for k, v in doc.items() if k in INLINE_FIELDS}
+    body = {k: v for k, v in doc.items() if k not in INLINE_FIELDS}
+    return meta, body
+
+# ----------------------------- JSON Patch -----------------------------
+# Minimal RFC 6902 subset (add/remove/replace) over dicts and lists.
+
+def _escape(token: str) -> str:
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+def _unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+def json_diff(old: Any, new: Any, path: str = "") -> List[dict]:
+    if type(old) is not type(new):
+        return [{"op": "replace", "path": path, "value": new}]
+
+    if isinstance(old, dict):
+        ops = []
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            child = f"{path}/{_escape(key)}"
+            if key not in old:
+                ops.append({"op": "add", "path": child, "value": value})
+            elif old[key] != value:
+                ops.extend(json_diff(old[key], value, child))
+        return ops
+
+    if isinstance(old, list):
+        ops = []
+        common = min(len(old), len(new))
+        for i in range(common):
+            if old[i] != new[i]:
+                ops.extend(json_diff(old[i], new[i], f"{path}/{i}"))
+        # Remove from the end backwards so indexes stay valid
+        for i in range(len(old) - 1, common - 1, -1):
+            ops.append({"op": "remove", "path": f"{path}/{i}"})
+        for i in range(common, len(new)):
+            ops.append({"op": "add", "path": f"{path}/{i}", "value": new[i]})
+        return ops
+
+    if old != new:
+        return [{"op": "replace", "path": path, "value": new}]
+    return []
+
+def apply_patch(doc: Any, ops: List[dict]) -> Any:
+    doc = copy.deepcopy(doc)
+    for op in ops:
+        tokens = [_unescape(t) for t in op["path"].split("/")[1:]]
+        if not tokens:
+            doc = copy.deepcopy(op.get("value"))
+            continue
+        parent = doc
+        for token in tokens[:-1]:
+            parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+        last = tokens[-1]
+        if isinstance(parent, list):
+            index = len(parent) if last == "-" else int(last)
+            if op["op"] == "add":
+                parent.insert(index, copy.deepcopy(op["value"]))
+            elif op["op"] == "remove":
+                del parent[index]
+            else:
+                parent[index] = copy.deepcopy(op["value"])
+        else:
+            if op["op"] == "remove":
+                del parent[last]
+            else:
+                parent[last] = copy.deepcopy(op["value"])
+    return doc
+
+# ----------------------------- Version Store -----------------------------
+
+class VersionStore:
+    def __init__(self, blobs_collection, cache_entries: int = 256):
+        self.blobs = blobs_collection
+        # Blobs are immutable, so cached bodies never need invalidation
+        self._blob_cache = ReadCache(max_entries=cache_entries, ttl_seconds=24 * 3600)
+
+    def put_blob(self, body: dict) -> str:
+        canonical = _canonical(body)
+        digest = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+        self.blobs.update_one(
+            {"_id": digest},
+            {"$setOnInsert": {"body": body, "size": len(canonical), "created_at": datetime.now(timezone.utc)}},
+            upsert=True
+        )
+        self._blob_cache.set((self.blobs.name, digest, None), body)
+        return digest
+
+    def get_blob(self, digest: str) -> dict:
+        key = (self.blobs.name, digest, None)
+        body = self._blob_cache.get(key)
+        if body is MISSING:
+            blob = self.blobs.find_one({"_id": digest}, {"body": 1})
+            if blob is None:
+                raise LookupError(f"Version blob {digest} is missing")
+            body = blob["body"]
+            self._blob_cache.set(key, body)
+        return body
+
+    def materialize(self, doc: Optional[dict]) -> Optional[dict]:
+        if not doc or "storage" not in doc:
+            return doc
+        storage = doc["storage"]
+        body = self.get_blob(storage["blob"])
+        if storage.get("patch"):
+            body = apply_patch(body, storage["patch"])
+        full = {k: v for k, v in doc.items() if k != "storage"}
+        for key, value in body.items():
+            full.setdefault(key, value)
+        return full
+
+    def snapshot(self, doc: dict) -> dict:
+        # Metadata-only copy of a version for branch/rollback; the body is shared by reference.
+        if "storage" in doc:
+            return {k: copy.deepcopy(v) for k, v in doc.items() if k in INLINE_FIELDS}
+        meta, body = split_document(doc)
+        meta["storage"] = {"blob": self.put_blob(body)}
+        return meta
+
+    def encode_delta(self, collection, record: dict, parent_version_id: Optional[str]) -> dict:
+        # Store a redo result as a patch against its parent's base blob when that is smaller.
+        # An inline parent has no blob to patch against; copying its body into one would cost
+        # more than keeping this child inline, so only blob-backed lineages get deltas.
+        if not parent_version_id:
+            return record
+        parent = collection.find_one({"version_id": parent_version_id}, {"storage": 1})
+        if parent is None or "storage" not in parent:
+            return record
+
+        base_digest = parent["storage"]["blob"]
+        base_body = self.get_blob(base_digest)
+        meta, body = split_document(record)
+        patch = json_diff(base_body, body)
+        if len(_canonical({"p": patch})) > MAX_DELTA_RATIO * len(_canonical(body)):
+            return record
+
+        meta["storage"] = {"blob": base_digest, "patch": patch}
+        logger.info(f"Stored version {record.get('version_id')} as a {len(patch)}-op delta on blob {base_digest[:12]}")
+        return meta
+
+    def hydrate(self, collection, query: dict) -> bool:
+        # Rewrite a blob-backed version inline so positional updates can target its fields.
+        doc = collection.find_one(query)
+        if not doc or "storage" not in doc:
+            return False
+        full = self.materialize(doc)
+        _, body = split_document(full)
+        collection.update_one({"_id": doc["_id"]}, {"$set": body, "$unset": {"storage": ""}})
+        return True
+
+    def update_one(self, collection, query: dict, update: dict):
+        # content_rev only rotates once the update really changed the document, so a
+        # no-op (unknown array element, same values) still reports modified_count == 0.
+        result = collection.update_one({**query, "storage": {"$exists": False}}, update)
+        identity = {k: v for k, v in query.items() if k in INLINE_FIELDS}
+        if result.matched_count == 0 and self.hydrate(collection, identity):
+            result = collection.update_one(query, update)
+        if result.modified_count:
+            collection.update_one(identity, {"$set": {"content_rev": uuid.uuid4().hex}})
+        return result